@@ -1,120 +1,396 @@
-import serial
+import asyncio
 import threading
 import time
-import csv
-from datetime import datetime
-
-from nicegui import ui
-import pandas as pd
-from reportlab.pdfgen import canvas
-import matplotlib.pyplot as plt
 import os
+from datetime import datetime, timedelta
+
+from nicegui import app, run, ui
+
+from leitor_serial import MAX_LINHA, LeitorLinhas
+from gravador_csv import GravadorCSV
+from estatisticas import estatisticas_de_colunas
+from difusor import DifusorPainel
+from exportacao import exportar_excel, novo_arquivo, pre_carregar as pre_carregar_excel
+from relatorio_pdf import CacheGraficos, gerar_relatorio_pdf, pre_carregar as pre_carregar_pdf
+from armazenamento import COLUNAS_BANCO, ArmazenamentoParticionado
+from transporte import abrir_transporte
+from pipeline import PipelineAquisicao
+from metricas import PORTA_METRICAS, RegistroMetricas, servir_http
+from aquisicao_async import AquisicaoAsync, BarramentoAmostras
+from alarmes import ARQUIVO_ALARMES, MotorAlarmes, regras_padrao
+from configuracao import ARQUIVO_CONFIG, OPCOES, Configuracao
+from comandos_tx import TAXA_MAX_TX, FilaComandos, ler_script
+from enlace import SupervisorEnlace
+from multibancada import GerenciadorBancadas, spec_bancada
+from analise import JANELA_MOVEL, analisar, linhas_resumo, serie_movel
 
 # ==========================
 # CONFIGURAÇÕES GERAIS
 # ==========================
+# Os valores abaixo só valem na primeira execução: depois passam a valer os
+# de configuracao.json, editados na tela de Configurações ou direto no
+# arquivo e aplicados sem reiniciar (ver `configuracao` mais abaixo).
+
+# porta serial ('COM2', '/dev/ttyUSB0') ou outro transporte:
+# 'tcp://host:porta', 'pty', 'arquivo://captura.txt?taxa=50', 'sim://?taxa=200',
+# 'replay://historico_medicoes.csv?velocidade=10' (replay não grava no histórico)
 PORTA_SERIAL = 'COM2'
 BAUDRATE = 9600
 TIMEOUT = 1
+TAMANHO_BLOCO = 0   # bytes por leitura da porta; 0 = tudo que estiver esperando
+# confirmação dos comandos: regex procurada nas linhas recebidas, '{comando}' = o
+# comando enviado (ex.: r'^OK {comando}$'); '' = firmware não confirma
+ACK_COMANDOS = ''
+# formato do enlace: 'texto' (linhas ASCII) ou 'binario' (quadros COBS + CRC16 de
+# 22 bytes, ~4x mais amostras por baud, com perdas contadas pela numeração);
+# 'binario' é negociado a cada abertura e fica no texto se o firmware não responder
+PROTOCOLO = 'texto'
+
+# outras bancadas, cada uma num processo de aquisição próprio com histórico em memória
+# compartilhada (visão geral em /bancadas); a bancada acima continua neste processo.
+# ex.: {'bancada2': 'COM4', 'bancada3': 'tcp://10.0.0.5:5000'}
+BANCADAS = {}
+
+# 'blocos': thread com leitura bloqueante em blocos (read(in_waiting or 1)), sem sleep
+# 'asyncio': tarefa no event loop do NiceGUI, sem thread; painel atualiza a cada INTERVALO_UI_ASYNC
+# 'polling': laço antigo com in_waiting + sleep de 20 ms
+MODO_LEITURA = 'blocos'
 
 ARQUIVO_CSV = 'historico_medicoes.csv'
+# no máximo LOTE_CSV linhas / INTERVALO_FLUSH_CSV segundos se perdem numa queda
+LOTE_CSV = 50
+INTERVALO_FLUSH_CSV = 1.0
 
-rodando = True
+PASTA_DADOS = 'historico_dados'  # partições binárias por hora (relatórios por período)
 
-estado = {
-    'rpm': 0.0,
-    'temperatura': 0.0,
-    'tensao': 0.0,
-    'corrente': 0.0,
-    'ultima_linha': '',
-    'historico': [],  # lista de dicts: {ts, rpm, temperatura, tensao, corrente}
-}
+CAPACIDADE_HISTORICO = 100_000  # amostras mantidas em memória (buffer circular)
 
-lock = threading.Lock()
+# openpyxl, matplotlib e reportlab só carregam na primeira exportação; com um número,
+# são pré-carregados esse tanto de segundos depois da primeira amostra (o PDF num
+# worker do run.cpu_bound), sem atrasar a partida. None = só ao exportar
+PRE_CARREGAR_RELATORIOS = 10.0
 
+LIMITE_RPM_PERIGO = 35  # <<< AJUSTE AQUI O LIMITE DE PERIGO
+FATOR_K = 1.0           # calibração: RPM armazenado = RPM lido × K
+# alarmes avaliados a cada amostra; valores iniciais da tela de Configurações
+TOLERANCIA_RPM_PCT = 5.0     # histerese: o alarme de RPM normaliza abaixo de limite - tolerância
+LIMITE_TEMPERATURA = 80.0    # °C
+TAXA_MAX_RPM = 20.0          # RPM/s
+COMANDO_CORTE = None         # ex.: 'd8' desliga o relé do pino 8 ao passar do limite de RPM; None = só avisa
+
+JANELA_GRAFICO = 60   # pontos mantidos nos gráficos do dashboard
+INTERVALO_UI = 1.0    # segundos entre atualizações do dashboard
+INTERVALO_UI_ASYNC = 0.25  # idem no modo asyncio (só quando chegam amostras novas)
+INTERVALO_TENDENCIA = 5.0  # segundos entre atualizações do gráfico de janela longa
+INTERVALO_METRICAS = 2.0   # segundos entre atualizações da página de manutenção
+INTERVALO_CONFIG = 2.0     # segundos entre verificações de mudança no configuracao.json
+INTERVALO_BANCADAS = 1.0   # segundos entre atualizações das páginas de bancadas
+
+JANELAS_TENDENCIA = {
+    60: 'Último minuto',
+    600: 'Últimos 10 min',
+    3600: 'Última hora',
+    8 * 3600: 'Turno (8 h)',
+    24 * 3600: 'Últimas 24 h',
+}
 
-# ==========================
-# LEITURA DA SERIAL
-# ==========================
-def parse_linha(linha: str):
+rodando = True
+
+# os workers do run.cpu_bound (spawn) reimportam este arquivo como __mp_main__:
+# configuração, partições, CSV, porta e timers só existem no processo principal,
+# lá ficam só as definições
+PRINCIPAL = __name__ == '__main__'
+
+
+def eh_replay(porta: str) -> bool:
+    return porta.startswith('replay://')  # replay não grava histórico nem log de alarmes
+
+
+def regras_da_configuracao(cfg: dict):
+    return regras_padrao(cfg['limite_rpm'], cfg['tolerancia_rpm_pct'], cfg['limite_temperatura'],
+                         cfg['taxa_max_rpm'], cfg['comando_corte'] or None)
+
+
+if PRINCIPAL:
+    # valores publicados como um todo: a aquisição aplica cada versão entre duas leituras
+    configuracao = Configuracao(ARQUIVO_CONFIG, {
+        'porta_serial': PORTA_SERIAL,
+        'baudrate': BAUDRATE,
+        'tamanho_bloco': TAMANHO_BLOCO,
+        'max_linha': MAX_LINHA,
+        'lote_csv': LOTE_CSV,
+        'intervalo_flush_csv': INTERVALO_FLUSH_CSV,
+        'capacidade_historico': CAPACIDADE_HISTORICO,
+        'intervalo_ui': INTERVALO_UI_ASYNC if MODO_LEITURA == 'asyncio' else INTERVALO_UI,
+        'limite_rpm': LIMITE_RPM_PERIGO,
+        'tolerancia_rpm_pct': TOLERANCIA_RPM_PCT,
+        'limite_temperatura': LIMITE_TEMPERATURA,
+        'taxa_max_rpm': TAXA_MAX_RPM,
+        'comando_corte': COMANDO_CORTE or '',
+        'fator_k': FATOR_K,
+        'taxa_max_tx': TAXA_MAX_TX,
+        'ack_comandos': ACK_COMANDOS,
+        'protocolo': PROTOCOLO,
+    })
+    cfg = configuracao.valores
+
+    # contadores e histogramas de latência de cada estágio (/manutencao e /metrics)
+    metricas = RegistroMetricas()
+
+    armazenamento = ArmazenamentoParticionado(PASTA_DADOS)
+    gravador = GravadorCSV(ARQUIVO_CSV, cfg['lote_csv'], cfg['intervalo_flush_csv'],
+                           armazenamento=armazenamento, metricas=metricas)
+
+    REPLAY = eh_replay(cfg['porta_serial'])
+
+    # a porta é do supervisor do enlace: abre, reabre com backoff depois de uma
+    # queda, registra a lacuna no histórico em disco e serializa as escritas
+    leitor = LeitorLinhas(None, metricas=metricas)
+    enlace = SupervisorEnlace(leitor, None if REPLAY else armazenamento, metricas)
+
+    # único caminho de escrita na porta: interface e scripts pela fila (com prioridade,
+    # limite de taxa e confirmação), alarmes direto por `seguranca`
+    fila_tx = FilaComandos(enlace.escrever, cfg['taxa_max_tx'], ack=cfg['ack_comandos'], metricas=metricas)
+
+    alarmes = MotorAlarmes(
+        regras_da_configuracao(cfg),
+        enviar=fila_tx.seguranca,
+        arquivo=None if REPLAY else ARQUIVO_ALARMES,
+        metricas=metricas,
+    )
+
+    # parse -> histórico/estatísticas/rollups em memória -> alarmes -> fila do gravador;
+    # a thread serial publica sem lock e a interface só lê (ver PipelineAquisicao).
+    # `pipeline.historico` pode ser trocado (capacidade nova): sempre leia pelo pipeline
+    pipeline = PipelineAquisicao(
+        cfg['capacidade_historico'], cfg['limite_rpm'],
+        gravador=None if REPLAY else gravador,
+        metricas=metricas,
+        alarmes=alarmes,
+    )
+    pipeline.fator_k = cfg['fator_k']
+    pipeline.respostas = fila_tx.resposta   # confirmações de comando não entram como telemetria
+
+
+def aplicar_na_aquisicao(cfg: dict, leitor: LeitorLinhas):
     """
-    Espera algo no formato:
-    Modo: SMAW || RPM: 0.00 || Temperatura: 50.29 || Tensao: 1.24 || Corrente: 2.70
+    Parte da configuração que a aquisição usa a cada amostra. Roda na
+    thread serial (ou no event loop, no modo asyncio) entre duas leituras,
+    então nenhuma amostra vê metade de uma mudança.
     """
-    try:
-        partes = [p.strip() for p in linha.split("||")]
+    leitor.tamanho_bloco = cfg['tamanho_bloco']
+    leitor.max_linha = cfg['max_linha']
+    enlace.protocolo = cfg['protocolo']   # vale na próxima abertura da porta
+    replay = eh_replay(cfg['porta_serial'])
+    pipeline.gravador = None if replay else gravador
+    enlace.armazenamento = None if replay else armazenamento
+    alarmes.arquivo = None if replay else ARQUIVO_ALARMES
+    alarmes.configurar(regras_da_configuracao(cfg))
+    pipeline.configurar(cfg['capacidade_historico'], cfg['limite_rpm'], cfg['fator_k'])
 
-        dados = {}
-        for p in partes:
-            if ':' in p:
-                chave, valor = p.split(':', 1)
-                dados[chave.strip().lower()] = valor.strip()
+if PRINCIPAL:
+    # uma fotografia por tick, compartilhada por todos os dashboards abertos
+    difusor = DifusorPainel(pipeline, JANELA_GRAFICO, metricas=metricas, enlace=enlace)
 
-        rpm = float(dados.get('rpm', 0))
-        temperatura = float(dados.get('temperatura', 0))
-        tensao = float(dados.get('tensao', 0))
-        corrente = float(dados.get('corrente', 0))
+    # modo asyncio: amostras vão da tarefa de leitura aos consumidores por filas limitadas
+    barramento = BarramentoAmostras(metricas)
+aquisicao = None
 
-        return rpm, temperatura, tensao, corrente
 
-    except Exception as e:
-        print('[PARSE] Erro ao interpretar linha:', linha, '| Erro:', e)
-        return None, None, None, None
+def persistir_lote(itens):
+    for ts, amostra in itens:
+        pipeline.persistir(amostra, ts)
 
 
+async def atualizar_painel(itens):
+    difusor.tick()
+    # as amostras que chegarem enquanto isso se acumulam (fila de 1, descartando)
+    await asyncio.sleep(configuracao['intervalo_ui'])
 
-def thread_serial():
-    global rodando, serial_conn
 
-    try:
-        serial_conn = serial.Serial(PORTA_SERIAL, BAUDRATE, timeout=TIMEOUT)
-        print(f'[SERIAL] Porta {PORTA_SERIAL} aberta')
-
-        # cria CSV se não existir
-        if not os.path.exists(ARQUIVO_CSV):
-            with open(ARQUIVO_CSV, 'w', newline='') as f:
-                csv.writer(f).writerow(
-                    ['timestamp', 'rpm', 'temperatura', 'tensao', 'corrente']
-                )
+# criado no iniciar(), que só roda no processo principal
+bancadas = None
+difusores_bancadas = {}   # nome -> DifusorPainel dos gráficos de /bancada/{nome}
+
+timer_painel = None
+if PRINCIPAL and MODO_LEITURA == 'asyncio':
+    barramento.consumidor('persistencia', persistir_lote, tamanho=10_000)
+    barramento.consumidor('painel', atualizar_painel, tamanho=1, descartar=True)
+elif PRINCIPAL:
+    timer_painel = app.timer(cfg['intervalo_ui'], difusor.tick)
 
-        while rodando:
-            if serial_conn.in_waiting:
-                linha = serial_conn.readline().decode(errors='ignore').strip()
+
+# ==========================
+# LEITURA DA SERIAL
+# ==========================
+def thread_serial():
+    versao = None
+    porta = None
+
+    while rodando:
+        # configuração nova: aplicada aqui, entre duas leituras, de uma vez
+        if configuracao.versao != versao:
+            versao, cfg = configuracao.publicado
+            if (cfg['porta_serial'], cfg['baudrate'], cfg['protocolo']) != porta:
+                porta = (cfg['porta_serial'], cfg['baudrate'], cfg['protocolo'])
+                enlace.fechar('porta reconfigurada')
+            aplicar_na_aquisicao(cfg, leitor)
+
+        if not enlace.conectado:
+            if enlace.abrir(*porta[:2], TIMEOUT) is None:
+                # backoff; uma configuração nova (tela ou arquivo) acorda antes
+                configuracao.esperar(versao, timeout=enlace.espera)
+            continue
+
+        try:
+            if MODO_LEITURA == 'blocos':
+                quadros, linhas = leitor.ler()
+                chegada = time.perf_counter()
+                pipeline.processar_quadros(quadros, chegada)
+                for linha in linhas:
+                    pipeline.processar_linha(linha, chegada=chegada)
+                if not (len(quadros) or linhas) or enlace.queda is not None:
+                    enlace.vigiar()   # silêncio longo derruba; dado novo fecha a lacuna
+                continue
+
+            conexao = leitor.porta
+            if conexao.in_waiting:
+                bruto = conexao.readline()
+                leitor.bytes_lidos += len(bruto)
+                linha = bruto.decode(errors='ignore').strip()
                 if not linha:
                     continue
 
-                rpm, temperatura, tensao, corrente = parse_linha(linha)
-                ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-                with lock:
-                    estado['ultima_linha'] = linha
-                    if rpm is not None:
-                        estado['rpm'] = rpm
-                        estado['temperatura'] = temperatura
-                        estado['tensao'] = tensao
-                        estado['corrente'] = corrente
-                        estado['historico'].append({
-                            'ts': ts,
-                            'rpm': rpm,
-                            'temperatura': temperatura,
-                            'tensao': tensao,
-                            'corrente': corrente,
-                        })
-
-                if rpm is not None:
-                    with open(ARQUIVO_CSV, 'a', newline='') as f:
-                        csv.writer(f).writerow(
-                            [ts, rpm, temperatura, tensao, corrente]
-                        )
+                pipeline.processar_linha(linha, chegada=time.perf_counter())
+            else:
+                enlace.vigiar()
 
             time.sleep(0.02)
 
-    except Exception as e:
-        print('[SERIAL] ERRO:', e)
+        except Exception as e:
+            if rodando:
+                enlace.caiu(e)
+
+    enlace.fechar()
 
 
 t = threading.Thread(target=thread_serial, daemon=True)
-t.start()
+servidor_metricas = None
+
+
+def importar_csv_antigo(inicio_sessao: float):
+    # o gravador já está gravando esta sessão no CSV e nas partições: só o que veio antes
+    n = armazenamento.importar_csv(ARQUIVO_CSV, ate=inicio_sessao)
+    print(f'[DADOS] {n} linhas importadas de {ARQUIVO_CSV}')
+
+
+def configuracao_mudou(cfg: dict, mudou: set):
+    # chamado no event loop (tela de Configurações ou verificação do arquivo)
+    gravador.configurar(cfg['lote_csv'], cfg['intervalo_flush_csv'])
+    fila_tx.configurar(cfg['taxa_max_tx'], cfg['ack_comandos'])
+    if timer_painel is not None:
+        timer_painel.interval = cfg['intervalo_ui']
+    if bancadas is not None:
+        for aviso in bancadas.configurar(cfg):
+            print('[BANCADA]', aviso)
+    if aquisicao is not None:
+        # modo asyncio: a tarefa de leitura roda neste mesmo loop e só volta
+        # a ler depois deste callback, então a troca é atômica para ela
+        aplicar_na_aquisicao(cfg, aquisicao.leitor)
+        if mudou & {'porta_serial', 'baudrate', 'protocolo'}:
+            asyncio.create_task(aquisicao.reabrir(cfg['porta_serial'], cfg['baudrate']))
+    # modo thread: a thread serial vê a versão nova antes da próxima leitura
+    print(f"[CONFIG] Aplicado: {', '.join(sorted(mudou))}")
+
+
+if PRINCIPAL:
+    configuracao.observar(configuracao_mudou)
+
+
+async def pre_carregar_relatorios():
+    # espera a aquisição estar produzindo (ou desistir de esperar por ela)
+    prazo = time.monotonic() + 60
+    while rodando and pipeline.historico.total == 0 and time.monotonic() < prazo:
+        await asyncio.sleep(1.0)
+    await asyncio.sleep(PRE_CARREGAR_RELATORIOS)
+    if not rodando:
+        return
+    try:
+        excel = await run.io_bound(pre_carregar_excel)
+        pdf = await run.cpu_bound(pre_carregar_pdf)
+    except Exception as e:
+        print('[RELATORIO] ERRO no pré-carregamento:', e)
+        return
+    print(f'[RELATORIO] Pré-carregado: Excel {excel:.2f} s, PDF {pdf:.2f} s (worker)')
+
+
+def vigiar_bancadas():
+    bancadas.vigiar()
+    for d in difusores_bancadas.values():
+        d.tick()
+
+
+def iniciar():
+    global aquisicao
+    # armazenamento vazio: traz o CSV existente em segundo plano
+    if armazenamento.intervalo()[0] is None and os.path.exists(ARQUIVO_CSV):
+        # segundos inteiros: o CSV grava o ts truncado
+        threading.Thread(target=importar_csv_antigo, args=(int(time.time()),), daemon=True).start()
+    gravador.iniciar()
+    fila_tx.iniciar()
+
+    print(f'[SERIAL] Modo de leitura: {MODO_LEITURA}')
+    if MODO_LEITURA == 'asyncio':
+        cfg = configuracao.valores
+        aquisicao = AquisicaoAsync(cfg['porta_serial'], pipeline, barramento, cfg['baudrate'],
+                                   metricas, enlace=enlace)
+        aplicar_na_aquisicao(cfg, leitor)
+        aquisicao.iniciar()
+    else:
+        t.start()
+
+    app.timer(INTERVALO_CONFIG, configuracao.recarregar_se_mudou)
+    if PRE_CARREGAR_RELATORIOS is not None:
+        asyncio.create_task(pre_carregar_relatorios())
+
+    global bancadas
+    if BANCADAS:
+        cfg = configuracao.valores
+        bancadas = GerenciadorBancadas([spec_bancada(nome, endereco, cfg, PASTA_DADOS)
+                                        for nome, endereco in BANCADAS.items()])
+        bancadas.iniciar()
+        difusores_bancadas.update((b.nome, DifusorPainel(b, JANELA_GRAFICO)) for b in bancadas)
+        app.timer(INTERVALO_BANCADAS, vigiar_bancadas)
+        print(f'[BANCADA] {len(bancadas)} trabalhadores: {", ".join(BANCADAS)}')
+
+    global servidor_metricas
+    try:
+        servidor_metricas = servir_http(metricas, PORTA_METRICAS)
+        print(f'[METRICAS] Prometheus em http://127.0.0.1:{PORTA_METRICAS}/metrics')
+    except OSError as e:
+        print('[METRICAS] ERRO ao abrir o endpoint:', e)
+
+
+async def encerrar():
+    global rodando
+    rodando = False
+    if aquisicao is not None:
+        await aquisicao.parar()   # esvazia a fila de persistência antes do gravador
+    elif t.is_alive():
+        t.join(timeout=TIMEOUT + 1)
+    if bancadas is not None:
+        bancadas.parar()
+    fila_tx.parar()
+    alarmes.parar()
+    gravador.parar()
+    if servidor_metricas is not None:
+        servidor_metricas.shutdown()
+
+
+# só no processo principal (ver PRINCIPAL): a porta, o CSV e as bancadas abrem no iniciar()
+if PRINCIPAL:
+    app.on_startup(iniciar)
+    app.on_shutdown(encerrar)
 
 
 # ==========================
@@ -144,6 +420,9 @@ def menu():
         with ui.row().classes('gap-2'):
             ui.button('Dashboard', on_click=lambda: ui.navigate.to('/')) \
                 .classes('bg-primary text-white text-sm px-3 py-1 rounded-lg')
+            if BANCADAS:
+                ui.button('Bancadas', on_click=lambda: ui.navigate.to('/bancadas')) \
+                    .classes('text-primary text-sm')
             ui.button('Calibração/Testes', on_click=lambda: ui.navigate.to('/calibracao')) \
                 .classes('text-primary text-sm')
             ui.button('Relatórios', on_click=lambda: ui.navigate.to('/relatorios')) \
@@ -161,94 +440,167 @@ def menu():
 # ==========================
 # FUNÇÕES DE RELATÓRIO (EXCEL/PDF)
 # ==========================
-def gerar_excel():
-    with lock:
-        hist = estado['historico'][:]
+def formatar_ts(ts: float, fmt: str = '%Y-%m-%d %H:%M:%S') -> str:
+    return datetime.fromtimestamp(ts).strftime(fmt)
+
+
+async def exportar_excel_ui(hist: dict):
+    # gravação em blocos numa thread, com arquivo temporário único por exportação
+    progresso = {'feito': 0.0}
+    aviso = ui.notification('Gerando Excel... 0%', spinner=True, timeout=None)
+    acompanhar = ui.timer(
+        0.5, lambda: setattr(aviso, 'message', f"Gerando Excel... {progresso['feito']:.0%}")
+    )
+    arquivo = novo_arquivo('.xlsx')
+    try:
+        await run.io_bound(exportar_excel, hist, arquivo, progresso)
+    except Exception as e:
+        ui.notify(f'Erro ao gerar Excel: {e}', color='negative')
+        return
+    finally:
+        acompanhar.cancel()
+        aviso.dismiss()
+
+    ui.download(arquivo, 'relatorio.xlsx')
+
+
+async def gerar_excel():
+    hist = pipeline.historico.copia()
 
-    if not hist:
+    if not len(hist['ts']):
         return ui.notify("Sem dados para exportar!", color='negative')
 
-    df = pd.DataFrame(hist)
-    arquivo = "relatorio.xlsx"
-    df.to_excel(arquivo, index=False)
+    await exportar_excel_ui(hist)
+
+
+cache_graficos = CacheGraficos()
+
+
+async def exportar_pdf_ui(hist: dict, stats: dict, titulo: str):
+    # gráfico e PDF num processo do pool; o PNG fica em cache pela faixa de dados
+    chave = CacheGraficos.chave(hist)
+    aviso = ui.notification('Gerando PDF...', spinner=True, timeout=None)
+    arquivo = novo_arquivo('.pdf')
+    try:
+        png = await run.cpu_bound(
+            gerar_relatorio_pdf, arquivo, stats, hist, cache_graficos.obter(chave), titulo
+        )
+    except Exception as e:
+        ui.notify(f'Erro ao gerar PDF: {e}', color='negative')
+        return
+    finally:
+        aviso.dismiss()
 
-    ui.download(arquivo)
+    if png is None:  # app encerrando
+        return
+    cache_graficos.guardar(chave, png)
+    ui.download(arquivo, 'relatorio.pdf')
 
 
-def gerar_pdf():
-    with lock:
-        hist = estado['historico'][:]
+async def gerar_pdf():
+    hist = pipeline.historico.copia()
+    stats = pipeline.resumo()
 
-    if not hist:
+    if not stats['total']:
         return ui.notify("Sem dados para exportar!", color='negative')
 
-    tempos = [h['ts'] for h in hist]
-    rpms = [h['rpm'] for h in hist]
-    temperaturas = [h['temperatura'] for h in hist]
-
-    # 1) GRÁFICO PNG (RPM)
-    plt.figure(figsize=(10, 4))
-    plt.plot(rpms, linewidth=2)
-    plt.title("RPM ao longo da sessão")
-    plt.xlabel("Amostra")
-    plt.ylabel("RPM")
-    plt.grid(True, alpha=0.3)
-
-    grafico_png = "grafico_rpm.png"
-    plt.savefig(grafico_png, dpi=120, bbox_inches='tight')
-    plt.close()
-
-    # 2) CRIAR PDF
-    arquivo = "relatorio.pdf"
-    c = canvas.Canvas(arquivo)
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(50, 820, "Relatório da Sessão - Bancada de Testes")
-
-    c.setFont("Helvetica", 12)
-    c.drawString(50, 800, f"Total de registros: {len(hist)}")
-    rpm_med = sum(rpms) / len(rpms) if rpms else 0
-    temp_med = sum(temperaturas) / len(temperaturas) if temperaturas else 0
-    c.drawString(50, 785, f"RPM médio: {rpm_med:.2f}")
-    c.drawString(50, 770, f"Temperatura média: {temp_med:.2f} °C")
-
-    # 3) GRÁFICO
-    c.drawImage(grafico_png, 50, 520, width=500, height=220)
-
-    # 4) ÚLTIMOS REGISTROS
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, 500, "Últimos registros:")
-
-    c.setFont("Helvetica", 9)
-    y = 480
-    for linha in hist[-20:]:
-        text = (f"{linha['ts']}  |  RPM: {linha['rpm']:.2f}  |  "
-                f"Temp: {linha['temperatura']:.2f} °C  |  "
-                f"Tensão: {linha['tensao']:.2f} V  |  "
-                f"Corrente: {linha['corrente']:.2f} A")
-        c.drawString(50, y, text)
-        y -= 12
-        if y < 40:
-            c.showPage()
-            c.setFont("Helvetica", 9)
-            y = 820
-
-    c.save()
-
-    if os.path.exists(grafico_png):
-        os.remove(grafico_png)
-
-    ui.download(arquivo)
+    await exportar_pdf_ui(hist, stats, "Relatório da Sessão - Bancada de Testes")
+
+
+async def consultar_periodo(inicio: str, fim: str):
+    """Lê o período do banco; None (com aviso) se as datas forem inválidas ou vazio."""
+    try:
+        ini = datetime.strptime(inicio.strip(), '%Y-%m-%d %H:%M')
+        fim_ = datetime.strptime(fim.strip(), '%Y-%m-%d %H:%M')
+    except ValueError:
+        ui.notify('Use datas no formato AAAA-MM-DD HH:MM', color='negative')
+        return None
+
+    # com 'pulsos': a análise recalcula o RPM do histórico antigo a partir deles
+    hist = await run.io_bound(armazenamento.consultar, ini.timestamp(), fim_.timestamp(),
+                              COLUNAS_BANCO[1:])
+    if hist is None or not len(hist['ts']):
+        ui.notify("Sem dados no período!", color='negative')
+        return None
+    lacunas = armazenamento.lacunas(ini.timestamp(), fim_.timestamp())
+    if lacunas:
+        perdido = sum(min(f, fim_.timestamp()) - max(i, ini.timestamp()) for i, f, _ in lacunas)
+        ui.notify(f'Atenção: {len(lacunas)} queda(s) de comunicação no período '
+                  f'({perdido:.0f} s sem dados)', color='warning')
+    return hist
+
+
+async def gerar_pdf_periodo(inicio: str, fim: str):
+    hist = await consultar_periodo(inicio, fim)
+    if hist is None:
+        return
+    stats = estatisticas_de_colunas(hist, configuracao['limite_rpm'])
+    await exportar_pdf_ui(hist, stats, f"Relatório {inicio} a {fim} - Bancada de Testes")
+
+
+async def gerar_excel_periodo(inicio: str, fim: str):
+    hist = await consultar_periodo(inicio, fim)
+    if hist is not None:
+        await exportar_excel_ui(hist)
 
 # =========================
 # DASHBOARD PRINCIPAL
 # =========================
 
-LIMITE_RPM_PERIGO = 35  # <<< AJUSTE AQUI O LIMITE DE PERIGO
+_cache_tendencia = {}
+
+
+def serie_tendencia(canal: str, janela: int) -> dict:
+    """Série agregada da janela; calculada uma vez por período para todos os clientes."""
+    chave = (canal, janela, int(time.time() // INTERVALO_TENDENCIA))
+    serie = _cache_tendencia.get(chave)
+    if serie is None:
+        serie = pipeline.serie(canal, janela)
+        _cache_tendencia.clear()
+        _cache_tendencia[chave] = serie
+    return serie
+
+
+# Anexa os pontos novos aos gráficos no navegador e descarta os antigos,
+# para que o servidor envie só o delta de cada tick em vez das options inteiras.
+# Se o gráfico ainda não montou, os pontos ficam pendentes até o próximo tick.
+JS_GRAFICOS = """
+<script>
+window.supervisorioPendentes = window.supervisorioPendentes || {};
+window.supervisorioAnexar = function (id, novos, janela) {
+  const pend = window.supervisorioPendentes[id] || {x: [], y: []};
+  pend.x.push(...(novos.x || []));
+  pend.y.push(...novos.y);
+  const chart = getElement(id)?.chart;
+  if (!chart) {
+    pend.x = pend.x.slice(-janela);
+    pend.y = pend.y.slice(-janela);
+    window.supervisorioPendentes[id] = pend;
+    return;
+  }
+  delete window.supervisorioPendentes[id];
+  const opt = chart.getOption();
+  const novo = {series: [{data: opt.series[0].data.concat(pend.y).slice(-janela)}]};
+  if (novos.x) {
+    novo.xAxis = [{data: opt.xAxis[0].data.concat(pend.x).slice(-janela)}];
+  }
+  chart.setOption(novo);
+};
+</script>
+"""
+
 
 @ui.page('/')
 def dashboard():
     aplicar_tema()
     menu()
+    ui.add_head_html(JS_GRAFICOS)
+
+    # janela inicial vai nas options; depois disso só o delta é enviado
+    total, inicial = pipeline.historico.instantaneo(JANELA_GRAFICO)
+    inicial = {k: v.tolist() for k, v in inicial.items()}
+    cursor = {'total': total}
+    xs_inicial = [formatar_ts(t, '%H:%M:%S') for t in inicial['ts']]
 
     # CONTAINER PRINCIPAL OCUPA TUDO E FICA À ESQUERDA
     with ui.column().classes('p-6 gap-6 w-full items-start'):
@@ -287,11 +639,11 @@ def dashboard():
                 )
                 chart_rpm = ui.echart({
                     'tooltip': {'trigger': 'axis'},
-                    'xAxis': {'type': 'category', 'data': []},
+                    'xAxis': {'type': 'category', 'data': xs_inicial},
                     'yAxis': {'type': 'value', 'name': 'RPM'},
                     'series': [{
                         'type': 'line',
-                        'data': [],
+                        'data': inicial['rpm'],
                         'smooth': True,
                         'showSymbol': False,
                     }],
@@ -308,7 +660,7 @@ def dashboard():
                     'text-2xl font-bold text-green-600 mt-2'
                 )
                 lbl_limite = ui.label(
-                    'Limite de segurança: 50 RPM'
+                    f"Limite de segurança: {configuracao['limite_rpm']:g} RPM"
                 ).classes('text-xs text-gray-500 mt-1')
                 lbl_rpm_atual = ui.label(
                     'RPM atual: —'
@@ -324,11 +676,11 @@ def dashboard():
                 )
                 chart_temp = ui.echart({
                     'tooltip': {'trigger': 'axis'},
-                    'xAxis': {'type': 'category', 'data': []},
+                    'xAxis': {'type': 'category', 'data': xs_inicial},
                     'yAxis': {'type': 'value', 'name': '°C'},
                     'series': [{
                         'type': 'line',
-                        'data': [],
+                        'data': inicial['temperatura'],
                         'smooth': True,
                         'showSymbol': False,
                     }],
@@ -344,10 +696,52 @@ def dashboard():
                     'yAxis': {'type': 'value', 'name': 'Corrente (A)'},
                     'series': [{
                         'type': 'scatter',
-                        'data': [],
+                        'data': [list(p) for p in zip(inicial['tensao'],
+                                                      inicial['corrente'])],
                     }],
                 }).classes('h-56')
 
+        # =========================
+        # TENDÊNCIA (JANELA LONGA, AGREGADA)
+        # =========================
+        with ui.card().classes('p-4 bg-white rounded-xl shadow-sm w-full'):
+            with ui.row().classes('items-center gap-4 w-full'):
+                ui.label('Tendência').classes('text-sm font-semibold text-gray-700')
+                sel_canal = ui.select(
+                    {'rpm': 'RPM', 'temperatura': 'Temperatura',
+                     'tensao': 'Tensão', 'corrente': 'Corrente'},
+                    value='rpm',
+                ).classes('w-40')
+                sel_janela = ui.select(JANELAS_TENDENCIA, value=3600).classes('w-48')
+                lbl_resolucao = ui.label('').classes('text-xs text-gray-400')
+
+            chart_tend = ui.echart({
+                'tooltip': {'trigger': 'axis'},
+                'legend': {'data': ['mín', 'máx', 'média']},
+                'xAxis': {'type': 'time'},
+                'yAxis': {'type': 'value', 'scale': True},
+                'series': [
+                    {'name': 'mín', 'type': 'line', 'data': [], 'showSymbol': False,
+                     'lineStyle': {'opacity': 0.4}},
+                    {'name': 'máx', 'type': 'line', 'data': [], 'showSymbol': False,
+                     'lineStyle': {'opacity': 0.4}},
+                    {'name': 'média', 'type': 'line', 'data': [], 'showSymbol': False},
+                ],
+            }).classes('h-56 w-full')
+
+            def atualizar_tendencia():
+                serie = serie_tendencia(sel_canal.value, sel_janela.value)
+                ms = [t * 1000 for t in serie['ts']]
+                for i, campo in enumerate(('min', 'max', 'media')):
+                    chart_tend.options['series'][i]['data'] = [list(p) for p in zip(ms, serie[campo])]
+                chart_tend.update()
+                lbl_resolucao.text = f"resolução: {serie['resolucao']:g} s · {len(ms)} pontos"
+
+            sel_canal.on_value_change(atualizar_tendencia)
+            sel_janela.on_value_change(atualizar_tendencia)
+            atualizar_tendencia()
+            ui.timer(INTERVALO_TENDENCIA, atualizar_tendencia)
+
         # =========================
         # ÚLTIMA LINHA SERIAL
         # =========================
@@ -362,68 +756,281 @@ def dashboard():
         # =========================
         # ATUALIZAÇÃO
         # =========================
-        def atualizar():
-            with lock:
-                hist = estado['historico'][-60:]
-                ultima = estado['ultima_linha']
-
-            if not hist:
+        def mostrar_sem_dados(descricao):
+            lbl_status.text = 'SEM DADOS'
+            lbl_status.classes(add='text-orange-500', remove='text-green-600 text-red-600')
+            lbl_limite.text = f'Serial: {descricao}'
+
+        def atualizar(foto):
+            # enlace caído: os valores na tela são os últimos antes da queda
+            if foto['sem_dados']:
+                mostrar_sem_dados(foto['enlace'])
+            if not foto['n']:
+                return   # tick só de mudança no enlace: não há 'atual' nem pontos
+
+            # cursor deste cliente contra a fotografia compartilhada do tick
+            dados = difusor.dados_para(cursor, foto)
+            if dados is None:
                 return
 
-            h = hist[-1]
-            rpm = h['rpm']
+            atual = foto['atual']
+            rpm = atual['rpm']
 
             lbl_rpm.text = f'{rpm:.2f}'
-            lbl_temp.text = f'{h["temperatura"]:.2f}'
-            lbl_tensao.text = f'{h["tensao"]:.2f}'
-            lbl_corr.text = f'{h["corrente"]:.2f}'
-            lbl_ultima.text = ultima or '—'
+            lbl_temp.text = f'{atual["temperatura"]:.2f}'
+            lbl_tensao.text = f'{atual["tensao"]:.2f}'
+            lbl_corr.text = f'{atual["corrente"]:.2f}'
+            lbl_ultima.text = foto['ultima_linha'] or '—'
             lbl_rpm_atual.text = f'RPM atual: {rpm:.2f}'
 
-            if rpm > 50:
-                lbl_status.text = 'ALERTA'
-                lbl_status.classes('text-red-600')
-            else:
-                lbl_status.text = 'NORMAL'
-                lbl_status.classes('text-green-600')
+            # com o enlace caído o status fica o que mostrar_sem_dados pôs
+            if not foto['sem_dados']:
+                if foto['alerta']:
+                    lbl_status.text = 'ALERTA'
+                    lbl_status.classes(add='text-red-600', remove='text-green-600 text-orange-500')
+                    lbl_limite.text = ' | '.join(foto['alertas'])
+                else:
+                    lbl_status.text = 'NORMAL'
+                    lbl_status.classes(add='text-green-600', remove='text-red-600 text-orange-500')
+                    lbl_limite.text = f"Limite de segurança: {configuracao['limite_rpm']:g} RPM"
+
+            cliente.run_javascript(
+                f'supervisorioAnexar({chart_rpm.id}, {dados["rpm"]}, {JANELA_GRAFICO});'
+                f'supervisorioAnexar({chart_temp.id}, {dados["temperatura"]}, {JANELA_GRAFICO});'
+                f'supervisorioAnexar({chart_vi.id}, {dados["vi"]}, {JANELA_GRAFICO});'
+            )
 
-            xs = [i['ts'].split(' ')[1] for i in hist]
+        def desconectou():
+            # numa reconexão o socket novo pode chegar antes do antigo cair
+            if not cliente.has_socket_connection:
+                difusor.cancelar(cliente.id)
 
-            chart_rpm.options['xAxis']['data'] = xs
-            chart_rpm.options['series'][0]['data'] = [i['rpm'] for i in hist]
-            chart_rpm.update()
+        if enlace.queda is not None or enlace.estado != 'conectado':
+            mostrar_sem_dados(enlace.descricao())
 
-            chart_temp.options['xAxis']['data'] = xs
-            chart_temp.options['series'][0]['data'] = [i['temperatura'] for i in hist]
-            chart_temp.update()
+        cliente = ui.context.client
+        cliente.on_connect(lambda: difusor.assinar(cliente.id, atualizar))
+        cliente.on_disconnect(desconectou)
 
-            chart_vi.options['series'][0]['data'] = [
-                [i['tensao'], i['corrente']] for i in hist
-            ]
-            chart_vi.update()
 
-        ui.timer(1, atualizar)
 
+# ==========================
+# BANCADAS (VISÃO GERAL E PÁGINA POR BANCADA)
+# ==========================
+BANCADA_PRINCIPAL = 'principal'   # a bancada da porta_serial, lida neste processo
+
+
+def situacao_principal() -> dict:
+    """Mesmo formato de Bancada.situacao(), para a bancada deste processo."""
+    total, ultima = pipeline.historico.instantaneo(1)
+    return {
+        'total': total,
+        'ultima': {k: float(v[-1]) for k, v in ultima.items()} if len(ultima['ts']) else None,
+        'alertas': [r.descricao for r in alarmes.ativos],
+        'sem_dados': enlace.queda is not None or enlace.estado != 'conectado',
+        'enlace': enlace.descricao(),
+        'reconexoes': enlace.reconexoes,
+        'lacunas': enlace.n_lacunas,
+        'malformadas': pipeline.parser.malformados,
+    }
+
+
+def mostrar_situacao(lbl_status, situacao: dict):
+    if situacao['sem_dados']:
+        texto, cor = 'SEM DADOS', 'text-orange-500'
+    elif situacao['alertas']:
+        texto, cor = 'ALERTA', 'text-red-600'
+    else:
+        texto, cor = 'NORMAL', 'text-green-600'
+    lbl_status.text = texto
+    lbl_status.classes(replace=f'text-2xl font-bold mt-2 {cor}')
+
+
+@ui.page('/bancadas')
+def visao_bancadas():
+    aplicar_tema()
+    menu()
+    fontes = {BANCADA_PRINCIPAL: (configuracao['porta_serial'], situacao_principal, '/')}
+    if bancadas is not None:
+        for b in bancadas:
+            fontes[b.nome] = (b.endereco, b.situacao, f'/bancada/{b.nome}')
+
+    cartoes = {}
+    with ui.column().classes('p-6 gap-6 w-full items-start'):
+        ui.label('Bancadas — visão geral').classes('text-2xl font-semibold text-gray-800')
+        lbl_total = ui.label('').classes('text-sm text-gray-500')
+
+        with ui.grid(columns=3).classes('gap-4 w-full'):
+            for nome, (endereco, _, destino) in fontes.items():
+                with ui.card().classes('p-4 bg-white rounded-xl shadow-sm w-full cursor-pointer') \
+                        .on('click', lambda destino=destino: ui.navigate.to(destino)):
+                    ui.label(nome).classes('text-sm font-semibold text-gray-700')
+                    ui.label(endereco).classes('text-xs text-gray-400')
+                    lbl_status = ui.label('—').classes('text-2xl font-bold mt-2')
+                    lbl_valores = ui.label('').classes('text-sm text-gray-600')
+                    lbl_detalhe = ui.label('').classes('text-xs text-gray-500')
+                cartoes[nome] = (lbl_status, lbl_valores, lbl_detalhe)
+
+    anterior = {}
+
+    def atualizar():
+        agora = time.monotonic()
+        soma = 0.0
+        for nome, (lbl_status, lbl_valores, lbl_detalhe) in cartoes.items():
+            situacao = fontes[nome][1]()
+            total_ant, t_ant = anterior.get(nome, (situacao['total'], agora))
+            taxa = (situacao['total'] - total_ant) / (agora - t_ant) if agora > t_ant else 0.0
+            anterior[nome] = (situacao['total'], agora)
+            soma += taxa
+
+            mostrar_situacao(lbl_status, situacao)
+            u = situacao['ultima']
+            lbl_valores.text = (f"RPM {u['rpm']:.2f} · {u['temperatura']:.1f} °C · "
+                                f"{u['tensao']:.2f} V · {u['corrente']:.2f} A") if u else 'sem amostras'
+            lbl_detalhe.text = (' | '.join(situacao['alertas']) + ' — ' if situacao['alertas'] else '') + (
+                f"{situacao['enlace']} · {taxa:.1f} amostras/s · {situacao['total']} no total · "
+                f"{situacao['reconexoes']} reconexões · {situacao['lacunas']} lacunas")
+        lbl_total.text = f'{len(cartoes)} bancadas · {soma:,.1f} amostras/s somadas'
+
+    atualizar()
+    ui.timer(INTERVALO_BANCADAS, atualizar)
+
+
+@ui.page('/bancada/{nome}')
+def pagina_bancada(nome: str):
+    aplicar_tema()
+    menu()
+    if bancadas is None or nome not in bancadas.bancadas:
+        with ui.column().classes('p-6'):
+            ui.label(f'Bancada desconhecida: {nome}').classes('text-lg text-gray-700')
+            ui.button('Visão geral', on_click=lambda: ui.navigate.to('/bancadas')).classes('mt-2')
+        return
+    bancada = bancadas[nome]
+    difusor_bancada = difusores_bancadas[nome]
+    ui.add_head_html(JS_GRAFICOS)
+
+    # como no dashboard: janela inicial nas options, depois só o delta do difusor
+    total, inicial = bancada.historico.instantaneo(JANELA_GRAFICO)
+    cursor = {'total': total}
+    xs_inicial = [formatar_ts(t, '%H:%M:%S') for t in inicial['ts']]
+
+    def grafico(nome_y: str, canal: str):
+        return ui.echart({
+            'tooltip': {'trigger': 'axis'},
+            'xAxis': {'type': 'category', 'data': xs_inicial},
+            'yAxis': {'type': 'value', 'name': nome_y, 'scale': True},
+            'series': [{'type': 'line', 'data': inicial[canal].tolist(), 'smooth': True,
+                        'showSymbol': False}],
+        }).classes('h-56 w-full')
+
+    with ui.column().classes('p-6 gap-6 w-full items-start'):
+        ui.label(f'Bancada {nome}').classes('text-2xl font-semibold text-gray-800')
+        ui.label(bancada.endereco).classes('text-sm text-gray-500')
+
+        with ui.grid(columns=5).classes('gap-4 w-full'):
+            valores = {}
+            for canal, titulo in (('rpm', 'RPM'), ('temperatura', 'Temperatura (°C)'),
+                                  ('tensao', 'Tensão (V)'), ('corrente', 'Corrente (A)')):
+                with ui.card().classes('p-4 bg-white rounded-xl shadow-sm w-full'):
+                    ui.label(titulo).classes('text-xs uppercase text-gray-500')
+                    valores[canal] = ui.label('—').classes('text-3xl font-bold text-gray-800')
+            with ui.card().classes('p-4 bg-white rounded-xl shadow-sm w-full'):
+                ui.label('Status').classes('text-xs uppercase text-gray-500')
+                lbl_status = ui.label('—').classes('text-2xl font-bold mt-2')
+                lbl_alertas = ui.label('').classes('text-xs text-gray-500 mt-1')
+
+        with ui.grid(columns=2).classes('gap-4 w-full'):
+            with ui.card().classes('p-4 bg-white rounded-xl shadow-sm'):
+                ui.label('RPM × Tempo').classes('text-sm font-semibold text-gray-700 mb-1')
+                chart_rpm = grafico('RPM', 'rpm')
+            with ui.card().classes('p-4 bg-white rounded-xl shadow-sm'):
+                ui.label('Temperatura × Tempo').classes('text-sm font-semibold text-gray-700 mb-1')
+                chart_temp = grafico('°C', 'temperatura')
+
+        lbl_detalhe = ui.label('').classes('text-xs text-gray-500')
+
+    def atualizar():
+        situacao = bancada.situacao()
+        mostrar_situacao(lbl_status, situacao)
+        lbl_alertas.text = ' | '.join(situacao['alertas']) or situacao['enlace']
+        if situacao['ultima']:
+            for canal, lbl in valores.items():
+                lbl.text = f"{situacao['ultima'][canal]:.2f}"
+        lbl_detalhe.text = (f"Enlace: {situacao['enlace']}  |  {situacao['total']} amostras  |  "
+                            f"{situacao['reconexoes']} reconexões  |  {situacao['lacunas']} lacunas  |  "
+                            f"{situacao['malformadas']} linhas malformadas  |  "
+                            f"trabalhador reiniciado {bancada.reinicios} vez(es)")
+
+    def anexar(foto):
+        dados = difusor_bancada.dados_para(cursor, foto) if foto['n'] else None
+        if dados is None:
+            return
+        cliente.run_javascript(
+            f'supervisorioAnexar({chart_rpm.id}, {dados["rpm"]}, {JANELA_GRAFICO});'
+            f'supervisorioAnexar({chart_temp.id}, {dados["temperatura"]}, {JANELA_GRAFICO});'
+        )
+
+    def desconectou():
+        if not cliente.has_socket_connection:
+            difusor_bancada.cancelar(cliente.id)
+
+    # rótulos e estado do trabalhador por timer (mudam mesmo sem amostras novas)
+    atualizar()
+    ui.timer(INTERVALO_BANCADAS, atualizar)
+    cliente = ui.context.client
+    cliente.on_connect(lambda: difusor_bancada.assinar(cliente.id, anexar))
+    cliente.on_disconnect(desconectou)
 
 
 # ==========================
 # ENVIO DE COMANDOS SERIAL
 # ==========================
-def enviar_serial(comando: str):
-    global serial_conn
-
-    if serial_conn is None or not serial_conn.is_open:
-        ui.notify('Serial não conectada', color='negative')
+def notificar_comando(c):
+    if c.estado == 'confirmado':
+        ui.notify(f'Comando {c.texto} confirmado em {c.rtt * 1000:.1f} ms', color='positive')
+    elif c.estado == 'enviado':
+        ui.notify(f'Comando enviado: {c.texto}', color='positive')
+    elif c.estado == 'cancelado':
+        ui.notify(f'Comando {c.texto} cancelado: {c.erro}', color='warning')
+    else:
+        ui.notify(f'Erro ao enviar {c.texto}: {c.erro}', color='negative')
+
+
+async def enviar_serial(comando: str):
+    if not enlace.conectado:
+        ui.notify(f'Serial não conectada ({enlace.descricao()})', color='negative')
         return
 
+    # só enfileira: a escrita (e o flush) acontecem na thread da fila
+    c = fila_tx.enviar(comando, origem='interface')
+    await asyncio.wrap_future(c.futuro)
+    notificar_comando(c)
+
+
+async def executar_script(texto: str):
     try:
-        serial_conn.write((comando + '\n').encode())
-        serial_conn.flush()
-        print(f'[SERIAL TX] {comando}')
-        ui.notify(f'Comando enviado: {comando}', color='positive')
-    except Exception as e:
-        ui.notify(f'Erro ao enviar comando: {e}', color='negative')
+        passos = ler_script(texto or '')
+    except ValueError as e:
+        ui.notify(str(e), color='negative')
+        return
+    if not enlace.conectado:
+        ui.notify(f'Serial não conectada ({enlace.descricao()})', color='negative')
+        return
+
+    comandos = fila_tx.script(passos)
+    ui.notify(f'Script: {len(comandos)} comandos em {passos[-1][0]:.2f} s')
+    await asyncio.gather(*(asyncio.wrap_future(c.futuro) for c in comandos))
 
+    estados = [c.estado for c in comandos]
+    ok = sum(e in ('enviado', 'confirmado') for e in estados)
+    if ok == len(comandos):
+        atraso = max(max(0.0, c.enviado - c.quando) for c in comandos)
+        ui.notify(f'Script concluído: {ok} comandos, atraso máximo {atraso * 1000:.2f} ms',
+                  color='positive')
+    else:
+        ui.notify(f"Script interrompido: {ok} de {len(comandos)} enviados "
+                  f"({estados.count('cancelado')} cancelados, {estados.count('falhou')} com falha)",
+                  color='warning')
 
 
 @ui.page('/calibracao')
@@ -481,6 +1088,57 @@ def calibracao():
                     on_click=lambda: enviar_serial("d8"),
                 ).classes("bg-white text-primary border border-primary")
 
+        # =========================
+        # SCRIPT DE PINOS
+        # =========================
+        with ui.card().classes("p-4 bg-white rounded-xl shadow-sm max-w-xl w-full"):
+            ui.label("Script de pinos").classes("text-sm font-semibold text-gray-700 mb-1")
+            ui.label("Comandos l<pino>/d<pino> e esperas (200ms, 1.5s) separados por ';' ou linhas; "
+                     "os horários contam do início do script.").classes("text-xs text-gray-500")
+            script = ui.textarea(placeholder="l8; 500ms; d8; 1s; l13; 250ms; d13") \
+                .classes("w-full").props("rows=3")
+
+            with ui.row().classes("gap-2 mt-2"):
+                ui.button("▶ Executar", on_click=lambda: executar_script(script.value)) \
+                    .classes("bg-primary text-white")
+                ui.button("Cancelar", on_click=lambda: ui.notify(
+                    f"{fila_tx.cancelar_scripts()} passos cancelados")) \
+                    .classes("bg-white text-primary border border-primary")
+
+        # =========================
+        # ÚLTIMOS COMANDOS
+        # =========================
+        with ui.card().classes("p-4 bg-white rounded-xl shadow-sm max-w-xl w-full"):
+            ui.label("Últimos comandos").classes("text-sm font-semibold text-gray-700 mb-1")
+            tabela = ui.table(
+                columns=[
+                    {'name': 'hora', 'label': 'Hora', 'field': 'hora', 'align': 'left'},
+                    {'name': 'comando', 'label': 'Comando', 'field': 'comando', 'align': 'left'},
+                    {'name': 'origem', 'label': 'Origem', 'field': 'origem', 'align': 'left'},
+                    {'name': 'estado', 'label': 'Estado', 'field': 'estado', 'align': 'left'},
+                    {'name': 'envios', 'label': 'Envios', 'field': 'envios'},
+                    {'name': 'rtt', 'label': 'Ida e volta (ms)', 'field': 'rtt'},
+                    {'name': 'erro', 'label': 'Motivo', 'field': 'erro', 'align': 'left'},
+                ],
+                rows=[], row_key='id',
+            ).classes('w-full').props('dense flat')
+
+    def atualizar_comandos():
+        tabela.rows = [{
+            'id': id(c),
+            'hora': formatar_ts(c.ts, '%H:%M:%S'),
+            'comando': c.texto,
+            'origem': c.origem,
+            'estado': c.estado,
+            'envios': c.envios,
+            'rtt': '-' if c.rtt is None else f'{c.rtt * 1000:.2f}',
+            'erro': c.erro or '',
+        } for c in reversed(list(fila_tx.log)[-20:])]
+        tabela.update()
+
+    atualizar_comandos()
+    ui.timer(0.5, atualizar_comandos)
+
 
 
 @ui.page('/relatorios')
@@ -500,6 +1158,52 @@ def relatorios():
             ui.button("📄 Baixar PDF", on_click=gerar_pdf).classes("mt-1 bg-primary text-white")
             ui.button("📊 Baixar Excel (XLSX)", on_click=gerar_excel).classes("mt-2 bg-white text-primary border border-primary")
 
+        with ui.card().classes("p-4 bg-white rounded-xl shadow-sm max-w-xl"):
+            ui.label("Relatório por período").classes("text-sm font-semibold text-gray-700")
+            ui.label("Consulta o histórico gravado em disco, inclusive de sessões anteriores.") \
+                .classes("text-xs text-gray-500 mb-2")
+
+            agora = datetime.now()
+            inicio = ui.input("Início (AAAA-MM-DD HH:MM)",
+                              value=(agora - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M')).classes("w-full")
+            fim = ui.input("Fim (AAAA-MM-DD HH:MM)",
+                           value=(agora + timedelta(minutes=1)).strftime('%Y-%m-%d %H:%M')).classes("w-full")
+
+            ui.button("📄 PDF do período",
+                      on_click=lambda: gerar_pdf_periodo(inicio.value, fim.value)) \
+                .classes("mt-1 bg-primary text-white")
+            ui.button("📊 Excel do período",
+                      on_click=lambda: gerar_excel_periodo(inicio.value, fim.value)) \
+                .classes("mt-2 bg-white text-primary border border-primary")
+
+
+# grupo -> (campo, rótulo) da tela de Configurações
+CAMPOS_TELA_CONFIG = (
+    ('Comunicação', (
+        ('porta_serial', 'Porta serial / transporte'),
+        ('baudrate', 'Baud rate'),
+        ('tamanho_bloco', 'Bytes por leitura (0 = tudo)'),
+        ('max_linha', 'Tamanho máximo de linha (bytes)'),
+        ('taxa_max_tx', 'Limite de comandos por segundo (0 = sem limite)'),
+        ('ack_comandos', 'Confirmação dos comandos (regex, {comando} = enviado; vazio = sem)'),
+        ('protocolo', 'Formato do enlace (binário é negociado, com volta ao texto)'),
+    )),
+    ('Desempenho', (
+        ('lote_csv', 'Lote do CSV (linhas)'),
+        ('intervalo_flush_csv', 'Intervalo de flush do CSV (s)'),
+        ('capacidade_historico', 'Amostras em memória'),
+        ('intervalo_ui', 'Atualização do dashboard (s)'),
+    )),
+    ('Parâmetros de tolerância e ajuste', (
+        ('limite_rpm', 'Limite de RPM'),
+        ('tolerancia_rpm_pct', 'Tolerância RPM (%)'),
+        ('fator_k', 'Fator K'),
+        ('limite_temperatura', 'Limite de Temperatura (°C)'),
+        ('taxa_max_rpm', 'Variação máxima de RPM (RPM/s)'),
+        ('comando_corte', 'Comando ao passar do limite de RPM (vazio = só avisa)'),
+    )),
+)
+
 
 @ui.page('/configuracoes')
 def config():
@@ -507,18 +1211,95 @@ def config():
     menu()
     with ui.column().classes("p-6 gap-4"):
         ui.label("Configurações").classes("text-2xl font-semibold text-gray-800")
+        ui.label(f"Gravadas em {ARQUIVO_CONFIG} e aplicadas sem reiniciar a aquisição. "
+                 "Edições feitas direto no arquivo também são recarregadas.") \
+            .classes("text-sm text-gray-500")
+        if configuracao.erro:
+            ui.label(f"Arquivo inválido, valores anteriores mantidos: {configuracao.erro}") \
+                .classes("text-sm text-red-600")
+
+        cfg = configuracao.valores
+        campos = {}
+        for grupo, itens in CAMPOS_TELA_CONFIG:
+            with ui.card().classes("p-4 bg-white rounded-xl shadow-sm max-w-xl w-full"):
+                ui.label(grupo).classes("text-sm font-semibold text-gray-700 mb-2")
+                for nome, rotulo in itens:
+                    if nome in OPCOES:
+                        campos[nome] = ui.select(list(OPCOES[nome]), label=rotulo,
+                                                 value=cfg[nome]).classes("w-full")
+                    elif isinstance(cfg[nome], str):
+                        campos[nome] = ui.input(rotulo, value=cfg[nome]).classes("w-full")
+                    else:
+                        campos[nome] = ui.number(rotulo, value=cfg[nome]).classes("w-full")
+
+        def salvar():
+            try:
+                mudou = configuracao.atualizar({nome: campo.value for nome, campo in campos.items()})
+            except ValueError as e:
+                ui.notify(f"Configuração não aplicada: {e}", color='negative')
+                return
+            if mudou:
+                ui.notify(f"Aplicado e salvo: {', '.join(sorted(mudou))}", color='positive')
+                if 'capacidade_historico' in mudou and bancadas is not None:
+                    ui.notify("A capacidade do histórico das bancadas extras só muda ao "
+                              "reiniciar o supervisório", color='warning')
+            else:
+                ui.notify("Nada mudou.")
+
+        ui.button("Salvar", on_click=salvar).classes("mt-3 bg-primary text-white")
 
-        with ui.card().classes("p-4 bg-white rounded-xl shadow-sm max-w-xl"):
-            ui.label("Parâmetros de tolerância e ajuste").classes("text-sm font-semibold text-gray-700 mb-2")
 
-            tol = ui.number("Tolerância RPM (%)", value=5.0).classes("w-full")
-            k = ui.number("Fator K", value=1.0).classes("w-full mt-2")
-            lim_temp = ui.number("Limite de Temperatura (°C)", value=80.0).classes("w-full mt-2")
+def analisar_historico():
+    """Análise e série móvel do histórico em memória; None se curto demais. Roda em thread."""
+    hist = pipeline.historico.copia()
+    if len(hist['ts']) < 2:
+        return None
+    return analisar(hist), serie_movel(hist['ts'], hist['rpm'])
 
-            def salvar():
-                ui.notify("Configurações salvas (apenas em memória nesta versão).", color='positive')
 
-            ui.button("Salvar", on_click=salvar).classes("mt-3 bg-primary text-white")
+async def preencher_analise(container):
+    resultado = await run.io_bound(analisar_historico)
+    if container.is_deleted:   # o usuário saiu da página antes do fim
+        return
+    container.clear()
+    with container:
+        if resultado is None:
+            ui.label("Sem dados suficientes.").classes("text-sm text-gray-600")
+            return
+        a, movel = resultado
+        for linha in linhas_resumo(a):
+            ui.label(linha).classes("text-sm text-gray-600")
+        for ini, fim, media in reversed(a['regimes'][-5:]):
+            ui.label(
+                f"{formatar_ts(ini, '%H:%M:%S')} – {formatar_ts(fim, '%H:%M:%S')} "
+                f"({fim - ini:.0f} s): RPM {media:.2f}"
+            ).classes("text-xs text-gray-500")
+
+        horas = [formatar_ts(t, '%H:%M:%S') for t in movel['ts']]
+        ui.label(f"RPM: média móvel de {JANELA_MOVEL:g} s e faixa mín–máx").classes(
+            "text-xs text-gray-500 mt-2")
+        ui.echart({
+            'tooltip': {'trigger': 'axis'},
+            'xAxis': {'type': 'category', 'data': horas},
+            'yAxis': {'type': 'value', 'scale': True},
+            'series': [
+                {'type': 'line', 'name': nome, 'data': movel[chave], 'showSymbol': False,
+                 'lineStyle': {'width': 2 if chave == 'media' else 1}}
+                for chave, nome in (('min', 'mín'), ('media', 'média'), ('max', 'máx'))
+            ],
+        }).classes("w-full h-56")
+
+        if a['ondulacao'] is not None:
+            freqs, amplitudes = a['ondulacao']['espectro']
+            ui.label("Espectro da ondulação do RPM (trecho contínuo mais longo)").classes(
+                "text-xs text-gray-500 mt-2")
+            ui.echart({
+                'tooltip': {'trigger': 'axis'},
+                'xAxis': {'type': 'log', 'name': 'Hz'},
+                'yAxis': {'type': 'value', 'name': 'RPM'},
+                'series': [{'type': 'line', 'data': [list(p) for p in zip(freqs, amplitudes)],
+                            'showSymbol': False}],
+            }).classes("w-full h-56")
 
 
 @ui.page('/resumo')
@@ -528,25 +1309,70 @@ def resumo():
     with ui.column().classes("p-6 gap-4"):
         ui.label("Resumo da Sessão").classes("text-2xl font-semibold text-gray-800")
 
-        with lock:
-            hist = estado['historico'][:]
+        stats = pipeline.resumo()
 
-        total = len(hist)
-        rpm_med = sum(h['rpm'] for h in hist) / total if total else 0
-        temp_med = sum(h['temperatura'] for h in hist) / total if total else 0
-        tensao_med = sum(h['tensao'] for h in hist) / total if total else 0
-        corr_med = sum(h['corrente'] for h in hist) / total if total else 0
+        canais = stats['canais']
 
         with ui.card().classes("p-4 bg-white rounded-xl shadow-sm max-w-xl"):
             ui.label("Indicadores gerais").classes("text-sm font-semibold text-gray-700 mb-2")
 
-            ui.label(f"Total de registros: {total}").classes("text-sm text-gray-600")
-            ui.label(f"RPM médio: {rpm_med:.2f}").classes("text-sm text-gray-600")
-            ui.label(f"Temperatura média: {temp_med:.2f} °C").classes("text-sm text-gray-600")
-            ui.label(f"Tensão média: {tensao_med:.2f} V").classes("text-sm text-gray-600")
-            ui.label(f"Corrente média: {corr_med:.2f} A").classes("text-sm text-gray-600")
+            ui.label(f"Total de registros: {stats['total']}").classes("text-sm text-gray-600")
+            for nome, titulo, unidade in (('rpm', 'RPM', ''),
+                                          ('temperatura', 'Temperatura', ' °C'),
+                                          ('tensao', 'Tensão', ' V'),
+                                          ('corrente', 'Corrente', ' A')):
+                st = canais[nome]
+                ui.label(
+                    f"{titulo} médio: {st['media']:.2f}{unidade}  "
+                    f"(σ {st['desvio']:.2f} | mín {st['min']:.2f} | máx {st['max']:.2f})"
+                ).classes("text-sm text-gray-600")
+            ui.label(
+                f"Tempo acima de {stats['limite_rpm']:.0f} RPM: {stats['tempo_acima']:.0f} s "
+                f"de {stats['duracao']:.0f} s com dados ({stats['amostras_acima']} amostras)"
+            ).classes("text-sm text-gray-600")
             ui.label(f"CSV: {ARQUIVO_CSV}").classes("text-xs text-gray-400 mt-1")
 
+        with ui.card().classes("p-4 bg-white rounded-xl shadow-sm max-w-xl"):
+            ui.label("Análise da sessão").classes("text-sm font-semibold text-gray-700 mb-2")
+            analise_sessao = ui.column().classes("w-full gap-1")
+            with analise_sessao:
+                ui.label("Calculando…").classes("text-sm text-gray-400")
+            # a análise roda fora do loop de eventos; a página aparece antes dela
+            ui.timer(0, lambda: preencher_analise(analise_sessao), once=True)
+
+        with ui.card().classes("p-4 bg-white rounded-xl shadow-sm max-w-xl"):
+            ui.label("Comunicação").classes("text-sm font-semibold text-gray-700 mb-2")
+            ui.label(f"Serial: {enlace.descricao()}").classes(
+                "text-sm " + ("text-gray-600" if enlace.conectado else "text-orange-500"))
+            ui.label(
+                f"Reconexões: {enlace.reconexoes}  |  lacunas: {enlace.n_lacunas} "
+                f"({enlace.segundos_sem_dados:.1f} s sem dados)"
+            ).classes("text-sm text-gray-600")
+            for inicio, fim, motivo in reversed(list(enlace.lacunas)[-10:]):
+                ui.label(
+                    f"{formatar_ts(inicio, '%H:%M:%S')} – {formatar_ts(fim, '%H:%M:%S')} "
+                    f"({fim - inicio:.1f} s): {motivo}"
+                ).classes("text-xs text-gray-500")
+
+        with ui.card().classes("p-4 bg-white rounded-xl shadow-sm max-w-xl"):
+            ui.label("Alarmes").classes("text-sm font-semibold text-gray-700 mb-2")
+            ativos = alarmes.ativos
+            ui.label(
+                "Ativos: " + (', '.join(r.descricao for r in ativos) if ativos else 'nenhum')
+            ).classes("text-sm " + ("text-red-600" if ativos else "text-gray-600"))
+            for ev in reversed(list(alarmes.log)[-15:]):
+                latencia = '' if ev['latencia_ms'] is None else f" — {ev['latencia_ms']:.2f} ms"
+                comando = f" — comando {ev['comando']}" if ev['comando'] else ''
+                if ev['erro']:
+                    comando = f" — {ev['erro']}"
+                ui.label(
+                    f"{formatar_ts(ev['ts'], '%H:%M:%S')}  {ev['descricao']}: {ev['evento']} "
+                    f"({ev['valor']:.2f}){comando}{latencia}"
+                ).classes("text-xs text-gray-500")
+            if not eh_replay(configuracao['porta_serial']):
+                perdidos = f" ({alarmes.nao_gravados} eventos não gravados)" if alarmes.nao_gravados else ''
+                ui.label(f"Log: {ARQUIVO_ALARMES}{perdidos}").classes("text-xs text-gray-400 mt-1")
+
             ui.separator().classes("my-3")
 
             ui.label("Exportar relatório completo:").classes("text-xs text-gray-500 mb-1")
@@ -554,15 +1380,133 @@ def resumo():
             ui.button("📊 Baixar Excel (XLSX)", on_click=gerar_excel).classes("mt-2 bg-white text-primary border border-primary")
 
 
+# estágio do pipeline -> histograma de latência
+ESTAGIOS_METRICAS = (
+    ('Leitura', 'leitura_segundos'),
+    ('Decodificação binária (bloco)', 'decodificacao_segundos'),
+    ('Parse', 'parse_segundos'),
+    ('Armazenar', 'armazenar_segundos'),
+    ('Persistir (fila)', 'persistir_segundos'),
+    ('Alarmes (chegada → avaliação)', 'alarme_avaliacao_segundos'),
+    ('Alarmes (chegada → comando)', 'alarme_reacao_segundos'),
+    ('TX: fila até a porta', 'tx_espera_segundos'),
+    ('TX: escrita + flush', 'tx_escrita_segundos'),
+    ('TX: ida e volta (confirmação)', 'tx_rtt_segundos'),
+    ('TX: atraso de passo de script', 'tx_atraso_script_segundos'),
+    ('Gravação CSV (lote)', 'gravacao_csv_segundos'),
+    ('Gravação banco (lote)', 'gravacao_banco_segundos'),
+    ('Render (tick)', 'render_segundos'),
+    ('Fotografia (painel)', 'fotografia_segundos'),
+)
+
+
+def _us(segundos: float) -> str:
+    return f'{segundos * 1e6:,.1f}'
+
+
 @ui.page('/manutencao')
 def manutencao():
     aplicar_tema()
     menu()
-    with ui.column().classes("p-6 gap-2"):
+    with ui.column().classes("p-6 gap-4 w-full"):
         ui.label("Manutenção/Testes").classes("text-2xl font-semibold text-gray-800")
-        ui.label("Página destinada a rotinas de manutenção preventiva, testes em hardware, logs detalhados, etc.") \
+        ui.label(f"Instrumentação do pipeline. Prometheus: http://127.0.0.1:{PORTA_METRICAS}/metrics") \
             .classes("text-sm text-gray-500")
 
+        with ui.card().classes("p-4 bg-white rounded-xl shadow-sm"):
+            ui.label("Vazão e filas").classes("text-sm font-semibold text-gray-700 mb-2")
+            vazao = ui.label().classes("text-sm text-gray-600")
+            filas = ui.label().classes("text-sm text-gray-600")
+            perdas = ui.label().classes("text-sm text-gray-600")
+            comandos = ui.label().classes("text-sm text-gray-600")
+            lbl_enlace = ui.label().classes("text-sm text-gray-600")
+            lbl_binario = ui.label().classes("text-sm text-gray-600")
+            lbl_gravador = ui.label().classes("text-sm text-gray-600")
+
+        with ui.card().classes("p-4 bg-white rounded-xl shadow-sm w-full max-w-4xl"):
+            ui.label("Latência por estágio (µs)").classes("text-sm font-semibold text-gray-700 mb-2")
+            tabela = ui.table(
+                columns=[
+                    {'name': 'estagio', 'label': 'Estágio', 'field': 'estagio', 'align': 'left'},
+                    {'name': 'n', 'label': 'Eventos', 'field': 'n'},
+                    {'name': 'media', 'label': 'Média', 'field': 'media'},
+                    {'name': 'p50', 'label': 'p50', 'field': 'p50'},
+                    {'name': 'p99', 'label': 'p99', 'field': 'p99'},
+                    {'name': 'max', 'label': 'Máx', 'field': 'max'},
+                ],
+                rows=[], row_key='estagio',
+            ).classes('w-full').props('dense flat')
+
+    anterior = {}
+
+    def atualizar():
+        foto = metricas.fotografia()
+        cont = {k: v['valor'] for k, v in foto['contadores'].items()}
+        med = {k: v['valor'] for k, v in foto['medidores'].items()}
+
+        taxas = {}
+        if anterior:
+            dt = foto['ts'] - anterior['ts'] or 1.0
+            taxas = {k: (v - anterior['cont'].get(k, 0)) / dt for k, v in cont.items()}
+        anterior.update(ts=foto['ts'], cont=cont)
+
+        vazao.text = (f"Amostras/s: {taxas.get('amostras_total', 0):.1f}  |  "
+                      f"linhas/s: {taxas.get('linhas_total', 0):.1f}  |  "
+                      f"bytes/s: {taxas.get('serial_bytes_total', 0):,.0f}")
+        filas.text = (f"Backlog serial: {med.get('serial_backlog_bytes', 0)} bytes  |  "
+                      f"fila do gravador: {med.get('gravador_fila', 0)}  |  "
+                      f"dashboards abertos: {med.get('painel_clientes', 0)} "
+                      f"({cont.get('painel_falhas_total', 0)} erros de envio)")
+        perdas.text = (f"Linhas malformadas: {cont.get('linhas_malformadas_total', 0)}  |  "
+                       f"genéricas: {cont.get('linhas_genericas_total', 0)}  |  "
+                       f"descartadas (serial): {cont.get('serial_linhas_descartadas_total', 0)}  |  "
+                       f"descartadas (gravador): {cont.get('gravador_descartadas_total', 0)}  |  "
+                       f"releituras: {cont.get('releituras_total', 0)}")
+        comandos.text = (f"Comandos: {cont.get('tx_enviados_total', 0)} enviados  |  "
+                         f"{cont.get('tx_confirmados_total', 0)} confirmados  |  "
+                         f"{cont.get('tx_retransmitidos_total', 0)} retransmissões  |  "
+                         f"{cont.get('tx_falhas_total', 0)} falhas  |  "
+                         f"{cont.get('tx_cancelados_total', 0)} cancelados  |  "
+                         f"{cont.get('tx_limitados_total', 0)} esperas pelo limite de taxa  |  "
+                         f"na fila: {med.get('tx_fila', 0)}  |  "
+                         f"esperando confirmação: {med.get('tx_aguardando_ack', 0)}")
+        lbl_enlace.text = (f"Enlace: {enlace.descricao()}  |  "
+                           f"no ar há {timedelta(seconds=int(med.get('enlace_uptime_segundos', 0)))}  |  "
+                           f"{cont.get('enlace_reconexoes_total', 0)} reconexões  |  "
+                           f"{cont.get('enlace_falhas_abertura_total', 0)} falhas ao abrir  |  "
+                           f"{cont.get('enlace_lacunas_total', 0)} lacunas "
+                           f"({cont.get('enlace_sem_dados_segundos_total', 0):.1f} s sem dados, "
+                           f"{cont.get('enlace_erros_registro_lacuna_total', 0)} não gravadas)")
+        lbl_binario.text = (f"Formato: {'binário' if med.get('serial_binario') else 'texto'}  |  "
+                            f"{cont.get('binario_quadros_total', 0)} quadros binários  |  "
+                            f"{cont.get('binario_corrompidos_total', 0)} corrompidos  |  "
+                            f"{cont.get('binario_perdidos_total', 0)} amostras perdidas (numeração)")
+        if gravador.erro is not None:
+            lbl_gravador.text = (f"CSV: FALHANDO ({gravador.erro}) — "
+                                 f"{cont.get('gravador_erros_total', 0)} falhas, tentando a cada lote")
+            lbl_gravador.classes(replace="text-sm text-red-600")
+        else:
+            lbl_gravador.text = (f"CSV: gravando em {ARQUIVO_CSV}  |  "
+                                 f"{cont.get('gravador_gravadas_total', 0)} linhas  |  "
+                                 f"{cont.get('gravador_erros_total', 0)} falhas de escrita")
+            lbl_gravador.classes(replace="text-sm text-gray-600")
+
+        linhas = []
+        for titulo, nome in ESTAGIOS_METRICAS:
+            h = foto['histogramas'].get(nome)
+            if h is None:
+                continue
+            linhas.append({
+                'estagio': titulo, 'n': h['n'],
+                'media': _us(h['soma'] / h['n']) if h['n'] else '-',
+                'p50': _us(h['p50']), 'p99': _us(h['p99']), 'max': _us(h['max']),
+            })
+        tabela.rows = linhas
+        tabela.update()
+
+    atualizar()
+    ui.timer(INTERVALO_METRICAS, atualizar)
+
 
 @ui.page('/ajuda')
 def ajuda():
@@ -581,7 +1525,6 @@ Desenvolvido em Python + NiceGUI.
 # ==========================
 # EXECUÇÃO
 # ==========================
-ui.run(title='Supervisório Bancada', reload=False)
-
-rodando = False
-t.join(timeout=1)
+if PRINCIPAL:
+    run.process_pool_start_method = 'spawn'
+    ui.run(title='Supervisório Bancada', reload=False)
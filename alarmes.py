@@ -0,0 +1,265 @@
+import csv
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from metricas import RegistroMetricas
+
+# ==========================
+# MOTOR DE ALARMES
+# ==========================
+TAMANHO_LOG = 1000
+ARQUIVO_ALARMES = 'alarmes.csv'
+CABECALHO_ALARMES = ['timestamp', 'regra', 'canal', 'evento', 'valor', 'limite',
+                     'latencia_ms', 'comando']
+
+# limites (s) da latência de reação: 10 µs .. 1 s
+LIMITES_REACAO = tuple(m * 10.0 ** e for e in range(-5, 0) for m in (1, 2, 5)) + (1.0,)
+
+_INDICE_CANAL = {'rpm': 0, 'temperatura': 1, 'tensao': 2, 'corrente': 3}
+
+
+class RegraAlarme:
+    """
+    Uma regra sobre um canal:
+
+    - 'acima' / 'abaixo': valor passa do `limite`; só normaliza depois de
+      voltar `histerese` unidades para dentro (sem ficar piscando na borda).
+    - 'taxa': |variação| por segundo, medida em `janela` segundos, passa do
+      `limite`; normaliza abaixo de `limite - histerese`. A referência é o
+      ponto mais novo com pelo menos `janela` segundos de idade, então a
+      taxa sai mesmo com amostras espaçadas de `janela` (firmware a ~1 Hz).
+
+    `amostras` seguidas fora do limite são exigidas para ativar (filtro de
+    ruído). `comando` (ex.: 'd8', desliga o relé do pino 8) é enviado na
+    própria thread de aquisição no instante em que a regra ativa.
+    """
+
+    def __init__(self, nome: str, canal: str, tipo: str, limite: float,
+                 histerese: float = 0.0, comando: str | None = None,
+                 amostras: int = 1, janela: float = 1.0, descricao: str = ''):
+        if canal not in _INDICE_CANAL:
+            raise ValueError(f'canal desconhecido: {canal}')
+        if tipo not in ('acima', 'abaixo', 'taxa'):
+            raise ValueError(f'tipo de regra desconhecido: {tipo}')
+        self.nome = nome
+        self.canal = canal
+        self.tipo = tipo
+        self.limite = limite
+        self.histerese = histerese
+        self.comando = comando
+        self.amostras = amostras
+        self.janela = janela
+        self.descricao = descricao or nome
+
+        self.ativa = False
+        self._fora = 0
+        self._pontos = deque()   # (ts, valor) da janela, só para 'taxa'
+
+    def _medida(self, ts: float, valor: float):
+        if self.tipo != 'taxa':
+            return valor
+        pontos = self._pontos
+        pontos.append((ts, valor))
+        # mantém um ponto com `janela` s ou mais de idade, se houver
+        while len(pontos) > 1 and ts - pontos[1][0] >= self.janela:
+            pontos.popleft()
+        ts0, v0 = pontos[0]
+        if ts - ts0 < self.janela / 2 or ts <= ts0:
+            return None   # janela curta demais: ruído vira taxa enorme
+        return abs(valor - v0) / (ts - ts0)
+
+    def avaliar(self, ts: float, valor: float):
+        """Devolve 'ativou', 'normalizou' ou None."""
+        medida = self._medida(ts, valor)
+        if medida is None or medida != medida:   # sem janela ainda, ou NaN
+            return None
+
+        if self.tipo == 'abaixo':
+            fora = medida < self.limite
+            dentro = medida > self.limite + self.histerese
+        else:
+            fora = medida > self.limite
+            dentro = medida < self.limite - self.histerese
+
+        if not self.ativa:
+            self._fora = self._fora + 1 if fora else 0
+            if self._fora >= self.amostras:
+                self.ativa = True
+                self._fora = 0
+                return 'ativou'
+        elif dentro:
+            self.ativa = False
+            return 'normalizou'
+        return None
+
+
+def regras_padrao(limite_rpm: float, tolerancia_pct: float = 5.0,
+                  limite_temperatura: float = 80.0, taxa_rpm: float = 20.0,
+                  comando_corte: str | None = None) -> list[RegraAlarme]:
+    """Regras da bancada a partir dos limites da tela de Configurações."""
+    return [
+        RegraAlarme('rpm_perigo', 'rpm', 'acima', limite_rpm,
+                    histerese=limite_rpm * tolerancia_pct / 100, comando=comando_corte,
+                    descricao=f'RPM acima de {limite_rpm:g}'),
+        RegraAlarme('temperatura_alta', 'temperatura', 'acima', limite_temperatura,
+                    histerese=2.0, amostras=3,
+                    descricao=f'Temperatura acima de {limite_temperatura:g} °C'),
+        RegraAlarme('rpm_variacao', 'rpm', 'taxa', taxa_rpm, histerese=taxa_rpm * 0.2,
+                    janela=1.0, descricao=f'RPM variando mais de {taxa_rpm:g}/s'),
+    ]
+
+
+class MotorAlarmes:
+    """
+    Avalia as regras a cada amostra, dentro do caminho de aquisição
+    (PipelineAquisicao.armazenar), e não na atualização da interface.
+
+    Latência medida a partir da chegada do quadro (perf_counter tomado
+    quando o bloco saiu da porta): `alarme_avaliacao_segundos` para toda
+    amostra e `alarme_reacao_segundos` até o comando ter sido escrito na
+    porta. `enviar(comando)` é chamado de forma síncrona na thread (ou
+    tarefa) de aquisição, então a reação fica limitada ao tempo de uma
+    amostra mais a escrita.
+
+    Os eventos ficam em `log` (últimos `tamanho_log`) e, se
+    `arquivo` for dado, também são acrescentados num CSV por uma thread
+    própria (iniciada no primeiro evento): a aquisição só enfileira e
+    nunca espera pelo disco. `parar()` grava o que estiver na fila.
+    Um comando que a porta recusa fica no evento ('erro') e em
+    `falhas_envio`; eventos que o disco recusou, em `nao_gravados`.
+    """
+
+    def __init__(self, regras, enviar=None, arquivo: str | None = None,
+                 tamanho_log: int = TAMANHO_LOG, metricas: RegistroMetricas | None = None):
+        self.regras = list(regras)
+        self.enviar = enviar
+        self.arquivo = arquivo
+        self.log = deque(maxlen=tamanho_log)
+        self.ativados = 0
+        self.falhas_envio = 0        # comandos de alarme que a porta recusou
+        self.nao_gravados = 0        # eventos que não entraram no CSV
+        self._fila = queue.SimpleQueue()
+        self._thread = None
+
+        m = metricas if metricas is not None else RegistroMetricas()
+        m.medidor('alarmes_ativos', 'Regras de alarme ativas', lambda: len(self.ativos))
+        m.medidor('alarmes_ativados_total', 'Ativações de alarme', lambda: self.ativados, 'counter')
+        m.medidor('alarmes_falhas_envio_total', 'Comandos de alarme que não saíram pela porta',
+                  lambda: self.falhas_envio, 'counter')
+        m.medidor('alarmes_nao_gravados_total', 'Eventos de alarme que não foram gravados no CSV',
+                  lambda: self.nao_gravados, 'counter')
+        self._h_avaliacao = m.histograma('alarme_avaliacao_segundos',
+                                         'Chegada do quadro até as regras avaliadas', LIMITES_REACAO)
+        self._h_reacao = m.histograma('alarme_reacao_segundos',
+                                      'Chegada do quadro até o comando escrito na porta', LIMITES_REACAO)
+
+    @property
+    def ativos(self) -> list[RegraAlarme]:
+        return [r for r in self.regras if r.ativa]
+
+    def configurar(self, regras):
+        """
+        Troca o conjunto de regras de uma vez (uma atribuição; a avaliação
+        em curso termina com a lista antiga). Regras com o mesmo nome herdam
+        o estado da anterior, então um alarme ativo continua ativo e a
+        janela de taxa não recomeça. Chamar na thread de aquisição.
+        """
+        anteriores = {r.nome: r for r in self.regras}
+        regras = list(regras)
+        for regra in regras:
+            antiga = anteriores.get(regra.nome)
+            if antiga is not None and antiga.tipo == regra.tipo:
+                regra.ativa = antiga.ativa
+                regra._fora = antiga._fora
+                regra._pontos = antiga._pontos
+        self.regras = regras
+
+    def avaliar(self, ts: float, valores, chegada: float | None = None):
+        """`valores`: (rpm, temperatura, tensao, corrente); `chegada`: perf_counter do quadro."""
+        for regra in self.regras:
+            evento = regra.avaliar(ts, valores[_INDICE_CANAL[regra.canal]])
+            if evento is not None:
+                self._registrar(regra, evento, ts, valores, chegada)
+        if chegada is not None:
+            self._h_avaliacao.observar(time.perf_counter() - chegada)
+
+    def _registrar(self, regra, evento, ts, valores, chegada):
+        comando = erro = None
+        if evento == 'ativou':
+            self.ativados += 1
+            if regra.comando and self.enviar is not None:
+                try:
+                    self.enviar(regra.comando)
+                    comando = regra.comando
+                except Exception as e:
+                    self.falhas_envio += 1
+                    erro = f'{regra.comando} não enviado: {e}'
+
+        latencia = None
+        if chegada is not None:
+            latencia = time.perf_counter() - chegada
+            if comando is not None:
+                self._h_reacao.observar(latencia)
+
+        registro = {
+            'ts': ts,
+            'regra': regra.nome,
+            'descricao': regra.descricao,
+            'canal': regra.canal,
+            'evento': evento,
+            'valor': valores[_INDICE_CANAL[regra.canal]],
+            'limite': regra.limite,
+            'latencia_ms': None if latencia is None else latencia * 1000,
+            'comando': comando,
+            'erro': erro,
+        }
+        self.log.append(registro)
+        if self.arquivo is not None:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._rodar_gravacao, daemon=True)
+                self._thread.start()
+            self._fila.put(registro)
+
+    def parar(self, timeout: float | None = 5):
+        """Grava os eventos ainda na fila e encerra a thread do CSV."""
+        if self._thread is not None:
+            self._fila.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _rodar_gravacao(self):
+        while True:
+            registro = self._fila.get()
+            if registro is None:
+                return
+            lote = [registro]
+            # o que mais já estiver na fila vai na mesma abertura do arquivo
+            while True:
+                try:
+                    registro = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if registro is None:
+                    self._gravar(lote)
+                    return
+                lote.append(registro)
+            self._gravar(lote)
+
+    def _gravar(self, lote: list[dict]):
+        try:
+            novo = not os.path.exists(self.arquivo)
+            with open(self.arquivo, 'a', newline='') as f:
+                escritor = csv.writer(f)
+                if novo:
+                    escritor.writerow(CABECALHO_ALARMES)
+                escritor.writerows([
+                    time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r['ts'])),
+                    r['regra'], r['canal'], r['evento'], f"{r['valor']:.3f}", r['limite'],
+                    '' if r['latencia_ms'] is None else f"{r['latencia_ms']:.3f}",
+                    r['comando'] or '',
+                ] for r in lote)
+        except OSError:
+            self.nao_gravados += len(lote)   # continuam em `log`
@@ -0,0 +1,327 @@
+import numpy as np
+
+from estatisticas import LACUNA_MAX
+
+# ==========================
+# ANÁLISE VETORIZADA (SESSÃO E HISTÓRICO)
+# ==========================
+# Funções sobre as colunas do histórico (dict de arrays float64 com 'ts' e
+# os canais, como devolvem HistoricoCircular.copia() e
+# ArmazenamentoParticionado.consultar()). Nenhum laço Python por amostra:
+# janelas por tempo viram índices com searchsorted e somas com cumsum.
+# NaN (canal ausente na gravação) é ignorado. Numa sessão de 1 milhão de
+# amostras o custo é dominado por passadas inteiras pelos arrays (alguns ms
+# cada num PC fraco), então cada análise faz o mínimo delas: o regime
+# trabalha em baldes de tempo, o espectro num trecho limitado e as séries
+# para gráfico só nos pontos que serão desenhados.
+PULSOS_POR_VOLTA = 6     # marcas no disco do sensor
+JANELA_PULSOS = 4.0      # s; o firmware antigo contava em janelas de 4 s (rpm = pulsos × 2,5)
+JANELA_MOVEL = 10.0      # s, estatísticas móveis e detecção de regime
+TOLERANCIA_REGIME_PCT = 2.0   # desvio / média da janela abaixo disso = regime permanente
+DURACAO_MIN_REGIME = 30.0     # s
+FREQ_MIN_ONDULACAO = 0.01     # Hz; abaixo disso é tendência, não ondulação
+PONTOS_GRAFICO = 400     # pontos das séries prontas para gráfico (tela e relatórios)
+BALDES_POR_JANELA = 10   # resolução da detecção de regime: janela_s / 10
+MAX_PONTOS_ESPECTRO = 1 << 16   # pontos da FFT; a 10 Hz são ~1,8 h, resolução bem abaixo de FREQ_MIN
+
+
+def inicios_janela(ts: np.ndarray, janela_s: float) -> np.ndarray:
+    """Para cada amostra i, o índice da primeira amostra em (ts[i] - janela_s, ts[i]]."""
+    return np.searchsorted(ts, ts - janela_s, side='right')
+
+
+def _somas_janela(x: np.ndarray, ini: np.ndarray) -> np.ndarray:
+    """Soma de x[ini[i]:i + 1] para cada i, por diferença de somas acumuladas."""
+    acumulada = np.concatenate(([0.0], np.cumsum(x)))
+    return acumulada[1:] - acumulada[ini]
+
+
+def rpm_de_pulsos(ts: np.ndarray, pulsos: np.ndarray, pulsos_por_volta: float = PULSOS_POR_VOLTA,
+                  janela_s: float = JANELA_PULSOS) -> np.ndarray:
+    """
+    RPM a partir da contagem de pulsos: cada registro traz os pulsos desde
+    o anterior. Soma os pulsos dos registros em (ts - janela_s, ts] e
+    divide pelo tempo desde o registro que antecede a janela. NaN enquanto
+    a janela começa no primeiro registro (sem início conhecido) e onde não
+    há pulsos.
+    """
+    ini = inicios_janela(ts, janela_s)
+    validos = ~np.isnan(pulsos)
+    if validos.all():   # caso comum: dispensa a segunda soma acumulada
+        soma = _somas_janela(pulsos, ini)
+    else:
+        soma = _somas_janela(np.where(validos, pulsos, 0.0), ini)
+        soma[_somas_janela(validos.astype(np.float64), ini) == 0] = np.nan
+    decorrido = ts - ts[ini - 1]
+    decorrido[ini == 0] = np.nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return soma * (60.0 / pulsos_por_volta) / decorrido
+
+
+def potencia(tensao: np.ndarray, corrente: np.ndarray) -> np.ndarray:
+    """Potência elétrica instantânea (W)."""
+    return tensao * corrente
+
+
+def energia(ts: np.ndarray, potencia_w: np.ndarray, lacuna_max: float = LACUNA_MAX) -> np.ndarray:
+    """
+    Energia acumulada (J) até cada amostra, pela regra do trapézio. Os
+    intervalos maiores que `lacuna_max` (enlace caído) e os que têm
+    potência NaN não somam.
+    """
+    if len(ts) < 2:
+        return np.zeros(len(ts))
+    dt = np.diff(ts)
+    trechos = 0.5 * (potencia_w[1:] + potencia_w[:-1]) * dt
+    trechos[(dt > lacuna_max) | np.isnan(trechos)] = 0.0
+    return np.concatenate(([0.0], np.cumsum(trechos)))
+
+
+def reamostrar(ts: np.ndarray, x: np.ndarray, dt: float | None = None):
+    """(ts, x) numa grade uniforme de passo `dt` (padrão: mediana dos intervalos), por interpolação."""
+    validos = ~np.isnan(x)
+    ts, x = ts[validos], x[validos]
+    if len(ts) < 2:
+        return ts, x
+    if dt is None:
+        dt = float(np.median(np.diff(ts)))
+    if dt <= 0:
+        return ts[:0], x[:0]
+    grade = np.arange(ts[0], ts[-1], dt)
+    return grade, np.interp(grade, ts, x)
+
+
+def _sem_tendencia(ts: np.ndarray, x: np.ndarray, dt: float | None = None):
+    """Grade uniforme e o resíduo de `x` depois de tirar a reta ajustada."""
+    grade, y = reamostrar(ts, x, dt)
+    if len(grade) < 4:
+        return grade[:0], y[:0]
+    # mínimos quadrados da reta em forma fechada (polyfit monta a matriz de Vandermonde)
+    t = grade - grade[0]
+    t_medio, y_medio = t.mean(), y.mean()
+    dt = t - t_medio
+    inclinacao = np.dot(dt, y - y_medio) / np.dot(dt, dt)
+    return grade, y - y_medio - inclinacao * dt
+
+
+def _amplitudes(grade: np.ndarray, residuo: np.ndarray):
+    if len(grade) < 4:
+        return np.empty(0), np.empty(0)
+    janela = np.hanning(len(residuo))
+    # completa com zeros até potência de 2: a FFT de um tamanho primo grande é dezenas de vezes mais lenta
+    tamanho = 1 << (len(residuo) - 1).bit_length()
+    amplitude = 2.0 * np.abs(np.fft.rfft(residuo * janela, tamanho)) / janela.sum()
+    return np.fft.rfftfreq(tamanho, grade[1] - grade[0]), amplitude
+
+
+def espectro(ts: np.ndarray, x: np.ndarray, dt: float | None = None):
+    """
+    Espectro de amplitude de `x` (frequências em Hz, amplitude na unidade
+    de `x`): reamostra em grade uniforme, tira a tendência linear e aplica
+    janela de Hann antes da FFT real.
+    """
+    return _amplitudes(*_sem_tendencia(ts, x, dt))
+
+
+def trecho_continuo(ts: np.ndarray, lacuna_max: float = LACUNA_MAX) -> slice:
+    """O trecho mais longo sem intervalos acima de `lacuna_max` entre amostras."""
+    limites = np.concatenate(([0], np.flatnonzero(np.diff(ts) > lacuna_max) + 1, [len(ts)]))
+    k = int(np.argmax(np.diff(limites)))
+    return slice(int(limites[k]), int(limites[k + 1]))
+
+
+def ondulacao(ts: np.ndarray, x: np.ndarray, freq_min: float = FREQ_MIN_ONDULACAO,
+              lacuna_max: float = LACUNA_MAX) -> dict | None:
+    """
+    Componente dominante da ondulação de `x` e o RMS dela em % da média,
+    no trecho contínuo mais longo (interpolar por cima de uma queda
+    inventaria uma rampa), limitado aos últimos MAX_PONTOS_ESPECTRO
+    pontos; None se curto demais ou constante.
+    """
+    validos = ~np.isnan(x)
+    ts, x = ts[validos], x[validos]
+    if len(ts) < 16:
+        return None
+    trecho = trecho_continuo(ts, lacuna_max)
+    ts, x = ts[trecho][-MAX_PONTOS_ESPECTRO:], x[trecho][-MAX_PONTOS_ESPECTRO:]
+    if len(ts) < 16:
+        return None
+    # sem lacunas no trecho, o passo médio serve de grade (a mediana exigiria ordenar)
+    grade, residuo = _sem_tendencia(ts, x, (ts[-1] - ts[0]) / (len(ts) - 1))
+    freqs, amplitude = _amplitudes(grade, residuo)
+    acima = freqs >= freq_min
+    if not np.any(amplitude[acima] > 0):
+        return None   # sinal constante
+    i = int(np.argmax(np.where(acima, amplitude, -1.0)))
+    media = float(x.mean())
+    rms = float(residuo.std())
+    return {
+        'duracao': float(ts[-1] - ts[0]),
+        'espectro': espectro_log(freqs, amplitude, freq_min=freq_min),
+        'frequencia': float(freqs[i]),
+        'periodo': 1.0 / float(freqs[i]),
+        'amplitude': float(amplitude[i]),
+        'rms': rms,
+        'rms_pct': 100.0 * rms / abs(media) if media else 0.0,
+    }
+
+
+def espectro_log(freqs: np.ndarray, amplitude: np.ndarray, pontos: int = PONTOS_GRAFICO,
+                 freq_min: float = FREQ_MIN_ONDULACAO) -> tuple[list, list]:
+    """Espectro em até `pontos` faixas de largura logarítmica (o máximo de cada), para eixo log."""
+    if len(freqs) < 2 or freqs[-1] <= freq_min:
+        return [], []
+    bordas = np.searchsorted(freqs, np.geomspace(freq_min, freqs[-1], pontos + 1))
+    inicios = bordas[:-1][bordas[1:] > bordas[:-1]]
+    return freqs[inicios].tolist(), np.maximum.reduceat(amplitude, inicios).tolist()
+
+
+def serie_movel(ts: np.ndarray, x: np.ndarray, janela_s: float = JANELA_MOVEL,
+                pontos: int = PONTOS_GRAFICO) -> dict:
+    """
+    Estatísticas móveis de `x` em até `pontos` instantes espaçados, para
+    gráfico: só as janelas desenhadas são calculadas (um laço por ponto do
+    gráfico, não por amostra).
+    """
+    serie = {'ts': [], 'media': [], 'desvio': [], 'min': [], 'max': []}
+    if not len(ts):
+        return serie
+    idx = np.unique(np.linspace(0, len(ts) - 1, pontos).astype(np.int64))
+    inicios = np.searchsorted(ts, ts[idx] - janela_s, side='right')
+    for i, a in zip(idx.tolist(), inicios.tolist()):
+        janela = x[a:i + 1]
+        janela = janela[~np.isnan(janela)]
+        serie['ts'].append(float(ts[i]))
+        if not len(janela):
+            for nome in ('media', 'desvio', 'min', 'max'):
+                serie[nome].append(None)
+            continue
+        serie['media'].append(float(janela.mean()))
+        serie['desvio'].append(float(janela.std(ddof=1)) if len(janela) > 1 else None)
+        serie['min'].append(float(janela.min()))
+        serie['max'].append(float(janela.max()))
+    return serie
+
+
+def _baldes(ts: np.ndarray, x: np.ndarray, largura: float):
+    """
+    Agrega `x` em baldes de `largura` s contados a partir de ts[0] (só os
+    que têm amostras). Devolve o número de cada balde, o índice da sua
+    primeira amostra, e n, soma e soma dos quadrados de x - referencia
+    por balde, mais a referencia (média geral, para não perder precisão).
+    """
+    chave = ((ts - ts[0]) // largura).astype(np.int64)
+    inicios = np.flatnonzero(np.concatenate(([True], chave[1:] != chave[:-1])))
+    validos = ~np.isnan(x)
+    referencia = float(x[validos].mean()) if validos.any() else 0.0
+    centrado = np.where(validos, x - referencia, 0.0)
+    n = np.add.reduceat(validos.astype(np.float64), inicios)
+    s1 = np.add.reduceat(centrado, inicios)
+    s2 = np.add.reduceat(centrado * centrado, inicios)
+    return chave[inicios], inicios, n, s1, s2, referencia
+
+
+def regime_permanente(ts: np.ndarray, x: np.ndarray, janela_s: float = JANELA_MOVEL,
+                      tolerancia_pct: float = TOLERANCIA_REGIME_PCT,
+                      duracao_min: float = DURACAO_MIN_REGIME,
+                      lacuna_max: float = LACUNA_MAX) -> list:
+    """
+    Trechos (início, fim, média) em que `x` ficou estável: desvio da janela
+    móvel até `tolerancia_pct` da média, por pelo menos `duracao_min`
+    segundos; uma lacuna maior que `lacuna_max` encerra o trecho. A janela
+    anda em baldes de janela_s / BALDES_POR_JANELA: as somas são feitas uma
+    vez por balde e o resto do cálculo roda sobre os baldes, não sobre as
+    amostras.
+    """
+    if len(ts) < 3:
+        return []
+    chave, inicios, n, s1, s2, referencia = _baldes(ts, x, janela_s / BALDES_POR_JANELA)
+    # janela do balde j: os baldes com chave em (chave[j] - BALDES_POR_JANELA, chave[j]]
+    ini = np.searchsorted(chave, chave - BALDES_POR_JANELA, side='right')
+    acum = [np.concatenate(([0.0], np.cumsum(v))) for v in (n, s1, s2)]
+    jn, j1, j2 = (a[1:] - a[ini] for a in acum)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = j1 / jn
+        variancia = (j2 - j1 * media) / (jn - 1)
+        estavel = (jn >= 3) & (variancia <= ((media + referencia) * tolerancia_pct / 100.0) ** 2)
+    # o balde logo depois de uma lacuna não é estável: o trecho recomeça nele
+    estavel[1:] &= ts[inicios[1:]] - ts[inicios[1:] - 1] <= lacuna_max
+    # janelas estáveis consecutivas [a, b) (em baldes): o trecho vai do primeiro
+    # balde da janela a até o último balde b - 1
+    bordas = np.flatnonzero(np.diff(np.concatenate(([0], estavel.astype(np.int8), [0]))))
+    primeiro, fim = ini[bordas[::2]], bordas[1::2]
+    if not len(fim):
+        return []
+    # trechos que se sobrepõem (a janela do seguinte começa antes do fim do anterior) viram um só
+    novo = np.concatenate(([True], primeiro[1:] >= fim[:-1]))
+    primeiro = primeiro[novo]
+    fim = fim[np.concatenate((np.flatnonzero(novo)[1:] - 1, [len(fim) - 1]))]
+    fins_amostra = np.concatenate((inicios[1:], [len(ts)]))   # balde j vai até fins_amostra[j] - 1
+    t0, t1 = ts[inicios[primeiro]], ts[fins_amostra[fim - 1] - 1]
+    longos = t1 - t0 >= duracao_min
+    primeiro, fim = primeiro[longos], fim[longos]
+    soma = acum[1][fim] - acum[1][primeiro]
+    contagem = np.maximum(acum[0][fim] - acum[0][primeiro], 1)
+    media = referencia + soma / contagem
+    return list(zip(t0[longos].tolist(), t1[longos].tolist(), media.tolist()))
+
+
+def analisar(colunas: dict, janela_s: float = JANELA_MOVEL,
+             pulsos_por_volta: float = PULSOS_POR_VOLTA, janela_pulsos: float = JANELA_PULSOS) -> dict:
+    """
+    Indicadores derivados de uma sessão ou período, para o Resumo e os
+    relatórios: potência e energia, ondulação do RPM, trechos em regime
+    permanente e, se houver a coluna 'pulsos', o RPM recalculado a partir
+    deles.
+    """
+    ts = colunas['ts']
+    rpm = colunas['rpm']
+    p = potencia(colunas['tensao'], colunas['corrente'])
+    e = energia(ts, p)
+    validos = ~np.isnan(p)
+    regimes = regime_permanente(ts, rpm, janela_s)
+    duracao = float(ts[-1] - ts[0]) if len(ts) > 1 else 0.0
+    tempo_regime = sum(fim - ini for ini, fim, _ in regimes)
+
+    resultado = {
+        'n': len(ts),
+        'duracao': duracao,
+        'potencia_media': float(p[validos].mean()) if validos.any() else 0.0,
+        'potencia_max': float(p[validos].max()) if validos.any() else 0.0,
+        'energia_j': float(e[-1]) if len(e) else 0.0,
+        'energia_wh': float(e[-1]) / 3600.0 if len(e) else 0.0,
+        'ondulacao': ondulacao(ts, rpm),
+        'regimes': regimes,
+        'tempo_regime': tempo_regime,
+        'fracao_regime': tempo_regime / duracao if duracao else 0.0,
+        'rpm_pulsos': None,
+    }
+
+    pulsos = colunas.get('pulsos')
+    if pulsos is not None and not np.isnan(pulsos).all():
+        r = rpm_de_pulsos(ts, pulsos, pulsos_por_volta, janela_pulsos)
+        ok = ~np.isnan(r)
+        resultado['rpm_pulsos'] = {
+            'media': float(r[ok].mean()) if ok.any() else 0.0,
+            'max': float(r[ok].max()) if ok.any() else 0.0,
+            'pulsos_por_volta': pulsos_por_volta,
+            'janela': janela_pulsos,
+        }
+    return resultado
+
+
+def linhas_resumo(a: dict) -> list[str]:
+    """Texto dos indicadores de `analisar`, igual na tela e nos relatórios."""
+    linhas = [f"Potência média: {a['potencia_media']:.2f} W (máx {a['potencia_max']:.2f} W)  |  "
+              f"energia: {a['energia_wh']:.3f} Wh"]
+    o = a['ondulacao']
+    if o is not None:
+        linhas.append(f"Ondulação do RPM: {o['rms_pct']:.1f} % RMS, dominante em "
+                      f"{o['frequencia']:.3f} Hz (período {o['periodo']:.1f} s, ±{o['amplitude']:.2f})")
+    linhas.append(f"Regime permanente: {len(a['regimes'])} trecho(s), {a['tempo_regime']:.0f} s "
+                  f"({a['fracao_regime']:.0%} do tempo)")
+    r = a['rpm_pulsos']
+    if r is not None:
+        linhas.append(f"RPM pelos pulsos ({r['pulsos_por_volta']:g}/volta, janela {r['janela']:g} s): "
+                      f"médio {r['media']:.2f}, máx {r['max']:.2f}")
+    return linhas
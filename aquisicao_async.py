@@ -0,0 +1,242 @@
+import asyncio
+import inspect
+import time
+
+from leitor_serial import LeitorLinhas
+from enlace import EnlaceMudo, SupervisorEnlace, eh_local
+from metricas import RegistroMetricas
+from transporte import _TransporteGerado
+
+# ==========================
+# AQUISIÇÃO NO EVENT LOOP (ASYNCIO)
+# ==========================
+TAMANHO_LEITURA = 1 << 16
+INTERVALO_SEM_FD = 0.01   # s; portas sem fileno (Windows) são consultadas nesse ritmo
+
+
+class BarramentoAmostras:
+    """
+    Entrega cada amostra publicada a consumidores assíncronos, cada um com
+    a sua fila limitada e a sua tarefa no event loop.
+
+    - `descartar=False` (persistência, alarmes): fila cheia faz `publicar`
+      esperar, ou seja, a leitura da porta para até o consumidor alcançar
+      (backpressure; o atraso aparece no backlog da serial).
+    - `descartar=True` (painel): fila cheia joga fora a amostra mais antiga
+      e conta em `descartadas`; a leitura nunca espera pela interface.
+
+    O consumidor recebe a lista de tudo que estava na fila quando acordou,
+    então um consumidor lento processa em lotes em vez de atrasar.
+    """
+
+    def __init__(self, metricas: RegistroMetricas | None = None):
+        self._consumidores = []
+        self._tarefas = []
+        self._metricas = metricas if metricas is not None else RegistroMetricas()
+
+    def consumidor(self, nome: str, funcao, tamanho: int = 1000, descartar: bool = False):
+        """`funcao(itens)` pode ser síncrona ou async; registre antes de `iniciar()`."""
+        fila = asyncio.Queue(maxsize=tamanho)
+        consumidor = {'nome': nome, 'fila': fila, 'funcao': funcao,
+                      'descartar': descartar, 'descartadas': 0}
+        self._consumidores.append(consumidor)
+        m = self._metricas
+        m.medidor(f'fila_{nome}', f'Amostras esperando o consumidor {nome}', fila.qsize)
+        m.medidor(f'fila_{nome}_descartadas_total', f'Amostras descartadas para {nome}',
+                  lambda: consumidor['descartadas'], 'counter')
+
+    async def publicar(self, item):
+        for c in self._consumidores:
+            fila = c['fila']
+            if not c['descartar']:
+                await fila.put(item)   # não suspende se houver espaço
+                continue
+            if fila.full():
+                fila.get_nowait()
+                c['descartadas'] += 1
+            fila.put_nowait(item)
+
+    def iniciar(self):
+        self._tarefas = [asyncio.create_task(self._consumir(c), name=f"consumidor-{c['nome']}")
+                         for c in self._consumidores]
+
+    async def _consumir(self, c):
+        fila, funcao = c['fila'], c['funcao']
+        assincrona = inspect.iscoroutinefunction(funcao)
+        while True:
+            itens = [await fila.get()]
+            while not fila.empty():
+                itens.append(fila.get_nowait())
+            try:
+                if assincrona:
+                    await funcao(itens)
+                else:
+                    funcao(itens)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ASYNC] ERRO no consumidor {c['nome']}:", e)
+
+    async def parar(self, timeout: float = 2.0):
+        """Dá aos consumidores sem descarte a chance de esvaziar a fila e cancela as tarefas."""
+        prazo = time.monotonic() + timeout
+        for c in self._consumidores:
+            while not c['descartar'] and not c['fila'].empty() and time.monotonic() < prazo:
+                await asyncio.sleep(0.01)
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+
+
+class AquisicaoAsync:
+    """
+    Leitura da porta como tarefa do event loop do NiceGUI, sem thread.
+
+    A porta é aberta com timeout 0 (leituras nunca bloqueiam) e a tarefa
+    só acorda quando há bytes: portas com `fileno()` (serial POSIX, TCP,
+    pty) usam `loop.add_reader`; transportes gerados (sim://, arquivo://,
+    replay://) dormem até a chegada do próximo quadro; sem fileno
+    (serial no Windows) a porta é consultada a cada `INTERVALO_SEM_FD`.
+
+    Cada linha passa pelo parse e pelo armazenamento em memória do
+    pipeline (quadros binários, direto pelo armazenamento) e a amostra
+    (ts, Amostra) vai para o `barramento`.
+
+    A tarefa é supervisionada pelo `enlace` (SupervisorEnlace): porta que
+    não abre ou leitura que falha (reset do USB, socket fechado, silêncio
+    além de `silencio_max`) leva a novas tentativas com backoff, sempre com
+    o mesmo pipeline, leitor e consumidores. `reabrir()` troca de porta da
+    mesma forma.
+    """
+
+    def __init__(self, endereco: str, pipeline, barramento: BarramentoAmostras,
+                 baudrate: int = 9600, metricas: RegistroMetricas | None = None,
+                 enlace: SupervisorEnlace | None = None):
+        self.endereco = endereco
+        self.baudrate = baudrate
+        self.pipeline = pipeline
+        self.barramento = barramento
+        self.metricas = metricas
+        if enlace is None:
+            enlace = SupervisorEnlace(LeitorLinhas(None, metricas=metricas), metricas=metricas)
+        self.enlace = enlace
+        self.leitor = enlace.leitor
+        self.erro = None
+        self._tarefa = None
+        self._pronto = None
+
+    @property
+    def conexao(self):
+        return self.enlace.conexao
+
+    def iniciar(self):
+        self.barramento.iniciar()
+        self._tarefa = asyncio.create_task(self._supervisionar(), name='aquisicao-async')
+
+    async def _supervisionar(self):
+        enlace = self.enlace
+        while True:
+            if enlace.abrir(self.endereco, self.baudrate, timeout=0) is None:
+                await asyncio.sleep(enlace.espera)
+                continue
+            try:
+                await self._rodar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.erro = e
+                enlace.caiu(e)
+                continue
+            print('[ASYNC] fim dos dados da porta')
+            return
+
+    async def _cancelar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+    async def reabrir(self, endereco: str, baudrate: int):
+        await self._cancelar()
+        self.endereco = endereco
+        self.baudrate = baudrate
+        self.enlace.fechar('porta reconfigurada')
+        self._tarefa = asyncio.create_task(self._supervisionar(), name='aquisicao-async')
+
+    async def parar(self):
+        await self._cancelar()
+        self.enlace.fechar()
+        await self.barramento.parar()
+
+    async def _blocos(self):
+        conexao = self.conexao
+        loop = asyncio.get_running_loop()
+
+        leitor = self.leitor
+        if isinstance(conexao, _TransporteGerado):
+            while True:
+                n = leitor.backlog = conexao.in_waiting
+                if n:
+                    yield conexao.read(min(n, leitor.tamanho_bloco or n))
+                    continue
+                chegada = conexao.proxima_chegada
+                if chegada is None:
+                    return   # fim do arquivo
+                await asyncio.sleep(max(0.0, chegada - time.perf_counter()))
+            return
+
+        fileno = getattr(conexao, 'fileno', None)
+        try:
+            fd = fileno() if fileno is not None else None
+            self._pronto = asyncio.Event()
+            loop.add_reader(fd, self._pronto.set)
+        except (OSError, ValueError, TypeError, NotImplementedError):
+            fd = None
+
+        # com fd, o silêncio é medido na própria espera; sem fd, a cada consulta vazia
+        silencio = None if eh_local(self.endereco) else self.enlace.silencio_max or None
+        try:
+            while True:
+                if fd is not None:
+                    try:
+                        await asyncio.wait_for(self._pronto.wait(), silencio)
+                    except asyncio.TimeoutError:   # só é o TimeoutError embutido a partir do 3.11
+                        raise EnlaceMudo(silencio) from None
+                    self._pronto.clear()
+                leitor.backlog = conexao.in_waiting
+                bloco = conexao.read(leitor.tamanho_bloco or max(leitor.backlog, TAMANHO_LEITURA))
+                if bloco:
+                    yield bloco
+                elif fd is None:
+                    self.enlace.vigiar()
+                    await asyncio.sleep(INTERVALO_SEM_FD)
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+
+    async def _rodar(self):
+        """Lê até o fim dos dados; erros de leitura sobem para `_supervisionar`."""
+        pipeline = self.pipeline
+        leitor = self.leitor
+        enlace = self.enlace
+        publicar = self.barramento.publicar
+        async for bloco in self._blocos():
+            chegada = time.perf_counter()
+            if leitor.binario:
+                quadros, linhas = leitor.receber_quadros(bloco)
+                for item in pipeline.armazenar_quadros(quadros, chegada):
+                    await publicar(item)
+            else:
+                linhas = leitor.receber(bloco)
+            for linha in linhas:
+                amostra = pipeline.parse(linha, chegada)
+                ts = time.time()
+                amostra = pipeline.armazenar(linha, amostra, ts, chegada)
+                if amostra is not None:
+                    await publicar((ts, amostra))
+            if enlace.queda is not None:
+                enlace.vigiar()   # primeiros dados depois de uma queda: fecha a lacuna
+            # com dados chegando sem parar, nenhum await acima suspende:
+            # devolve o loop à interface a cada bloco
+            await asyncio.sleep(0)
@@ -0,0 +1,237 @@
+"""
+Histórico persistente em partições binárias por hora.
+
+Uso direto para importar o CSV antigo:
+
+    python armazenamento.py importar historico_medicoes.csv
+"""
+import calendar
+import csv
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# ==========================
+# ARMAZENAMENTO EM DISCO (PARTIÇÕES POR HORA)
+# ==========================
+PASTA_DADOS = 'historico_dados'
+
+# ts, os quatro canais e pulsos (NaN quando o canal não existia na gravação)
+COLUNAS_BANCO = ('ts', 'rpm', 'temperatura', 'tensao', 'corrente', 'pulsos')
+_N_COLUNAS = len(COLUNAS_BANCO)
+_TAM_REGISTRO = 8 * _N_COLUNAS
+
+_FMT_PARTICAO = '%Y%m%d_%H'   # hora UTC, um arquivo .bin por hora
+
+# intervalos sem dados (queda do enlace): inicio,fim,motivo — ts em epoch
+ARQUIVO_LACUNAS = 'lacunas.csv'
+
+
+def _particao(ts: float) -> str:
+    return time.strftime(_FMT_PARTICAO, time.gmtime(ts))
+
+
+def _inicio_particao(nome: str) -> float:
+    return float(calendar.timegm(time.strptime(nome, _FMT_PARTICAO)))
+
+
+class ArmazenamentoParticionado:
+    """
+    Registros float64 de tamanho fixo, gravados em append num arquivo por
+    hora (UTC). Dentro de cada partição os registros ficam em ordem de ts,
+    então `consultar(inicio, fim)` só abre as partições que cruzam o
+    intervalo, lê cada uma com um único `np.fromfile` e recorta as pontas
+    por busca binária. A ordem é garantida na escrita: um lote fora de
+    ordem é ordenado, e um lote que começa antes do fim da partição
+    (relógio do PC voltou) faz a partição ser regravada em ordem. Um
+    registro parcial no fim do arquivo (queda no meio de uma escrita) é
+    ignorado na leitura e descartado antes do próximo append.
+
+    As lacunas (períodos em que o enlace caiu) ficam num CSV ao lado das
+    partições: ausência de registros num intervalo coberto por uma lacuna
+    é falta de dados, não bancada parada.
+    """
+
+    def __init__(self, pasta: str = PASTA_DADOS):
+        self.pasta = pasta
+        os.makedirs(pasta, exist_ok=True)
+        self._lock = threading.Lock()  # serializa escritas (gravador x importador)
+
+    def _arquivo(self, nome: str) -> str:
+        return os.path.join(self.pasta, nome + '.bin')
+
+    def particoes(self) -> list[str]:
+        return sorted(n[:-4] for n in os.listdir(self.pasta) if n.endswith('.bin'))
+
+    def _ler(self, nome: str) -> np.ndarray:
+        caminho = self._arquivo(nome)
+        n = os.path.getsize(caminho) // _TAM_REGISTRO
+        return np.fromfile(caminho, dtype=np.float64, count=n * _N_COLUNAS).reshape(n, _N_COLUNAS)
+
+    def adicionar_lote(self, linhas):
+        """`linhas`: tuplas (ts, rpm, temperatura, tensao, corrente), em ordem de ts."""
+        if not linhas:
+            return
+        dados = np.full((len(linhas), _N_COLUNAS), np.nan)
+        dados[:, :5] = linhas
+        self._gravar(dados)
+
+    def _gravar(self, dados: np.ndarray):
+        ts = dados[:, 0]
+        if (ts[1:] < ts[:-1]).any():
+            dados = dados[np.argsort(ts, kind='stable')]
+        nomes = [_particao(t) for t in dados[[0, -1], 0]]
+        with self._lock:
+            if nomes[0] == nomes[1]:
+                self._anexar(nomes[0], dados)
+                return
+
+            # lote atravessa a virada de hora
+            chaves = np.array([_particao(t) for t in dados[:, 0]])
+            for nome in dict.fromkeys(chaves):
+                self._anexar(nome, dados[chaves == nome])
+
+    def _anexar(self, nome: str, dados: np.ndarray):
+        """Acrescenta `dados` (em ordem) à partição mantendo-a em ordem de ts. Com o lock."""
+        caminho = self._arquivo(nome)
+        tamanho = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        n = tamanho // _TAM_REGISTRO
+        if n:
+            with open(caminho, 'rb') as f:
+                f.seek((n - 1) * _TAM_REGISTRO)
+                ultimo = np.frombuffer(f.read(_TAM_REGISTRO), dtype=np.float64)[0]
+            if dados[0, 0] < ultimo:
+                self._regravar(nome, np.concatenate([self._ler(nome), dados]))
+                return
+        if tamanho != n * _TAM_REGISTRO:
+            os.truncate(caminho, n * _TAM_REGISTRO)   # resto de uma escrita interrompida
+        with open(caminho, 'ab') as f:
+            f.write(dados.tobytes())
+
+    def _regravar(self, nome: str, dados: np.ndarray):
+        """Substitui a partição por `dados` ordenados (arquivo novo + rename). Com o lock."""
+        dados = dados[np.argsort(dados[:, 0], kind='stable')]
+        caminho = self._arquivo(nome)
+        with open(caminho + '.tmp', 'wb') as f:
+            f.write(dados.tobytes())
+        os.replace(caminho + '.tmp', caminho)
+
+    def registrar_lacuna(self, inicio: float, fim: float, motivo: str = ''):
+        with self._lock:
+            with open(os.path.join(self.pasta, ARQUIVO_LACUNAS), 'a', newline='') as f:
+                csv.writer(f).writerow([f'{inicio:.3f}', f'{fim:.3f}', motivo])
+
+    def lacunas(self, inicio: float, fim: float) -> list[tuple]:
+        """(inicio, fim, motivo) das lacunas que cruzam [inicio, fim), em ordem."""
+        caminho = os.path.join(self.pasta, ARQUIVO_LACUNAS)
+        if not os.path.exists(caminho):
+            return []
+        saida = []
+        with open(caminho, newline='') as f:
+            for linha in csv.reader(f):
+                try:
+                    ini, fim_l = float(linha[0]), float(linha[1])
+                except (ValueError, IndexError):
+                    continue  # linha cortada por uma queda no meio da escrita
+                if ini < fim and fim_l > inicio:
+                    saida.append((ini, fim_l, linha[2] if len(linha) > 2 else ''))
+        return sorted(saida)
+
+    def intervalo(self):
+        """(primeiro ts, último ts) ou (None, None) se vazio."""
+        nomes = [n for n in self.particoes() if os.path.getsize(self._arquivo(n)) >= _TAM_REGISTRO]
+        if not nomes:
+            return None, None
+        return float(self._ler(nomes[0])[0, 0]), float(self._ler(nomes[-1])[-1, 0])
+
+    def _blocos(self, inicio: float, fim: float):
+        for nome in self.particoes():
+            ini_p = _inicio_particao(nome)
+            if ini_p >= fim or ini_p + 3600 <= inicio:
+                continue
+            dados = self._ler(nome)
+            ts = dados[:, 0]
+            a, b = np.searchsorted(ts, [inicio, fim], side='left')
+            if b > a:
+                yield dados[a:b]
+
+    def contar(self, inicio: float, fim: float) -> int:
+        return sum(len(b) for b in self._blocos(inicio, fim))
+
+    def consultar(self, inicio: float, fim: float, canais=COLUNAS_BANCO[1:5]) -> dict:
+        """
+        Amostras com inicio <= ts < fim, como arrays float64 por coluna
+        (chave 'ts' mais os `canais` pedidos). Valores ausentes são NaN.
+        """
+        idx = [0]
+        for c in canais:
+            if c not in COLUNAS_BANCO[1:]:
+                raise ValueError(f'canal desconhecido: {c}')
+            idx.append(COLUNAS_BANCO.index(c))
+
+        blocos = [b[:, idx] for b in self._blocos(inicio, fim)]
+        dados = np.concatenate(blocos) if blocos else np.empty((0, len(idx)))
+        return {COLUNAS_BANCO[j]: np.ascontiguousarray(dados[:, i]) for i, j in enumerate(idx)}
+
+    def importar_csv(self, caminho_csv: str, ate: float | None = None) -> int:
+        """
+        Importa o historico_medicoes.csv antigo. Aceita as duas versões do
+        arquivo: `timestamp,pulsos,rpm` e `timestamp,rpm,temperatura,tensao,
+        corrente`. Linhas com ts >= `ate` são ignoradas: com o gravador já
+        rodando, passe o início da sessão, cujas linhas chegam às partições
+        pelo próprio gravador. Linhas dentro do intervalo já presente no
+        armazenamento também são ignoradas; esse intervalo é lido sob o
+        lock de escrita, junto com a gravação, então nada entra entre os dois.
+        """
+        registros = []
+
+        with open(caminho_csv, newline='') as f:
+            for linha in csv.reader(f):
+                try:
+                    ts = datetime.strptime(linha[0], '%Y-%m-%d %H:%M:%S').timestamp()
+                    if len(linha) == 3:
+                        reg = (ts, float(linha[2]), np.nan, np.nan, np.nan, float(linha[1]))
+                    elif len(linha) == 5:
+                        reg = (ts, *map(float, linha[1:]), np.nan)
+                    else:
+                        continue
+                except ValueError:
+                    continue  # cabeçalho ou linha corrompida
+
+                if ate is not None and ts >= ate:
+                    continue
+                registros.append(reg)
+
+        if not registros:
+            return 0
+
+        dados = np.array(registros, dtype=np.float64)
+        dados = dados[np.argsort(dados[:, 0], kind='stable')]
+
+        with self._lock:
+            primeiro, ultimo = self.intervalo()
+            if primeiro is not None:
+                dados = dados[(dados[:, 0] < primeiro) | (dados[:, 0] > ultimo)]
+            chaves = np.array([_particao(ts) for ts in dados[:, 0]])
+            for nome in dict.fromkeys(chaves):
+                novos = dados[chaves == nome]
+                if os.path.exists(self._arquivo(nome)):
+                    # partição já existente: regrava em ordem de ts
+                    novos = np.concatenate([self._ler(nome), novos])
+                self._regravar(nome, novos)
+
+        return len(dados)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] != 'importar':
+        print(__doc__.strip())
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    n = ArmazenamentoParticionado().importar_csv(sys.argv[2])
+    print(f'[DADOS] {n} linhas importadas em {time.perf_counter() - inicio:.2f} s')
@@ -0,0 +1,81 @@
+"""
+Custo das análises de `analise.py` sobre uma sessão sintética: RPM em
+patamares com ondulação e ruído, tensão/corrente e os pulsos contados
+em cada registro, amostrados a 10 Hz com algumas quedas de comunicação.
+
+Tudo é vetorizado (cumsum, searchsorted, FFT), então o tempo cresce
+quase linearmente com o número de amostras; a série para gráfico e o
+espectro (limitado a MAX_PONTOS_ESPECTRO) praticamente não crescem.
+
+    python bench_analise.py                       # 100 mil e 1 milhão de amostras
+    python bench_analise.py --amostras 5000000 --repeticoes 1
+"""
+import argparse
+import time
+
+import numpy as np
+
+from analise import (analisar, energia, ondulacao, potencia, regime_permanente, rpm_de_pulsos,
+                     serie_movel)
+
+
+def sessao(n: int, semente: int = 0) -> dict:
+    rng = np.random.default_rng(semente)
+    dt = 0.1
+    ts = 1.7e9 + np.arange(n) * dt
+    for ini in rng.integers(0, n, size=max(1, n // 200_000)):
+        ts[ini:] += 60.0   # queda de 1 min
+    t = ts - ts[0]
+    patamar = 20.0 + 20.0 * (rng.integers(0, 3, size=n // 6000 + 1).repeat(6000)[:n])
+    rpm = patamar + 0.5 * np.sin(2 * np.pi * 0.2 * t) + rng.normal(0, 0.1, n)
+    voltas = np.cumsum(rpm / 60.0 * dt)
+    return {
+        'ts': ts,
+        'rpm': rpm,
+        'temperatura': 25.0 + 0.001 * t % 20,
+        'tensao': 12.0 + rng.normal(0, 0.05, n),
+        'corrente': rpm / 40.0 + rng.normal(0, 0.02, n),
+        'pulsos': np.diff(np.floor(voltas * 6), prepend=0.0),
+    }
+
+
+def cronometrar(fn, repeticoes: int) -> float:
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--amostras', type=int, nargs='+', default=[100_000, 1_000_000])
+    ap.add_argument('--repeticoes', type=int, default=3, help='vale o melhor tempo')
+    args = ap.parse_args()
+
+    for n in args.amostras:
+        c = sessao(n)
+        ts, rpm = c['ts'], c['rpm']
+        p = potencia(c['tensao'], c['corrente'])
+        casos = (
+            ('RPM a partir dos pulsos', lambda: rpm_de_pulsos(ts, c['pulsos'])),
+            ('energia (trapézios)', lambda: energia(ts, p)),
+            ('ondulação (FFT)', lambda: ondulacao(ts, rpm)),
+            ('regime permanente', lambda: regime_permanente(ts, rpm)),
+            ('série móvel p/ gráfico', lambda: serie_movel(ts, rpm)),
+            ('analisar (tudo)', lambda: analisar(c)),
+        )
+        print(f'{n:,} amostras ({(ts[-1] - ts[0]) / 3600:.1f} h de sessão)')
+        for nome, fn in casos:
+            s = cronometrar(fn, args.repeticoes)
+            print(f'  {nome:<34} {s * 1e3:9.1f} ms  {s / n * 1e9:7.1f} ns/amostra')
+
+        a = analisar(c)
+        print(f"  -> {len(a['regimes'])} trechos em regime ({a['fracao_regime']:.0%}), "
+              f"ondulação dominante {a['ondulacao']['frequencia']:.3f} Hz, "
+              f"RPM pelos pulsos médio {a['rpm_pulsos']['media']:.2f} (direto {rpm.mean():.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Teste de carga do dashboard: N clientes com o ui.timer por página de
+antes (cada cliente copia a janela inteira e reenvia as options completas
+dos três gráficos a cada tick) contra o DifusorPainel (uma fotografia por
+tick, repartida entre todos, e só os pontos novos enviados).
+
+Não precisa de navegador nem da bancada: uma thread produtora grava
+amostras pelo PipelineAquisicao e cada "cliente" é um objeto com os mesmos
+rótulos, um update de gráfico que serializa as options como o NiceGUI e
+um run_javascript, ambos contando só bytes.
+
+    python bench_difusor.py --clientes 50 --ticks 200
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+
+from difusor import DifusorPainel
+from parser_telemetria import Amostra
+from pipeline import PipelineAquisicao
+
+JANELA = 60
+
+
+class ClienteFalso:
+    def __init__(self):
+        self.rotulos = {}
+        self.bytes_enviados = 0
+
+    def run_javascript(self, codigo):
+        self.bytes_enviados += len(codigo)
+
+    def atualizar_grafico(self, opcoes):
+        """chart.update(): as options inteiras vão para o navegador."""
+        self.bytes_enviados += len(json.dumps(opcoes))
+
+
+def produtor(pipeline, taxa_hz, parar):
+    i = 0
+    periodo = 1 / taxa_hz
+    proximo = time.perf_counter()
+    while not parar.is_set():
+        pipeline.armazenar(f'Modo: SMAW || RPM: {i % 90:.2f}',
+                           Amostra(i % 90, 50.0, 1.24, 2.7, 'SMAW'), time.time())
+        i += 1
+        proximo += periodo
+        espera = proximo - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+
+
+def atualizar_por_pagina(cliente, pipeline):
+    """
+    Réplica do ui.timer(1, atualizar) de cada página no código original:
+    cópia das últimas JANELA amostras, rótulos, e as options dos três
+    gráficos remontadas e reenviadas por inteiro, cliente por cliente.
+    """
+    ultima = pipeline.estado['ultima_linha']
+    _, hist = pipeline.historico.instantaneo(JANELA)
+    hist = {k: v.tolist() for k, v in hist.items()}
+    if not hist['ts']:
+        return
+
+    rpm = hist['rpm'][-1]
+    cliente.rotulos['rpm'] = f'{rpm:.2f}'
+    cliente.rotulos['temperatura'] = f"{hist['temperatura'][-1]:.2f}"
+    cliente.rotulos['ultima'] = ultima or '—'
+    cliente.rotulos['status'] = 'ALERTA' if rpm > 50 else 'NORMAL'
+
+    xs = [time.strftime('%H:%M:%S', time.localtime(t)) for t in hist['ts']]
+    for canal in ('rpm', 'temperatura'):
+        cliente.atualizar_grafico({
+            'tooltip': {'trigger': 'axis'},
+            'xAxis': {'type': 'category', 'data': xs},
+            'yAxis': {'type': 'value'},
+            'series': [{'type': 'line', 'data': hist[canal], 'smooth': True, 'showSymbol': False}],
+        })
+    cliente.atualizar_grafico({
+        'tooltip': {},
+        'xAxis': {'type': 'value', 'name': 'Tensão (V)'},
+        'yAxis': {'type': 'value', 'name': 'Corrente (A)'},
+        'series': [{'type': 'scatter', 'data': [list(p) for p in zip(hist['tensao'], hist['corrente'])]}],
+    })
+
+
+def assinante(cliente, cursor, difusor):
+    def atualizar(foto):
+        if not foto['n']:
+            return
+        dados = difusor.dados_para(cursor, foto)
+        if dados is None:
+            return
+        cliente.rotulos['rpm'] = f"{foto['atual']['rpm']:.2f}"
+        cliente.rotulos['ultima'] = foto['ultima_linha']
+        cliente.run_javascript(f'a(1, {dados["rpm"]});a(2, {dados["temperatura"]});'
+                               f'a(3, {dados["vi"]});')
+    return atualizar
+
+
+def rodar(modo, n_clientes, ticks, intervalo, taxa_hz):
+    pipeline = PipelineAquisicao(100_000, 35)
+    historico = pipeline.historico
+    parar = threading.Event()
+    th = threading.Thread(target=produtor, args=(pipeline, taxa_hz, parar), daemon=True)
+    th.start()
+    time.sleep(0.2)
+
+    clientes = [ClienteFalso() for _ in range(n_clientes)]
+    cursores = [{'total': historico.total} for _ in clientes]
+
+    difusor = DifusorPainel(pipeline, JANELA)
+    if modo == 'difusor':
+        for i, (c, cur) in enumerate(zip(clientes, cursores)):
+            difusor.assinar(i, assinante(c, cur, difusor))
+
+    duracoes = []
+    cpu_ini = time.thread_time()
+    for _ in range(ticks):
+        time.sleep(intervalo)
+        inicio = time.perf_counter()
+        if modo == 'difusor':
+            difusor.tick()
+        else:
+            for c in clientes:
+                atualizar_por_pagina(c, pipeline)
+        duracoes.append(time.perf_counter() - inicio)
+    cpu = time.thread_time() - cpu_ini
+
+    parar.set()
+    th.join(1)
+    duracoes.sort()
+    return {
+        'cpu_ms_tick': cpu / ticks * 1000,
+        'tick_p50_ms': statistics.median(duracoes) * 1000,
+        'tick_p99_ms': duracoes[int(0.99 * (len(duracoes) - 1))] * 1000,
+        'kb_cliente': sum(c.bytes_enviados for c in clientes) / n_clientes / 1024,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--clientes', type=int, default=50)
+    ap.add_argument('--ticks', type=int, default=200)
+    ap.add_argument('--intervalo', type=float, default=0.05,
+                    help='segundos entre ticks (menor que o real para acelerar o teste)')
+    ap.add_argument('--taxa', type=float, default=500, help='amostras/s do produtor')
+    args = ap.parse_args()
+
+    print(f'{args.clientes} clientes, {args.ticks} ticks de {args.intervalo * 1000:.0f} ms, '
+          f'{args.taxa:.0f} amostras/s')
+    for modo in ('timer_pagina', 'difusor'):
+        r = rodar(modo, args.clientes, args.ticks, args.intervalo, args.taxa)
+        print(f"{modo:12s}  cpu/tick={r['cpu_ms_tick']:7.2f} ms  "
+              f"tick p50={r['tick_p50_ms']:7.2f} ms  p99={r['tick_p99_ms']:7.2f} ms  "
+              f"enviado/cliente={r['kb_cliente']:8.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
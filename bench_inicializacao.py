@@ -0,0 +1,140 @@
+"""
+Partida do supervisório: tempo até a primeira amostra armazenada, até a
+primeira página servida e a memória residente nesse ponto.
+
+Roda o ReiRenan_and_MrApple.py de verdade, num diretório temporário com um
+configuracao.json apontando para o simulador (sim://), e acompanha pelo
+/metrics (primeira amostra) e pela página inicial (primeira renderização).
+Usa as portas 8080 (NiceGUI) e 9108 (métricas): feche o supervisório antes.
+
+Antes, mede o import de cada módulo da pilha de relatórios num processo
+limpo (já com nicegui e numpy carregados): é o que a partida deixou de pagar.
+
+    python bench_inicializacao.py
+    python bench_inicializacao.py --rodadas 5 --max-amostra 4 --max-render 4   # código 1 se passar
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from metricas import PORTA_METRICAS
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ReiRenan_and_MrApple.py')
+URL_PAGINA = 'http://127.0.0.1:8080/'
+URL_METRICAS = f'http://127.0.0.1:{PORTA_METRICAS}/metrics'
+MODULOS_RELATORIO = ('openpyxl', 'matplotlib.figure', 'reportlab.pdfgen.canvas')
+RE_AMOSTRAS = re.compile(rb'^supervisorio_amostras_total (\S+)', re.M)
+
+
+def custo_import(modulo: str) -> float:
+    codigo = ('import time, nicegui, numpy\n'
+              't = time.perf_counter()\n'
+              f'import {modulo}\n'
+              'print(time.perf_counter() - t)')
+    saida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, check=True)
+    return float(saida.stdout)
+
+
+def _get(url: str) -> bytes | None:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as r:
+            return r.read() if r.status == 200 else None
+    except (urllib.error.URLError, OSError):
+        return None
+
+
+def _rss_mb(pid: int) -> float | None:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for linha in f:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None   # fora do Linux
+
+
+def medir_partida(porta: str, prazo: float) -> dict:
+    with tempfile.TemporaryDirectory(prefix='bench_partida_') as pasta:
+        with open(os.path.join(pasta, 'configuracao.json'), 'w', encoding='utf-8') as f:
+            json.dump({'porta_serial': porta}, f)
+        env = dict(os.environ, BROWSER='true')   # ui.run abre o navegador por padrão
+
+        inicio = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, APP], cwd=pasta, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        r = {'amostra': None, 'render': None, 'rss_mb': None}
+        try:
+            while (r['amostra'] is None or r['render'] is None) and proc.poll() is None:
+                agora = time.perf_counter() - inicio
+                if agora > prazo:
+                    break
+                if r['render'] is None and _get(URL_PAGINA):
+                    r['render'] = time.perf_counter() - inicio
+                    r['rss_mb'] = _rss_mb(proc.pid)
+                if r['amostra'] is None:
+                    m = RE_AMOSTRAS.search(_get(URL_METRICAS) or b'')
+                    if m and float(m.group(1)) > 0:
+                        r['amostra'] = time.perf_counter() - inicio
+                time.sleep(0.01)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        return r
+
+
+def _fmt(s: float | None, unidade: str = 's') -> str:
+    return '      n/d' if s is None else f'{s:7.2f} {unidade}'
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--rodadas', type=int, default=3, help='partidas medidas (vale a mediana)')
+    ap.add_argument('--porta', default='sim://?taxa=50', help='transporte usado pela aquisição')
+    ap.add_argument('--prazo', type=float, default=60.0, help='segundos até desistir de uma partida')
+    ap.add_argument('--max-amostra', type=float, help='falha se a primeira amostra passar disso (s)')
+    ap.add_argument('--max-render', type=float, help='falha se a primeira página passar disso (s)')
+    args = ap.parse_args()
+
+    print('Import sob demanda (já com nicegui e numpy):')
+    for modulo in MODULOS_RELATORIO:
+        print(f'  {modulo:<26} {custo_import(modulo) * 1e3:8.0f} ms')
+
+    print(f'\nPartida ({args.porta}):')
+    rodadas = []
+    for i in range(args.rodadas):
+        r = medir_partida(args.porta, args.prazo)
+        rodadas.append(r)
+        print(f'  rodada {i + 1}: primeira amostra {_fmt(r["amostra"])}  '
+              f'primeira página {_fmt(r["render"])}  RSS {_fmt(r["rss_mb"], "MB")}')
+
+    def mediana(chave):
+        valores = sorted(r[chave] for r in rodadas if r[chave] is not None)
+        return valores[len(valores) // 2] if len(valores) == len(rodadas) else None
+
+    amostra, render = mediana('amostra'), mediana('render')
+    print(f'  mediana : primeira amostra {_fmt(amostra)}  primeira página {_fmt(render)}')
+
+    falhou = []
+    if args.max_amostra is not None and (amostra is None or amostra > args.max_amostra):
+        falhou.append(f'primeira amostra acima de {args.max_amostra:g} s')
+    if args.max_render is not None and (render is None or render > args.max_render):
+        falhou.append(f'primeira página acima de {args.max_render:g} s')
+    if falhou:
+        print('REGRESSÃO:', '; '.join(falhou))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
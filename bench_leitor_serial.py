@@ -0,0 +1,148 @@
+"""
+Benchmark do leitor serial: laço antigo (in_waiting + sleep 20 ms) contra
+o LeitorLinhas (leitura bloqueante em blocos).
+
+Usa um par pty como stand-in da porta (Linux/macOS), então roda sem a
+bancada. Cada linha leva um número de sequência, o que permite medir
+latência por linha e detectar linhas perdidas ou grudadas.
+
+    python bench_leitor_serial.py                 # ritmo de 115200 baud
+    python bench_leitor_serial.py --taxa max      # sem limite de ritmo
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+import tty
+
+import serial
+
+from leitor_serial import LeitorLinhas
+
+BAUD_REFERENCIA = 115200
+
+
+def montar_linha(seq: int) -> bytes:
+    return (f'Modo: SMAW || Seq: {seq} || RPM: {seq % 97:.2f} || '
+            f'Temperatura: 50.29 || Tensao: 1.24 || Corrente: 2.70\n').encode()
+
+
+def escritor(fd_mestre, n, taxa_bytes, envios, parar):
+    inicio = time.perf_counter()
+    enviados = 0
+    for seq in range(n):
+        if parar.is_set():
+            return
+        dados = montar_linha(seq)
+        if taxa_bytes:
+            # mantém o ritmo equivalente ao baud rate (10 bits por byte)
+            alvo = inicio + (enviados + len(dados)) / taxa_bytes
+            espera = alvo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+        envios[seq] = time.perf_counter()
+        while dados:
+            try:
+                escritos = os.write(fd_mestre, dados)
+                enviados += escritos
+                dados = dados[escritos:]
+            except BlockingIOError:
+                # buffer do pty cheio: o consumidor não está acompanhando
+                if parar.wait(0.001):
+                    return
+
+
+def consumidor_polling(porta, registrar, parar):
+    while not parar.is_set():
+        if porta.in_waiting:
+            linha = porta.readline().decode(errors='ignore').strip()
+            if not linha:
+                continue
+            registrar(linha)
+        time.sleep(0.02)
+
+
+def consumidor_blocos(porta, registrar, parar):
+    leitor = LeitorLinhas(porta)
+    while not parar.is_set():
+        for linha in leitor.ler_linhas():
+            registrar(linha)
+
+
+def rodar(modo, n, taxa_bytes, limite_s):
+    mestre, escravo = os.openpty()
+    tty.setraw(escravo)
+    os.set_blocking(mestre, False)
+    porta = serial.Serial(os.ttyname(escravo), BAUD_REFERENCIA, timeout=0.2)
+
+    envios = {}
+    latencias = []
+    vistos = set()
+    grudadas = 0
+    parar = threading.Event()
+
+    def registrar(linha):
+        nonlocal grudadas
+        agora = time.perf_counter()
+        if linha.count('Modo:') != 1:
+            grudadas += 1
+            return
+        seq = int(linha.split('Seq:', 1)[1].split('||', 1)[0])
+        vistos.add(seq)
+        latencias.append(agora - envios[seq])
+        if len(vistos) == n:
+            parar.set()
+
+    alvo = consumidor_polling if modo == 'polling' else consumidor_blocos
+    th = threading.Thread(target=alvo, args=(porta, registrar, parar), daemon=True)
+
+    th_escritor = threading.Thread(
+        target=escritor, args=(mestre, n, taxa_bytes, envios, parar), daemon=True
+    )
+
+    inicio = time.perf_counter()
+    th.start()
+    th_escritor.start()
+    parar.wait(limite_s)
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    th.join(1)
+    th_escritor.join(1)
+
+    porta.close()
+    os.close(mestre)
+    os.close(escravo)
+
+    lat = sorted(latencias) or [0.0]
+    return {
+        'modo': modo,
+        'recebidas': len(vistos),
+        'perdidas': n - len(vistos),
+        'grudadas': grudadas,
+        'linhas_s': len(vistos) / duracao,
+        'lat_p50_ms': statistics.median(lat) * 1000,
+        'lat_p99_ms': lat[int(0.99 * (len(lat) - 1))] * 1000,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--linhas', type=int, default=1000)
+    ap.add_argument('--taxa', choices=['baud', 'max'], default='baud')
+    ap.add_argument('--limite', type=float, default=30.0,
+                    help='tempo máximo por modo, em segundos')
+    args = ap.parse_args()
+
+    taxa_bytes = BAUD_REFERENCIA / 10 if args.taxa == 'baud' else 0
+    print(f'{args.linhas} linhas, ritmo: {args.taxa}')
+    for modo in ('polling', 'blocos'):
+        r = rodar(modo, args.linhas, taxa_bytes, args.limite)
+        print(f"{r['modo']:8s}  recebidas={r['recebidas']:6d}  "
+              f"perdidas={r['perdidas']:5d}  grudadas={r['grudadas']:3d}  "
+              f"{r['linhas_s']:8.1f} linhas/s  "
+              f"lat p50={r['lat_p50_ms']:8.2f} ms  p99={r['lat_p99_ms']:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
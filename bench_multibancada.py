@@ -0,0 +1,87 @@
+"""
+Escalabilidade do modo multibancada: N dispositivos simulados (sim://,
+sem limite de taxa) lidos por N threads num só processo contra N
+processos trabalhadores com histórico em memória compartilhada.
+
+Com threads, parse e armazenamento disputam o mesmo GIL e a vazão total
+fica parada; com processos ela cresce com N até acabarem os núcleos.
+
+    python bench_multibancada.py                  # N = 1, 2, 4, 8; 5 s cada
+    python bench_multibancada.py --max 16 --duracao 10
+"""
+import argparse
+import os
+import threading
+import time
+
+from configuracao import CAMPOS
+from multibancada import AquisicaoBancada, GerenciadorBancadas, spec_bancada
+
+CAPACIDADE = 100_000
+
+
+def _specs(n: int) -> list[dict]:
+    cfg = {nome: (0 if tipo is not str else '') for nome, (tipo, _) in CAMPOS.items()}
+    cfg.update(baudrate=115200, capacidade_historico=CAPACIDADE, max_linha=4096,
+               limite_rpm=1e9, limite_temperatura=1e9, taxa_max_rpm=1e9, fator_k=1.0,
+               protocolo='texto')
+    # sem pasta de dados: nada é gravado, mede só aquisição
+    return [spec_bancada(f'sim{i}', 'sim://?taxa=0', cfg) for i in range(n)]
+
+
+def medir_threads(n: int, duracao: float) -> float:
+    aquisicoes = [AquisicaoBancada(spec) for spec in _specs(n)]
+    parar = threading.Event()
+    threads = [threading.Thread(target=a.rodar, args=(parar,)) for a in aquisicoes]
+    for t in threads:
+        t.start()
+    time.sleep(1.0)   # aquecimento
+    inicio = sum(a.pipeline.historico.total for a in aquisicoes)
+    time.sleep(duracao)
+    fim = sum(a.pipeline.historico.total for a in aquisicoes)
+    parar.set()
+    for t in threads:
+        t.join()
+    return (fim - inicio) / duracao
+
+
+def medir_processos(n: int, duracao: float) -> float:
+    gerenciador = GerenciadorBancadas(_specs(n))
+    gerenciador.iniciar()
+    try:
+        # espera todos estarem produzindo (import e abertura em cada processo)
+        prazo = time.monotonic() + 30
+        while any(b.historico.total == 0 for b in gerenciador) and time.monotonic() < prazo:
+            time.sleep(0.05)
+        time.sleep(1.0)
+        inicio = sum(b.historico.total for b in gerenciador)
+        time.sleep(duracao)
+        fim = sum(b.historico.total for b in gerenciador)
+    finally:
+        gerenciador.parar()
+    return (fim - inicio) / duracao
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--max', type=int, default=8, help='maior número de dispositivos')
+    ap.add_argument('--duracao', type=float, default=5.0, help='segundos medidos por ponto')
+    args = ap.parse_args()
+
+    ns = [1]
+    while ns[-1] * 2 <= args.max:
+        ns.append(ns[-1] * 2)
+
+    print(f'{os.cpu_count()} núcleos, {args.duracao:g} s por ponto, amostras/s somadas de todas as bancadas')
+    base = {}
+    for n in ns:
+        for modo, medir in (('threads', medir_threads), ('processos', medir_processos)):
+            taxa = medir(n, args.duracao)
+            base.setdefault(modo, taxa)
+            ganho = taxa / base[modo]
+            print(f'N={n:<3} {modo:<10} {taxa:>12,.0f} amostras/s  '
+                  f'ganho {ganho:5.2f}x  eficiência {ganho / n:6.1%}')
+
+
+if __name__ == '__main__':
+    main()
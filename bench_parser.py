@@ -0,0 +1,164 @@
+"""
+Microbenchmark do parser de telemetria: parse_linha original (split + dict)
+contra ParserTelemetria (regex pré-compilada + fallback genérico).
+
+O corpus é montado a partir das linhas de 5 colunas de
+historico_medicoes.csv, no formato que a bancada envia, misturado com
+quadros malformados (truncados, grudados, ruído, campos fora de ordem).
+
+Por último, as mesmas amostras no formato binário (quadros_binarios):
+bytes no fio e custo do DecodificadorBinario por quadro, lendo a porta em
+blocos de 4 KB e num burst só, contra separar linhas + ParserTelemetria.
+
+    python bench_parser.py [--repeticoes 5]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import random
+import timeit
+
+from leitor_serial import LeitorLinhas
+from parser_telemetria import ParserTelemetria
+from quadros_binarios import DecodificadorBinario, codificar_quadro
+from simulador import BITS_POR_BYTE
+
+ARQUIVO_CSV = 'historico_medicoes.csv'
+BAUD_BANCADA = 9600
+BLOCO_PORTA = 4096
+
+
+def parse_linha_antigo(linha: str):
+    """Cópia do parse_linha original do supervisório, usada como referência."""
+    try:
+        partes = [p.strip() for p in linha.split("||")]
+
+        dados = {}
+        for p in partes:
+            if ':' in p:
+                chave, valor = p.split(':', 1)
+                dados[chave.strip().lower()] = valor.strip()
+
+        rpm = float(dados.get('rpm', 0))
+        temperatura = float(dados.get('temperatura', 0))
+        tensao = float(dados.get('tensao', 0))
+        corrente = float(dados.get('corrente', 0))
+
+        return rpm, temperatura, tensao, corrente
+
+    except Exception as e:
+        print('[PARSE] Erro ao interpretar linha:', linha, '| Erro:', e)
+        return None, None, None, None
+
+
+def montar_corpus(frac_malformadas=0.05, semente=42):
+    reais = []
+    with open(ARQUIVO_CSV, newline='') as f:
+        for linha in csv.reader(f):
+            if len(linha) != 5 or linha[0] == 'timestamp':
+                continue
+            _, rpm, temp, tensao, corrente = linha
+            reais.append(f'Modo: SMAW || RPM: {float(rpm):.2f} || '
+                         f'Temperatura: {float(temp):.2f} || '
+                         f'Tensao: {float(tensao):.2f} || '
+                         f'Corrente: {float(corrente):.2f}')
+
+    rnd = random.Random(semente)
+    ruins = []
+    for _ in range(int(len(reais) * frac_malformadas)):
+        base = rnd.choice(reais)
+        tipo = rnd.randrange(4)
+        if tipo == 0:
+            ruins.append(base[:rnd.randrange(5, len(base) - 5)])   # truncada
+        elif tipo == 1:
+            ruins.append(base + rnd.choice(reais))                 # grudada
+        elif tipo == 2:
+            ruins.append(''.join(chr(rnd.randrange(33, 127)) for _ in range(40)))
+        else:
+            partes = base.split(' || ')
+            rnd.shuffle(partes)
+            ruins.append(' || '.join(partes))                      # fora de ordem
+
+    corpus = reais + ruins
+    rnd.shuffle(corpus)
+    return corpus
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--repeticoes', type=int, default=5)
+    args = ap.parse_args()
+
+    corpus = montar_corpus()
+    parser = ParserTelemetria()
+
+    def antigo():
+        # o parser antigo imprime cada erro; o custo do print faz parte dele,
+        # mas a saída é descartada para não poluir o terminal
+        with contextlib.redirect_stdout(io.StringIO()):
+            for linha in corpus:
+                parse_linha_antigo(linha)
+
+    def novo():
+        for linha in corpus:
+            parser.parse(linha)
+
+    print(f'corpus: {len(corpus)} linhas')
+    resultados = {}
+    for nome, fn in (('parse_linha', antigo), ('ParserTelemetria', novo)):
+        melhor = min(timeit.repeat(fn, number=1, repeat=args.repeticoes))
+        resultados[nome] = melhor
+        print(f'{nome:18s} {melhor * 1000:8.2f} ms  '
+              f'{len(corpus) / melhor / 1000:8.1f} k linhas/s')
+
+    print(f"ganho: {resultados['parse_linha'] / resultados['ParserTelemetria']:.2f}x")
+    p = ParserTelemetria()
+    for linha in corpus:
+        p.parse(linha)
+    print(f'quadros={p.quadros} genericos={p.genericos} malformados={p.malformados}')
+
+    comparar_binario(corpus, args.repeticoes)
+
+
+def comparar_binario(corpus, repeticoes: int):
+    parser = ParserTelemetria()
+    validas = [(linha, a) for linha in corpus if (a := parser.parse(linha)) is not None]
+    linhas = [linha for linha, _ in validas]
+    amostras = [a for _, a in validas]
+    texto = ('\n'.join(linhas) + '\n').encode()
+    fluxo = b''.join(codificar_quadro(i, *a[:4]) for i, a in enumerate(amostras))
+    n = len(amostras)
+
+    print(f'\nformato binário: {n} amostras')
+    for nome, tamanho in (('texto', len(texto)), ('binário', len(fluxo))):
+        por_amostra = tamanho / n
+        print(f'{nome:8s} {por_amostra:6.1f} bytes/amostra  '
+              f'{BAUD_BANCADA / BITS_POR_BYTE / por_amostra:6.1f} amostras/s a {BAUD_BANCADA} baud')
+
+    def em_blocos(dados, tamanho):
+        return [dados[i:i + tamanho] for i in range(0, len(dados), tamanho)]
+
+    def linhas_e_parse(blocos):
+        leitor, p = LeitorLinhas(None), ParserTelemetria()
+        for bloco in blocos:
+            for linha in leitor.alimentar(bloco):
+                p.parse(linha)
+
+    def decodificar(blocos):
+        d = DecodificadorBinario()
+        for bloco in blocos:
+            d.receber(bloco)
+
+    casos = (
+        ('texto, blocos de 4 KB', linhas_e_parse, em_blocos(texto, BLOCO_PORTA)),
+        ('binário, blocos de 4 KB', decodificar, em_blocos(fluxo, BLOCO_PORTA)),
+        ('binário, burst único', decodificar, [fluxo]),
+    )
+    for nome, fn, blocos in casos:
+        melhor = min(timeit.repeat(lambda: fn(blocos), number=1, repeat=repeticoes))
+        print(f'{nome:24s} {melhor / n * 1e6:7.2f} µs/amostra')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+import heapq
+import itertools
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from metricas import RegistroMetricas
+
+# ==========================
+# FILA DE COMANDOS (TX)
+# ==========================
+PRIORIDADE_SEGURANCA = 0   # corte de alarme: escrito na hora, fura fila e limite de taxa
+PRIORIDADE_OPERADOR = 1    # botões da interface
+PRIORIDADE_SCRIPT = 2      # passos de script de pinos
+
+TAXA_MAX_TX = 20.0     # comandos/s (0 = sem limite); protege o buffer de entrada do firmware
+RAJADA_TX = 5          # comandos que podem sair de uma vez antes do limite valer
+TIMEOUT_ACK = 0.5      # s esperando a confirmação antes de retransmitir
+TENTATIVAS_TX = 3      # envios por comando com confirmação (1 = sem retransmissão)
+MARGEM_SPIN = 0.002    # s finais da espera de um passo de script feitos em espera ativa
+ANTECEDENCIA_SCRIPT = 0.005  # s entre agendar o script e o primeiro passo (que também sai no horário)
+TAMANHO_LOG_TX = 200
+
+_RE_ESPERA = re.compile(r'(\d+(?:\.\d+)?)\s*(ms|s)')
+_RE_PINO = re.compile(r'([ld])(\d{1,2})')
+
+
+def ler_script(texto: str) -> list[tuple[float, str]]:
+    """
+    'l8; 200ms; d8; 1.5s; l13' (ou um item por linha) -> [(0.0, 'l8'), (0.2, 'd8'), (1.7, 'l13')].
+    As esperas acumulam a partir do início do script. Só aceita l<pino>/d<pino>
+    (pinos 0 a 53, como na tela de Calibração); ValueError indica o item inválido.
+    """
+    passos = []
+    atraso = 0.0
+    for item in re.split(r'[;,\n]', texto):
+        item = item.strip().lower()
+        if not item:
+            continue
+        espera = _RE_ESPERA.fullmatch(item)
+        if espera:
+            valor = float(espera.group(1))
+            atraso += valor / 1000 if espera.group(2) == 'ms' else valor
+            continue
+        pino = _RE_PINO.fullmatch(item)
+        if pino is None or int(pino.group(2)) > 53:
+            raise ValueError(f'item inválido no script: {item!r}')
+        passos.append((atraso, item))
+    if not passos:
+        raise ValueError('script sem comandos')
+    return passos
+
+
+class Comando:
+    """
+    Um comando na fila. `futuro` (concurrent.futures) é resolvido com o
+    próprio comando quando ele termina: 'enviado' (sem confirmação),
+    'confirmado', 'falhou' ou 'cancelado'. A interface espera nele com
+    asyncio.wrap_future, sem bloquear o event loop.
+    """
+
+    def __init__(self, texto: str, prioridade: int, quando: float, ack, tentativas: int,
+                 origem: str = ''):
+        self.texto = texto
+        self.prioridade = prioridade
+        self.quando = quando        # perf_counter a partir do qual pode sair
+        self.ack = ack              # regex compilada ou None
+        self.tentativas = tentativas
+        self.origem = origem
+        self.estado = 'fila'
+        self.criado = time.perf_counter()
+        self.ts = time.time()
+        self.envios = 0
+        self.enviado = None         # perf_counter do início da última escrita
+        self.prazo_ack = None
+        self.rtt = None
+        self.erro = None
+        self.futuro = Future()
+
+    def _concluir(self, estado: str, erro: str | None = None):
+        self.estado = estado
+        self.erro = erro
+        if not self.futuro.done():
+            self.futuro.set_result(self)
+
+
+class FilaComandos:
+    """
+    Único escritor da porta: os comandos da interface, dos scripts e dos
+    alarmes passam todos por aqui, então nunca se intercalam.
+
+    - Comandos comuns entram numa fila por prioridade e saem pela thread
+      própria, respeitando um balde de fichas (`taxa_max`/s, `rajada`).
+      A interface só enfileira; quem espera o flush é essa thread.
+    - `seguranca()` escreve na hora, na thread de quem chamou (o alarme, na
+      aquisição), furando fila e limite de taxa, e cancela os scripts
+      pendentes (um passo 'l8' agendado não pode religar o relé cortado).
+    - Com `ack` (regex; '{comando}' no modelo vira o comando escapado) o
+      comando só termina quando chega uma linha que case; sem resposta em
+      `timeout_ack` ele é retransmitido até `tentativas` vezes. No máximo
+      `janela` comandos ficam esperando confirmação ao mesmo tempo.
+      `resposta(linha, chegada)` é chamada pelo pipeline para cada linha
+      recebida e mede a ida e volta a partir do início da escrita.
+    - `script()` agenda os passos em horários absolutos a partir do início;
+      a espera termina em espera ativa (`MARGEM_SPIN`) e o atraso de cada
+      passo vai para `tx_atraso_script_segundos`.
+    """
+
+    def __init__(self, escrever, taxa_max: float = TAXA_MAX_TX, rajada: int = RAJADA_TX,
+                 ack: str = '', timeout_ack: float = TIMEOUT_ACK,
+                 tentativas: int = TENTATIVAS_TX, janela: int = 1,
+                 metricas: RegistroMetricas | None = None):
+        self._escrever = escrever   # escrever(bytes); exceção = porta indisponível
+        self.taxa_max = taxa_max
+        self.rajada = rajada
+        self.ack = ack
+        self.timeout_ack = timeout_ack
+        self.tentativas = tentativas
+        self.janela = janela
+
+        self._prontos = []      # heap (prioridade, quando, seq, comando): já podem sair
+        self._agendados = []    # heap (quando, seq, comando): passos de script no futuro
+        self._aguardando = []   # enviados esperando ack, na ordem de envio
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._lock_escrita = threading.Lock()
+        self._fichas = float(rajada)
+        self._t_fichas = time.perf_counter()
+        self._rodando = False
+        self._thread = None
+        self.log = deque(maxlen=TAMANHO_LOG_TX)
+
+        self.enviados = 0
+        self.confirmados = 0
+        self.retransmitidos = 0
+        self.falhas = 0
+        self.cancelados = 0
+        self.limitados = 0
+
+        m = metricas if metricas is not None else RegistroMetricas()
+        m.medidor('tx_fila', 'Comandos esperando para sair',
+                  lambda: len(self._prontos) + len(self._agendados))
+        m.medidor('tx_aguardando_ack', 'Comandos enviados esperando confirmação',
+                  lambda: len(self._aguardando))
+        for nome, ajuda in (('enviados', 'Escritas de comando na porta'),
+                            ('confirmados', 'Comandos confirmados pelo firmware'),
+                            ('retransmitidos', 'Retransmissões por falta de confirmação'),
+                            ('falhas', 'Comandos que falharam'),
+                            ('cancelados', 'Comandos cancelados antes de sair'),
+                            ('limitados', 'Vezes que o limite de taxa segurou a fila')):
+            m.medidor(f'tx_{nome}_total', ajuda, lambda nome=nome: getattr(self, nome), 'counter')
+        self._h_espera = m.histograma('tx_espera_segundos', 'Comando criado (ou agendado) até a escrita')
+        self._h_escrita = m.histograma('tx_escrita_segundos', 'Escrita e flush de um comando')
+        self._h_rtt = m.histograma('tx_rtt_segundos', 'Início da escrita até a confirmação')
+        self._h_atraso = m.histograma('tx_atraso_script_segundos', 'Atraso de um passo de script')
+
+    # ==========================
+    # ENTRADA (QUALQUER THREAD)
+    # ==========================
+    def iniciar(self):
+        self._rodando = True
+        self._thread = threading.Thread(target=self._rodar, daemon=True, name='fila-tx')
+        self._thread.start()
+
+    def parar(self, timeout: float = 1.0):
+        with self._cond:
+            self._rodando = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            self._cancelar(lambda c: True, 'encerrando')
+            for c in self._aguardando:
+                c._concluir('cancelado', 'encerrando')
+            self._aguardando.clear()
+
+    def configurar(self, taxa_max: float, ack: str):
+        """Valem a partir do próximo comando."""
+        with self._cond:
+            self.taxa_max = taxa_max
+            self.ack = ack
+            self._cond.notify()
+
+    def _padrao_ack(self, texto: str, ack):
+        ack = self.ack if ack is None else ack
+        if not ack:
+            return None
+        return re.compile(ack.replace('{comando}', re.escape(texto)))
+
+    def enviar(self, texto: str, prioridade: int = PRIORIDADE_OPERADOR, ack: str | None = None,
+               origem: str = '') -> Comando:
+        """Enfileira e volta na hora; `ack` None usa o modelo configurado, '' dispensa."""
+        c = Comando(texto, prioridade, time.perf_counter(), self._padrao_ack(texto, ack),
+                    self.tentativas, origem)
+        with self._cond:
+            self._empurrar(c)
+            self._cond.notify()
+        self.log.append(c)
+        return c
+
+    def script(self, passos: list[tuple[float, str]], ack: str | None = None,
+               origem: str = 'script') -> list[Comando]:
+        """`passos` como os de ler_script(): (segundos desde o início, comando)."""
+        inicio = time.perf_counter() + ANTECEDENCIA_SCRIPT
+        comandos = [Comando(texto, PRIORIDADE_SCRIPT, inicio + atraso,
+                            self._padrao_ack(texto, ack), self.tentativas, origem)
+                    for atraso, texto in passos]
+        with self._cond:
+            for c in comandos:
+                self._empurrar(c)
+            self._cond.notify()
+        self.log.extend(comandos)
+        return comandos
+
+    def seguranca(self, texto: str, ack: str | None = None) -> Comando:
+        """Escreve já, nesta thread; levanta a exceção da porta se não conseguir."""
+        c = Comando(texto, PRIORIDADE_SEGURANCA, time.perf_counter(), self._padrao_ack(texto, ack),
+                    self.tentativas, 'seguranca')
+        with self._cond:
+            # os passos cancelados ficam no log com o motivo e entram em tx_cancelados_total
+            self._cancelar(lambda p: p.prioridade == PRIORIDADE_SCRIPT, f'preterido por {texto}')
+        self.log.append(c)
+        if not self._escrever_comando(c):
+            raise OSError(c.erro)
+        return c
+
+    def cancelar_scripts(self) -> int:
+        with self._cond:
+            return self._cancelar(lambda c: c.prioridade == PRIORIDADE_SCRIPT, 'cancelado pelo operador')
+
+    def resposta(self, linha: str, chegada: float | None = None) -> bool:
+        """True se a linha confirmou um comando (e não é telemetria)."""
+        if not self._aguardando:
+            return False
+        agora = time.perf_counter() if chegada is None else chegada
+        with self._cond:
+            for c in self._aguardando:
+                if c.ack.search(linha):
+                    self._aguardando.remove(c)
+                    break
+            else:
+                return False
+            c.rtt = max(0.0, agora - c.enviado)
+            self.confirmados += 1
+            self._cond.notify()
+        self._h_rtt.observar(c.rtt)
+        c._concluir('confirmado')
+        return True
+
+    # ==========================
+    # THREAD DA FILA
+    # ==========================
+    def _empurrar(self, c: Comando):
+        if c.quando > time.perf_counter():
+            heapq.heappush(self._agendados, (c.quando, next(self._seq), c))
+        else:
+            heapq.heappush(self._prontos, (c.prioridade, c.quando, next(self._seq), c))
+
+    def _cancelar(self, criterio, motivo: str) -> int:
+        """Chamar com `_cond` tomado."""
+        n = 0
+        for nome in ('_prontos', '_agendados'):
+            fila = getattr(self, nome)
+            manter = [item for item in fila if not criterio(item[-1])]
+            for item in fila:
+                if criterio(item[-1]):
+                    item[-1]._concluir('cancelado', motivo)
+                    n += 1
+            heapq.heapify(manter)
+            setattr(self, nome, manter)
+        self.cancelados += n
+        return n
+
+    def _expirar_acks(self, agora: float):
+        for c in [c for c in self._aguardando if agora >= c.prazo_ack]:
+            self._aguardando.remove(c)
+            if c.envios < c.tentativas:
+                self.retransmitidos += 1
+                c.estado = 'fila'
+                heapq.heappush(self._prontos, (c.prioridade, c.quando, next(self._seq), c))
+            else:
+                self.falhas += 1
+                c._concluir('falhou', f'sem confirmação após {c.envios} envios')
+
+    def _proximo(self, agora: float):
+        """(comando, None) para enviar já, ou (None, segundos até algo mudar)."""
+        while self._agendados and self._agendados[0][0] <= agora:
+            _, _, c = heapq.heappop(self._agendados)
+            heapq.heappush(self._prontos, (c.prioridade, c.quando, next(self._seq), c))
+
+        esperas = [c.prazo_ack - agora for c in self._aguardando]
+        if self._agendados:
+            esperas.append(self._agendados[0][0] - agora)
+
+        if self._prontos and len(self._aguardando) < self.janela:
+            c = self._prontos[0][-1]
+            if c.prioridade != PRIORIDADE_SEGURANCA and self.taxa_max > 0:
+                self._fichas = min(self.rajada, self._fichas + (agora - self._t_fichas) * self.taxa_max)
+                self._t_fichas = agora
+                if self._fichas < 1:
+                    self.limitados += 1
+                    esperas.append((1 - self._fichas) / self.taxa_max)
+                    return None, min(esperas)
+                self._fichas -= 1
+            heapq.heappop(self._prontos)
+            return c, None
+        return None, min(esperas) if esperas else None
+
+    def _rodar(self):
+        with self._cond:
+            while self._rodando:
+                agora = time.perf_counter()
+                self._expirar_acks(agora)
+                c, espera = self._proximo(agora)
+                if c is None:
+                    if espera is not None and espera <= MARGEM_SPIN:
+                        # passo de script quase na hora: espera ativa sem segurar o lock
+                        self._cond.release()
+                        try:
+                            fim = agora + espera
+                            while time.perf_counter() < fim:
+                                pass   # time.sleep(0) aqui entrega o GIL e piora a cauda
+                        finally:
+                            self._cond.acquire()
+                    else:
+                        self._cond.wait(None if espera is None else espera - MARGEM_SPIN)
+                    continue
+
+                self._cond.release()
+                try:
+                    self._escrever_comando(c)
+                finally:
+                    self._cond.acquire()
+
+    def _escrever_comando(self, c: Comando) -> bool:
+        with self._lock_escrita:
+            t0 = time.perf_counter()
+            c.enviado = t0
+            c.envios += 1
+            if c.ack is not None:
+                # registrado antes da escrita: a resposta pode chegar antes de write() voltar
+                with self._cond:
+                    c.prazo_ack = t0 + self.timeout_ack
+                    c.estado = 'aguardando'
+                    self._aguardando.append(c)
+            try:
+                self._escrever((c.texto + '\n').encode())
+            except Exception as e:
+                with self._cond:
+                    if c in self._aguardando:
+                        self._aguardando.remove(c)
+                    self.falhas += 1
+                c._concluir('falhou', str(e) or type(e).__name__)   # erro fica no log
+                return False
+            t1 = time.perf_counter()
+            self.enviados += 1
+            self._h_escrita.observar(t1 - t0)
+            if c.envios == 1:
+                self._h_espera.observar(max(0.0, t0 - c.quando))
+                if c.prioridade == PRIORIDADE_SCRIPT:
+                    self._h_atraso.observar(max(0.0, t0 - c.quando))
+        if c.ack is None:
+            c._concluir('enviado')
+        return True
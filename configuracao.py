@@ -0,0 +1,180 @@
+import json
+import os
+import re
+import threading
+
+# ==========================
+# CONFIGURAÇÃO PERSISTIDA (RECARGA A QUENTE)
+# ==========================
+ARQUIVO_CONFIG = 'configuracao.json'
+
+# campo -> (tipo, mínimo aceito; None = sem mínimo)
+CAMPOS = {
+    'porta_serial': (str, None),
+    'baudrate': (int, 1),
+    'tamanho_bloco': (int, 0),          # bytes por read(); 0 = tudo que estiver na porta
+    'max_linha': (int, 16),
+    'lote_csv': (int, 1),
+    'intervalo_flush_csv': (float, 0.01),
+    'capacidade_historico': (int, 2),
+    'intervalo_ui': (float, 0.05),
+    'limite_rpm': (float, None),
+    'tolerancia_rpm_pct': (float, 0.0),
+    'limite_temperatura': (float, None),
+    'taxa_max_rpm': (float, 0.0),
+    'comando_corte': (str, None),       # '' = o alarme só avisa
+    'fator_k': (float, None),
+    'taxa_max_tx': (float, 0.0),        # comandos/s; 0 = sem limite
+    'ack_comandos': (str, None),        # regex da confirmação, '{comando}' = comando enviado; '' = sem
+    'protocolo': (str, None),           # formato do enlace, um de OPCOES['protocolo']
+}
+
+# campos de texto com valores fixos (a tela de Configurações mostra uma lista)
+OPCOES = {
+    'protocolo': ('texto', 'binario'),  # 'binario' negocia a cada abertura e volta ao texto se preciso
+}
+
+
+def validar(valores: dict) -> dict:
+    """Converte e confere todos os campos; ValueError com o nome do primeiro inválido."""
+    saida = {}
+    for nome, (tipo, minimo) in CAMPOS.items():
+        if nome not in valores:
+            raise ValueError(f'{nome}: campo faltando')
+        bruto = valores[nome]
+        try:
+            if tipo is int and isinstance(bruto, float) and not bruto.is_integer():
+                raise ValueError
+            valor = tipo(bruto)
+        except (TypeError, ValueError):
+            raise ValueError(f'{nome}: esperado {tipo.__name__}, veio {bruto!r}') from None
+        if valor != valor:
+            raise ValueError(f'{nome}: NaN')
+        if minimo is not None and valor < minimo:
+            raise ValueError(f'{nome}: mínimo {minimo}, veio {valor}')
+        if nome in OPCOES and valor not in OPCOES[nome]:
+            raise ValueError(f'{nome}: esperado um de {", ".join(OPCOES[nome])}, veio {valor!r}')
+        saida[nome] = valor
+    try:
+        re.compile(saida['ack_comandos'].replace('{comando}', ''))
+    except re.error as e:
+        raise ValueError(f'ack_comandos: regex inválida ({e})') from None
+    return saida
+
+
+class Configuracao:
+    """
+    Parâmetros da bancada num arquivo JSON, aplicados sem reiniciar.
+
+    A versão em vigor é publicada como uma tupla (versao, valores), trocada
+    por inteiro a cada mudança: quem lê `publicado` tem um conjunto coerente,
+    nunca metade de uma alteração. A thread de aquisição compara a versão
+    entre duas leituras da porta e aplica a nova de uma vez.
+
+    `atualizar()` valida tudo antes de publicar (um campo inválido rejeita a
+    mudança inteira), grava o arquivo de forma atômica (temporário +
+    os.replace) e chama os observadores com o conjunto de campos alterados.
+    `recarregar_se_mudou()`, chamada periodicamente, pega edições feitas
+    direto no arquivo.
+    """
+
+    def __init__(self, caminho: str, padroes: dict):
+        self.caminho = caminho
+        self.padroes = validar(padroes)
+        self.publicado = (0, self.padroes)
+        self.erro = None
+        self._observadores = []
+        self._mudou = threading.Condition()
+        self._mtime = None
+
+        if os.path.exists(caminho):
+            self.carregar()
+        else:
+            self.gravar()
+
+    @property
+    def versao(self) -> int:
+        return self.publicado[0]
+
+    @property
+    def valores(self) -> dict:
+        return self.publicado[1]
+
+    def __getitem__(self, nome: str):
+        return self.publicado[1][nome]
+
+    def observar(self, funcao):
+        """`funcao(valores, mudou)` é chamada na thread que fez a mudança."""
+        self._observadores.append(funcao)
+
+    def atualizar(self, mudancas: dict, gravar: bool = True) -> set:
+        """Aplica `mudancas` sobre os valores atuais; devolve os campos que mudaram."""
+        desconhecidos = set(mudancas) - set(CAMPOS)
+        if desconhecidos:
+            raise ValueError(f'campos desconhecidos: {", ".join(sorted(desconhecidos))}')
+        atuais = self.valores
+        novos = validar({**atuais, **mudancas})
+        mudou = {nome for nome, valor in novos.items() if valor != atuais[nome]}
+        if not mudou:
+            return mudou
+
+        with self._mudou:
+            self.publicado = (self.versao + 1, novos)
+            self._mudou.notify_all()
+        if gravar:
+            self.gravar()
+        for funcao in self._observadores:
+            try:
+                funcao(novos, mudou)
+            except Exception as e:
+                print('[CONFIG] ERRO ao aplicar:', e)
+        return mudou
+
+    def carregar(self) -> set:
+        """Relê o arquivo; campos ausentes ficam com o padrão. Arquivo inválido não muda nada."""
+        try:
+            self._mtime = os.stat(self.caminho).st_mtime_ns
+            with open(self.caminho, encoding='utf-8') as f:
+                lido = json.load(f)
+            if not isinstance(lido, dict):
+                raise ValueError('o arquivo deve conter um objeto JSON')
+            ignorados = set(lido) - set(CAMPOS)
+            if ignorados:
+                print(f'[CONFIG] campos ignorados em {self.caminho}: {", ".join(sorted(ignorados))}')
+            valores = {**self.padroes, **{k: v for k, v in lido.items() if k in CAMPOS}}
+            mudou = self.atualizar(valores, gravar=False)
+        except (OSError, ValueError) as e:
+            self.erro = str(e)
+            print(f'[CONFIG] ERRO em {self.caminho}, mantendo a configuração atual:', e)
+            return set()
+        self.erro = None
+        if mudou:
+            print(f'[CONFIG] {self.caminho} recarregado: {", ".join(sorted(mudou))}')
+        return mudou
+
+    def recarregar_se_mudou(self) -> set:
+        try:
+            mtime = os.stat(self.caminho).st_mtime_ns
+        except OSError:
+            return set()
+        if mtime == self._mtime:
+            return set()
+        return self.carregar()
+
+    def gravar(self):
+        temporario = self.caminho + '.tmp'
+        try:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(self.valores, f, indent=2, ensure_ascii=False)
+                f.write('\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.caminho)
+            self._mtime = os.stat(self.caminho).st_mtime_ns
+        except OSError as e:
+            print('[CONFIG] ERRO ao gravar:', e)
+
+    def esperar(self, versao: int, timeout: float | None = None) -> bool:
+        """Bloqueia até a versão ser diferente de `versao` (ou o timeout); True se mudou."""
+        with self._mudou:
+            return self._mudou.wait_for(lambda: self.versao != versao, timeout)
@@ -0,0 +1,160 @@
+import json
+import time
+
+from metricas import RegistroMetricas
+
+# ==========================
+# DIFUSÃO DA FOTOGRAFIA DO DASHBOARD
+# ==========================
+FALHAS_PARA_CANCELAR = 20   # erros seguidos de um assinante até ele ser removido
+
+
+def _hora(ts: float) -> str:
+    return time.strftime('%H:%M:%S', time.localtime(ts))
+
+
+def payloads(pontos: dict) -> dict:
+    """JSON pronto para o supervisorioAnexar de cada gráfico."""
+    return {
+        'rpm': json.dumps({'x': pontos['xs'], 'y': pontos['rpm']}),
+        'temperatura': json.dumps({'x': pontos['xs'], 'y': pontos['temperatura']}),
+        'vi': json.dumps({'y': [list(p) for p in zip(pontos['tensao'], pontos['corrente'])]}),
+    }
+
+
+class DifusorPainel:
+    """
+    Um único produtor por tick para todos os dashboards abertos.
+
+    `tick()` copia só as amostras novas desde o tick anterior (leitura sem
+    lock do histórico da `fonte`: um PipelineAquisicao, ou qualquer objeto
+    com `historico`, como uma multibancada.Bancada), formata os rótulos
+    e serializa o JSON dos gráficos; a mesma fotografia é entregue a todos
+    os assinantes. Cada cliente passa o próprio cursor a `dados_para` e
+    envia o payload já pronto.
+
+    Com `enlace` (SupervisorEnlace), a fotografia leva a descrição do
+    estado da porta e também é entregue quando só ela mudou: sem dados
+    chegando, o dashboard mostra a queda em vez dos últimos valores.
+
+    Um erro num assinante é registrado e contado, mas ele continua
+    assinando; só sai depois de FALHAS_PARA_CANCELAR erros seguidos.
+    """
+
+    def __init__(self, fonte, janela: int, metricas: RegistroMetricas | None = None,
+                 enlace=None):
+        self.fonte = fonte
+        self.janela = janela
+        self.enlace = enlace
+        self._enlace = 'conectado'
+
+        self._assinantes = {}
+        self._falhas = {}     # assinante -> erros seguidos
+        self.falhas = 0
+        self._total = None
+        self.ultima = None
+
+        m = metricas if metricas is not None else RegistroMetricas()
+        m.medidor('painel_clientes', 'Dashboards abertos', lambda: len(self._assinantes))
+        m.medidor('painel_falhas_total', 'Erros de assinantes ao receber a fotografia',
+                  lambda: self.falhas, 'counter')
+        self._h_tick = m.histograma('render_segundos', 'Tick do painel: fotografia e envio a todos os clientes')
+        self._h_foto = m.histograma('fotografia_segundos', 'Cópia das amostras novas para o painel')
+
+    def __len__(self):
+        return len(self._assinantes)
+
+    def assinar(self, chave, callback):
+        self._assinantes[chave] = callback
+
+    def cancelar(self, chave):
+        self._assinantes.pop(chave, None)
+        self._falhas.pop(chave, None)
+
+    def _entregar(self, chave, callback, foto: dict):
+        try:
+            callback(foto)
+        except Exception as e:
+            self.falhas += 1
+            seguidas = self._falhas[chave] = self._falhas.get(chave, 0) + 1
+            if seguidas >= FALHAS_PARA_CANCELAR:
+                print(f'[PAINEL] assinante removido após {seguidas} erros seguidos:', repr(e))
+                self.cancelar(chave)
+            elif seguidas == 1:
+                print('[PAINEL] ERRO no assinante:', repr(e))
+        else:
+            self._falhas.pop(chave, None)
+
+    def fotografar(self) -> dict:
+        t0 = time.perf_counter()
+        estado = getattr(self.fonte, 'estado', None)
+        ultima = estado['ultima_linha'] if estado is not None else ''
+        total, novas = self.fonte.historico.instantaneo(self.janela, desde=self._total)
+        pontos = {k: v.tolist() for k, v in novas.items()}
+        self._h_foto.observar(time.perf_counter() - t0)
+        self._total = total
+
+        pontos['xs'] = [_hora(t) for t in pontos['ts']]
+        foto = {
+            'total': total,
+            'n': len(pontos['ts']),
+            'pontos': pontos,
+            'json': payloads(pontos),
+            'ultima_linha': ultima,
+        }
+        if foto['n']:
+            foto['atual'] = {k: pontos[k][-1] for k in ('rpm', 'temperatura', 'tensao', 'corrente')}
+        # o estado dos alarmes vem do motor, avaliado na aquisição
+        alarmes = getattr(self.fonte, 'alarmes', None)
+        foto['alertas'] = [r.descricao for r in alarmes.ativos] if alarmes is not None else []
+        foto['alerta'] = bool(foto['alertas'])
+        foto['enlace'] = self.enlace.descricao() if self.enlace is not None else 'conectado'
+        foto['sem_dados'] = self.enlace is not None and (
+            self.enlace.queda is not None or self.enlace.estado != 'conectado')
+        return foto
+
+    def tick(self):
+        if not self._assinantes:
+            return
+
+        inicio = time.perf_counter()
+        foto = self.fotografar()
+        self.ultima = foto
+        mudou_enlace = foto['enlace'] != self._enlace
+        self._enlace = foto['enlace']
+        if foto['n'] or mudou_enlace:
+            for chave, callback in list(self._assinantes.items()):
+                self._entregar(chave, callback, foto)
+
+        self._h_tick.observar(time.perf_counter() - inicio)
+
+    @staticmethod
+    def recorte(foto: dict, k: int) -> dict:
+        """Payloads só com os últimos `k` pontos (cliente que entrou no meio do tick)."""
+        pontos = {nome: v[-k:] for nome, v in foto['pontos'].items()}
+        return payloads(pontos)
+
+    def dados_para(self, cursor: dict, foto: dict) -> dict | None:
+        """
+        Payloads do que falta a um cliente com `cursor` ({'total': ...}) até
+        `foto`, avançando o cursor; None se não falta nada.
+
+        O caso comum é a fotografia inteira, ou um recorte dela para quem
+        abriu a página no meio do tick. Quem assinou só depois de ticks que
+        não recebeu (a página monta antes do socket conectar) relê as
+        amostras perdidas do histórico, até a janela.
+        """
+        faltam = foto['total'] - cursor['total']
+        if faltam <= 0:
+            return None
+        if faltam <= foto['n']:
+            cursor['total'] = foto['total']
+            return foto['json'] if faltam == foto['n'] else self.recorte(foto, faltam)
+        historico = self.fonte.historico
+        adiante = max(0, historico.total - foto['total'])
+        total, novas = historico.instantaneo(self.janela + adiante, desde=cursor['total'])
+        fim = len(novas['ts']) - max(0, total - foto['total'])   # o que passou da foto fica para o próximo tick
+        pontos = {k: v[:fim][-self.janela:].tolist() for k, v in novas.items()}
+        pontos['xs'] = [_hora(t) for t in pontos['ts']]
+        cursor['total'] = foto['total']
+        return payloads(pontos)
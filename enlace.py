@@ -0,0 +1,294 @@
+import threading
+import time
+from collections import deque
+
+from metricas import RegistroMetricas
+from quadros_binarios import TIMEOUT_NEGOCIACAO, negociar
+from transporte import abrir_transporte
+
+try:
+    from serial.tools import list_ports
+except ImportError:  # pyserial sem tools: sem redescoberta por VID/PID
+    list_ports = None
+
+# ==========================
+# SUPERVISÃO DO ENLACE SERIAL
+# ==========================
+ESPERA_INICIAL = 0.25   # s até a primeira nova tentativa; dobra a cada falha
+ESPERA_MAXIMA = 30.0
+SILENCIO_MAX = 5.0      # s sem nenhum byte com a porta aberta = enlace caído (0 = não vigia)
+TAMANHO_LOG_LACUNAS = 100
+
+# transportes locais: não somem do sistema nem ficam mudos por falha de cabo
+_LOCAIS = ('pty', 'sim://', 'arquivo://', 'replay://')
+
+
+class EnlaceMudo(OSError):
+    """Porta aberta sem nenhum byte por `segundos`: tratada como queda."""
+
+    def __init__(self, segundos: float):
+        super().__init__(f'{segundos:.0f} s sem dados')
+        self.segundos = segundos
+
+
+def eh_local(endereco: str) -> bool:
+    return endereco.startswith(_LOCAIS)
+
+
+def eh_porta_serial(endereco: str) -> bool:
+    return '://' not in endereco and endereco != 'pty'
+
+
+def identificar_porta(endereco: str) -> tuple | None:
+    """(vid, pid, número de série) do adaptador USB em `endereco`; None se não for USB."""
+    if list_ports is None or not eh_porta_serial(endereco):
+        return None
+    for p in list_ports.comports():
+        if p.device == endereco and p.vid is not None:
+            return p.vid, p.pid, p.serial_number
+    return None
+
+
+def redescobrir_porta(endereco: str, identidade: tuple | None) -> str:
+    """
+    Nome atual do mesmo adaptador: depois de um reset de USB o dispositivo
+    pode voltar como outra porta (ttyUSB0 -> ttyUSB1, COM3 -> COM5).
+    Sem identidade, ou com `endereco` ainda presente, devolve `endereco`.
+    """
+    if identidade is None or list_ports is None:
+        return endereco
+    vid, pid, numero = identidade
+    candidatos = [p.device for p in list_ports.comports()
+                  if (p.vid, p.pid) == (vid, pid) and (numero is None or p.serial_number == numero)]
+    if not candidatos or endereco in candidatos:
+        return endereco
+    return candidatos[0]
+
+
+class SupervisorEnlace:
+    """
+    Dono da conexão com o dispositivo: abre, reabre e registra o que se
+    perdeu no meio.
+
+    A aquisição (thread ou tarefa asyncio) chama `abrir()` até conseguir,
+    esperando `espera` segundos entre tentativas (backoff exponencial de
+    ESPERA_INICIAL até ESPERA_MAXIMA), e `caiu()` quando a leitura falha.
+    Depois de uma queda a porta é procurada de novo pelo VID/PID/número de
+    série do adaptador, porque um reset de USB pode trocar o nome dela.
+
+    `vigiar()` é chamado fora do caminho quente (leitura vazia, ou enquanto
+    há uma queda em aberto): com a porta aberta e nenhum byte por
+    `silencio_max` segundos, levanta EnlaceMudo e a aquisição trata como
+    queda (adaptador que some sem erro no read). Transportes locais não
+    são vigiados.
+
+    Cada queda vira uma lacuna (início, fim, motivo): do último dado antes
+    da queda ao primeiro depois da volta. As lacunas ficam em `lacunas` e,
+    se houver `armazenamento`, no histórico em disco, para os relatórios
+    saberem que ali faltam dados e não que a bancada estava parada.
+    Nada vai para o console: o estado aparece em `descricao()` e nas
+    métricas enlace_*, que a thread de aquisição só atualiza.
+
+    Escritas na porta (fila de comandos, alarmes) passam por `escrever()`,
+    que usa o mesmo lock da troca de conexão.
+
+    Com `protocolo = 'binario'`, cada abertura negocia o formato binário
+    (quadros_binarios.negociar) antes de entregar a porta ao leitor; o
+    dispositivo que não responde fica no texto. A negociação bloqueia até
+    `timeout_negociacao` segundos (no modo asyncio, o event loop).
+    """
+
+    def __init__(self, leitor, armazenamento=None, metricas: RegistroMetricas | None = None,
+                 espera_inicial: float = ESPERA_INICIAL, espera_maxima: float = ESPERA_MAXIMA,
+                 silencio_max: float = SILENCIO_MAX):
+        self.leitor = leitor
+        self.armazenamento = armazenamento
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.silencio_max = silencio_max
+        self.protocolo = 'texto'       # 'texto' | 'binario' (tenta negociar, volta ao texto)
+        self.timeout_negociacao = TIMEOUT_NEGOCIACAO
+
+        self.conexao = None
+        self.endereco = None
+        self.alvo = None               # porta aberta de fato (o adaptador pode voltar com outro nome)
+        self.estado = 'desconectado'   # 'conectado' | 'reconectando' | 'desconectado'
+        self.espera = espera_inicial
+        self.falhas = 0                # tentativas seguidas sem abrir
+        self.ultimo_erro = None
+        self.conectado_desde = None    # monotonic da abertura atual
+        self.queda = None              # (ts do último dado, motivo) enquanto faltam dados
+        self.lacunas = deque(maxlen=TAMANHO_LOG_LACUNAS)
+
+        self.reconexoes = 0
+        self.falhas_abertura = 0
+        self.n_lacunas = 0
+        self.segundos_sem_dados = 0.0
+        self.erros_registro = 0        # lacunas que não entraram no histórico em disco
+
+        self._identidade = None
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._ultimo_dado = time.monotonic()
+        self._ultimo_dado_ts = None    # time.time() correspondente
+
+        m = metricas if metricas is not None else RegistroMetricas()
+        m.medidor('enlace_conectado', 'Porta aberta (1) ou não (0)',
+                  lambda: int(self.estado == 'conectado'))
+        m.medidor('enlace_uptime_segundos', 'Tempo desde a última abertura da porta', self.uptime)
+        m.medidor('enlace_reconexoes_total', 'Reaberturas depois de uma queda',
+                  lambda: self.reconexoes, 'counter')
+        m.medidor('enlace_falhas_abertura_total', 'Tentativas de abrir a porta que falharam',
+                  lambda: self.falhas_abertura, 'counter')
+        m.medidor('enlace_lacunas_total', 'Intervalos sem dados registrados',
+                  lambda: self.n_lacunas, 'counter')
+        m.medidor('enlace_sem_dados_segundos_total', 'Soma da duração das lacunas',
+                  lambda: self.segundos_sem_dados, 'counter')
+        m.medidor('enlace_erros_registro_lacuna_total', 'Lacunas que não puderam ser gravadas em disco',
+                  lambda: self.erros_registro, 'counter')
+
+    @property
+    def conectado(self) -> bool:
+        conexao = self.conexao
+        return conexao is not None and conexao.is_open
+
+    def uptime(self) -> float:
+        desde = self.conectado_desde
+        return time.monotonic() - desde if desde is not None and self.estado == 'conectado' else 0.0
+
+    def descricao(self) -> str:
+        """Uma linha para a interface; muda a cada segundo enquanto faltam dados."""
+        if self.queda is not None:
+            parado = time.time() - self.queda[0]
+            if self.estado == 'conectado':
+                return f'porta reaberta, aguardando dados ({parado:.0f} s sem dados)'
+            return f'{self.queda[1]}; reconectando ({parado:.0f} s sem dados, tentativa {self.falhas + 1})'
+        if self.estado == 'conectado':
+            conexao = self.conexao
+            if conexao is not None and hasattr(conexao, 'caminho_escravo'):
+                return f'conectado (dispositivo escreve em {conexao.caminho_escravo})'
+            if self.alvo != self.endereco:
+                return f'conectado em {self.alvo} ({self.endereco} voltou com outro nome)'
+            return 'conectado'
+        if self.ultimo_erro is not None:
+            return f'desconectado: {self.ultimo_erro}'
+        return 'desconectado'
+
+    # -------- abertura e queda --------
+    def abrir(self, endereco: str, baudrate: int, timeout: float):
+        """
+        Fecha a conexão atual e tenta abrir `endereco` (ou a porta para onde
+        o adaptador foi depois de uma queda). Devolve a conexão, ou None se
+        falhou; nesse caso espere `espera` segundos antes de tentar de novo.
+        """
+        if self.conexao is not None:
+            self.fechar('porta reaberta')
+        if endereco != self.endereco:
+            self._identidade = None
+            self.endereco = endereco
+            self.espera = self.espera_inicial
+            self.falhas = 0
+        alvo = redescobrir_porta(endereco, self._identidade) if self.queda is not None else endereco
+
+        try:
+            conexao = abrir_transporte(alvo, baudrate, timeout)
+        except Exception as e:
+            self.falhas += 1
+            self.falhas_abertura += 1
+            self.ultimo_erro = str(e)
+            if self.falhas > 1:
+                self.espera = min(self.espera * 2, self.espera_maxima)
+            return None
+
+        self.alvo = alvo
+        if self._identidade is None:
+            self._identidade = identificar_porta(alvo)
+        if self.queda is not None:
+            self.reconexoes += 1
+        self.leitor.trocar_porta(conexao)
+        if self.protocolo == 'binario':
+            self._negociar(conexao)
+        self._bytes = self.leitor.bytes_lidos
+        self._ultimo_dado = time.monotonic()
+        with self._lock:
+            self.conexao = conexao
+        self.estado = 'conectado'
+        self.conectado_desde = time.monotonic()
+        self.falhas = 0
+        self.ultimo_erro = None
+        return conexao
+
+    def _negociar(self, conexao):
+        try:
+            binario, resto = negociar(conexao, self.timeout_negociacao)
+        except Exception:
+            # porta ruim: a primeira leitura falha e derruba o enlace (o erro fica na queda)
+            return
+        self.leitor.usar_binario(binario, resto)   # formato em serial_binario
+
+    def caiu(self, motivo):
+        """Fecha a conexão depois de um erro de leitura; a lacuna começa no último dado."""
+        self.ultimo_erro = str(motivo)
+        self.fechar(motivo)
+        self.estado = 'reconectando'
+
+    def _marcar_queda(self, motivo):
+        if self.leitor.bytes_lidos != self._bytes:
+            # chegaram dados depois do último vigiar(): o último foi agora, ou
+            # antes do silêncio que derrubou o enlace
+            self._bytes = self.leitor.bytes_lidos
+            self._ultimo_dado_ts = time.time() - getattr(motivo, 'segundos', 0.0)
+            self.espera = self.espera_inicial         # enlace estava bom: recomeça o backoff
+        if self.queda is None and self._ultimo_dado_ts is not None:
+            self.queda = (self._ultimo_dado_ts, str(motivo))
+
+    def fechar(self, motivo=None):
+        """Fecha a porta; com `motivo`, o tempo até o próximo dado vira lacuna."""
+        if motivo is not None and self.conexao is not None:
+            self._marcar_queda(motivo)
+        with self._lock:  # nenhum comando sai pela porta que está sendo fechada
+            conexao, self.conexao = self.conexao, None
+        if conexao is not None:
+            try:
+                conexao.close()
+            except Exception:
+                pass  # adaptador que sumiu pode falhar até no close
+        self.estado = 'desconectado'
+        self.conectado_desde = None
+
+    def escrever(self, dados: bytes):
+        with self._lock:
+            conexao = self.conexao
+            if conexao is None or not conexao.is_open:
+                raise OSError('serial não conectada')
+            conexao.write(dados)
+            conexao.flush()
+
+    # -------- vigilância --------
+    def vigiar(self):
+        """Nota bytes novos (fechando a lacuna em aberto) ou levanta OSError num silêncio longo."""
+        bytes_lidos = self.leitor.bytes_lidos
+        agora = time.monotonic()
+        if bytes_lidos != self._bytes:
+            self._bytes = bytes_lidos
+            self._ultimo_dado = agora
+            self._ultimo_dado_ts = time.time()
+            if self.queda is not None:
+                self._fechar_lacuna(self._ultimo_dado_ts)
+        elif (self.silencio_max and not eh_local(self.endereco or '')
+              and agora - self._ultimo_dado > self.silencio_max):
+            raise EnlaceMudo(agora - self._ultimo_dado)
+
+    def _fechar_lacuna(self, fim: float):
+        inicio, motivo = self.queda
+        self.queda = None
+        self.espera = self.espera_inicial
+        duracao = max(0.0, fim - inicio)
+        self.n_lacunas += 1
+        self.segundos_sem_dados += duracao
+        self.lacunas.append((inicio, fim, motivo))
+        if self.armazenamento is not None:
+            try:
+                self.armazenamento.registrar_lacuna(inicio, fim, motivo)
+            except OSError:
+                self.erros_registro += 1
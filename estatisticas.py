@@ -0,0 +1,153 @@
+import math
+
+import numpy as np
+
+from historico import CANAIS
+
+# ==========================
+# ESTATÍSTICAS INCREMENTAIS DA SESSÃO
+# ==========================
+LACUNA_MAX = 10.0   # s entre amostras; intervalos maiores são falta de dados (tempos, energia, espectro)
+
+
+class EstatisticaCanal:
+    """Contagem, média, variância (Welford), mínimo e máximo em O(1) por amostra."""
+
+    __slots__ = ('n', 'media', '_m2', 'minimo', 'maximo', 'ts_maximo')
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self._m2 = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self.ts_maximo = None
+
+    def adicionar(self, x: float, ts: float):
+        if x != x:  # NaN vindo do firmware não entra na conta
+            return
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self._m2 += delta * (x - self.media)
+        if x < self.minimo:
+            self.minimo = x
+        if x > self.maximo:
+            self.maximo = x
+            self.ts_maximo = ts
+
+    @property
+    def variancia(self) -> float:
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def desvio(self) -> float:
+        return math.sqrt(self.variancia)
+
+    def resumo(self) -> dict:
+        vazio = not self.n
+        return {
+            'n': self.n,
+            'media': self.media,
+            'desvio': self.desvio,
+            'min': 0.0 if vazio else self.minimo,
+            'max': 0.0 if vazio else self.maximo,
+            'ts_max': self.ts_maximo,
+        }
+
+
+class EstatisticasSessao:
+    """
+    Acumulador online atualizado pela thread serial a cada amostra.
+    Além das estatísticas por canal, mede o tempo com RPM acima de
+    `limite_rpm` (cada intervalo entre amostras conta pelo estado da
+    amostra que o inicia). Intervalos maiores que `lacuna_max` são queda
+    de comunicação e não entram na duração nem no tempo acima.
+    """
+
+    def __init__(self, limite_rpm: float, lacuna_max: float = LACUNA_MAX):
+        self.limite_rpm = limite_rpm
+        self.lacuna_max = lacuna_max
+        self.canais = {nome: EstatisticaCanal() for nome in CANAIS}
+        self.total = 0
+        self.amostras_acima = 0
+        self.tempo_acima = 0.0
+        self.duracao = 0.0
+        self._ts_anterior = None
+        self._acima_anterior = False
+
+    def adicionar(self, ts: float, rpm: float, temperatura: float,
+                  tensao: float, corrente: float):
+        self.total += 1
+        c = self.canais
+        c['rpm'].adicionar(rpm, ts)
+        c['temperatura'].adicionar(temperatura, ts)
+        c['tensao'].adicionar(tensao, ts)
+        c['corrente'].adicionar(corrente, ts)
+
+        if self._ts_anterior is not None:
+            dt = ts - self._ts_anterior
+            if dt <= self.lacuna_max:
+                self.duracao += dt
+                if self._acima_anterior:
+                    self.tempo_acima += dt
+
+        acima = rpm > self.limite_rpm
+        if acima:
+            self.amostras_acima += 1
+        self._ts_anterior = ts
+        self._acima_anterior = acima
+
+    def resumo(self) -> dict:
+        """Fotografia das estatísticas (de outra thread, use PipelineAquisicao.resumo)."""
+        return {
+            'total': self.total,
+            'limite_rpm': self.limite_rpm,
+            'amostras_acima': self.amostras_acima,
+            'tempo_acima': self.tempo_acima,
+            'duracao': self.duracao,
+            'canais': {nome: c.resumo() for nome, c in self.canais.items()},
+        }
+
+
+def estatisticas_de_colunas(colunas: dict, limite_rpm: float,
+                            lacuna_max: float = LACUNA_MAX) -> dict:
+    """
+    Mesmo formato de `EstatisticasSessao.resumo()`, calculado de uma vez
+    sobre arrays (consultas ao histórico em disco). NaN é ignorado; as
+    lacunas maiores que `lacuna_max` ficam fora dos tempos, como lá.
+    """
+    ts = colunas['ts']
+    resumo = {
+        'total': len(ts),
+        'limite_rpm': limite_rpm,
+        'amostras_acima': 0,
+        'tempo_acima': 0.0,
+        'duracao': 0.0,
+        'canais': {},
+    }
+
+    for nome in CANAIS:
+        x = colunas[nome]
+        validos = x[~np.isnan(x)]
+        if not len(validos):
+            resumo['canais'][nome] = EstatisticaCanal().resumo()
+            continue
+        i_max = int(np.nanargmax(x))
+        resumo['canais'][nome] = {
+            'n': len(validos),
+            'media': float(validos.mean()),
+            'desvio': float(validos.std(ddof=1)) if len(validos) > 1 else 0.0,
+            'min': float(validos.min()),
+            'max': float(validos.max()),
+            'ts_max': float(ts[i_max]),
+        }
+
+    acima = colunas['rpm'] > limite_rpm
+    resumo['amostras_acima'] = int(acima.sum())
+    if len(ts) > 1:
+        dt = np.diff(ts)
+        continuos = dt <= lacuna_max
+        resumo['duracao'] = float(dt[continuos].sum())
+        resumo['tempo_acima'] = float(dt[continuos & acima[:-1]].sum())
+    return resumo
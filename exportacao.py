@@ -0,0 +1,96 @@
+import os
+import tempfile
+import time
+
+from analise import analisar, linhas_resumo
+
+# ==========================
+# EXPORTAÇÃO EXCEL EM STREAMING
+# ==========================
+MAX_LINHAS_XLSX = 1_048_576          # limite de linhas por planilha do formato
+PASTA_EXPORTACOES = os.path.join(tempfile.gettempdir(), 'supervisorio_exportacoes')
+IDADE_MAX_EXPORTACAO = 3600          # s; arquivos mais velhos são apagados
+
+CABECALHO = ['ts', 'rpm', 'temperatura', 'tensao', 'corrente']
+
+
+def novo_arquivo(sufixo: str) -> str:
+    """Caminho temporário único (exportações simultâneas não se sobrescrevem)."""
+    os.makedirs(PASTA_EXPORTACOES, exist_ok=True)
+
+    agora = time.time()
+    for nome in os.listdir(PASTA_EXPORTACOES):
+        caminho = os.path.join(PASTA_EXPORTACOES, nome)
+        try:
+            if agora - os.path.getmtime(caminho) > IDADE_MAX_EXPORTACAO:
+                os.remove(caminho)
+        except OSError:
+            pass
+
+    fd, caminho = tempfile.mkstemp(prefix='relatorio_', suffix=sufixo, dir=PASTA_EXPORTACOES)
+    os.close(fd)
+    return caminho
+
+
+def pre_carregar() -> float:
+    """Importa o openpyxl antes da primeira exportação; devolve os segundos."""
+    inicio = time.perf_counter()
+    import openpyxl
+    return time.perf_counter() - inicio
+
+
+def exportar_excel(colunas: dict, caminho: str, progresso: dict | None = None,
+                   tamanho_bloco: int = 10_000, max_linhas: int = MAX_LINHAS_XLSX) -> int:
+    """
+    Grava as colunas (arrays do HistoricoCircular) em xlsx, bloco a bloco,
+    com o Workbook em modo write-only: as linhas vão direto para o arquivo
+    e nenhuma planilha fica montada em memória. Passando do limite de
+    linhas do formato, abre uma nova aba. `progresso['feito']` vai de 0 a 1.
+    Ao final, uma aba 'Análise' com os indicadores de `analise.analisar`.
+    Devolve o número de linhas gravadas.
+    """
+    from openpyxl import Workbook   # só quando exporta: pesa na partida do supervisório
+
+    total = len(colunas['ts'])
+    wb = Workbook(write_only=True)
+    ws = None
+    linhas_aba = max_linhas
+
+    for ini in range(0, total, tamanho_bloco):
+        fim = min(ini + tamanho_bloco, total)
+        bloco = zip(
+            (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))
+             for t in colunas['ts'][ini:fim]),
+            colunas['rpm'][ini:fim].tolist(),
+            colunas['temperatura'][ini:fim].tolist(),
+            colunas['tensao'][ini:fim].tolist(),
+            colunas['corrente'][ini:fim].tolist(),
+        )
+        for linha in bloco:
+            if linhas_aba >= max_linhas:
+                ws = wb.create_sheet(f'Medições {len(wb.worksheets) + 1}')
+                ws.append(CABECALHO)
+                linhas_aba = 1
+            ws.append(linha)
+            linhas_aba += 1
+
+        if progresso is not None:
+            progresso['feito'] = fim / total
+
+    if total:
+        _aba_analise(wb, analisar(colunas))
+    wb.save(caminho)
+    return total
+
+
+def _aba_analise(wb, a: dict):
+    """Indicadores e trechos em regime permanente, numa aba à parte."""
+    ws = wb.create_sheet('Análise')
+    for linha in linhas_resumo(a):
+        ws.append([linha])
+    ws.append([])
+    ws.append(['regime_inicio', 'regime_fim', 'duracao_s', 'rpm_medio'])
+    for ini, fim, media in a['regimes']:
+        ws.append([time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ini)),
+                   time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(fim)),
+                   round(fim - ini, 1), round(media, 2)])
@@ -0,0 +1,208 @@
+import csv
+import os
+import queue
+import threading
+import time
+
+from metricas import RegistroMetricas
+
+# ==========================
+# GRAVAÇÃO DO CSV EM LOTES
+# ==========================
+CABECALHO = ['timestamp', 'rpm', 'temperatura', 'tensao', 'corrente']
+
+
+class GravadorCSV:
+    """
+    Estágio de persistência alimentado por fila, em thread própria.
+
+    A aquisição chama `enviar(linha)`, que nunca bloqueia: se a fila estiver
+    cheia a linha é descartada e contada em `descartadas`. A thread mantém o
+    arquivo aberto e grava em lotes, descarregando (flush) quando o lote
+    atinge `tamanho_lote` linhas ou quando `intervalo_flush` segundos se
+    passam desde o último flush. Em caso de queda, no máximo
+    `tamanho_lote` linhas (ou `intervalo_flush` segundos de dados) se perdem.
+    Com `fsync_lote=True` cada lote também é sincronizado no disco.
+
+    As linhas são tuplas (ts epoch, rpm, temperatura, tensao, corrente).
+    Se `armazenamento` for passado, cada lote também é inserido nele.
+
+    Erro de disco (cheio, arquivo apagado, pendrive removido) não derruba a
+    thread: o erro fica em `erro` (None quando volta a gravar) e em
+    `erros`, o arquivo é reaberto no próximo lote e as linhas que não
+    entraram no CSV são tentadas de novo, até `tamanho_fila` delas; além
+    disso as mais antigas são descartadas e contadas em `descartadas`. O
+    armazenamento recebe cada lote uma vez, independente do CSV.
+    """
+
+    def __init__(self, caminho: str, tamanho_lote: int = 50,
+                 intervalo_flush: float = 1.0, fsync_lote: bool = False,
+                 tamanho_fila: int = 10_000, armazenamento=None,
+                 metricas: RegistroMetricas | None = None):
+        self.caminho = caminho
+        self.armazenamento = armazenamento
+        # lidos juntos a cada volta da thread; `configurar` troca os dois de uma vez
+        self._parametros = (tamanho_lote, intervalo_flush)
+        self.fsync_lote = fsync_lote
+
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._rodar, daemon=True)
+
+        self.gravadas = 0
+        self.descartadas = 0
+        self.erros = 0
+        self.erro = None     # última falha de escrita no CSV, enquanto não se recupera
+        self._tamanho_fila = tamanho_fila
+
+        m = metricas if metricas is not None else RegistroMetricas()
+        m.medidor('gravador_fila', 'Linhas esperando gravação', self._fila.qsize)
+        m.medidor('gravador_gravadas_total', 'Linhas gravadas no CSV', lambda: self.gravadas, 'counter')
+        m.medidor('gravador_descartadas_total', 'Linhas perdidas com a fila cheia',
+                  lambda: self.descartadas, 'counter')
+        m.medidor('gravador_erros_total', 'Falhas de escrita no CSV', lambda: self.erros, 'counter')
+        m.medidor('gravador_falhando', 'CSV sem conseguir gravar (1) ou gravando (0)',
+                  lambda: int(self.erro is not None))
+        self._h_csv = m.histograma('gravacao_csv_segundos', 'Escrita e flush de um lote no CSV')
+        self._h_banco = m.histograma('gravacao_banco_segundos', 'Lote inserido no armazenamento')
+
+    @property
+    def tamanho_lote(self) -> int:
+        return self._parametros[0]
+
+    @property
+    def intervalo_flush(self) -> float:
+        return self._parametros[1]
+
+    def configurar(self, tamanho_lote: int, intervalo_flush: float):
+        """Vale a partir do próximo lote, com a thread rodando."""
+        self._parametros = (tamanho_lote, intervalo_flush)
+        try:
+            self._fila.put_nowait(None)  # acorda a thread para recalcular o prazo
+        except queue.Full:
+            pass
+
+    def iniciar(self):
+        self._thread.start()
+
+    def enviar(self, linha):
+        try:
+            self._fila.put_nowait(linha)
+        except queue.Full:
+            self.descartadas += 1
+
+    def parar(self, timeout: float | None = 5):
+        """Esvazia a fila, grava o que restou e faz fsync."""
+        self._parar.set()
+        try:
+            self._fila.put_nowait(None)  # acorda a thread sem esperar o intervalo de flush
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def _abrir(self):
+        novo = not os.path.exists(self.caminho)
+        f = open(self.caminho, 'a', newline='')
+        escritor = csv.writer(f)
+        if novo:
+            escritor.writerow(CABECALHO)
+        return f, escritor
+
+    def _falhou(self, e: OSError, f):
+        self.erros += 1
+        if self.erro is None:
+            print('[CSV] ERRO ao gravar, tentando de novo no próximo lote:', e)
+        self.erro = str(e)
+        if f is not None:
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    def _gravar_csv(self, f, escritor, linhas):
+        """Escreve e descarrega `linhas`; devolve (f, escritor), ou (None, None) se falhou."""
+        try:
+            if f is not None and not os.path.exists(self.caminho):
+                f.close()   # apagado com a sessão rodando: recomeça com cabeçalho
+                f = None
+            if f is None:
+                f, escritor = self._abrir()
+            escritor.writerows(
+                (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)), *valores)
+                for ts, *valores in linhas
+            )
+            f.flush()
+            if self.fsync_lote:
+                os.fsync(f.fileno())
+        except OSError as e:
+            self._falhou(e, f)
+            return None, None
+        if self.erro is not None:
+            print('[CSV] Gravação normalizada')
+            self.erro = None
+        return f, escritor
+
+    def _rodar(self):
+        f = escritor = None
+        try:
+            f, escritor = self._abrir()
+        except OSError as e:
+            self._falhou(e, None)
+        pendentes = []   # linhas que ainda não entraram no CSV (falha de escrita)
+        lote = []
+        ultimo_flush = time.monotonic()
+
+        while True:
+            tamanho_lote, intervalo_flush = self._parametros
+            prazo = ultimo_flush + intervalo_flush
+            try:
+                linha = self._fila.get(timeout=max(0.0, prazo - time.monotonic()))
+                # pega o que já estiver na fila sem esperar de novo
+                while True:
+                    if linha is not None:
+                        lote.append(linha)
+                    if len(lote) >= tamanho_lote:
+                        break
+                    linha = self._fila.get_nowait()
+            except queue.Empty:
+                pass
+
+            encerrando = self._parar.is_set()
+            if (len(lote) >= tamanho_lote or encerrando
+                    or time.monotonic() >= prazo):
+                if lote or pendentes:
+                    t0 = time.perf_counter()
+                    linhas = pendentes + lote
+                    f, escritor = self._gravar_csv(f, escritor, linhas)
+                    if f is not None:
+                        self.gravadas += len(linhas)
+                        pendentes = []
+                    else:
+                        excesso = len(linhas) - self._tamanho_fila
+                        if excesso > 0:
+                            self.descartadas += excesso
+                        pendentes = linhas[max(0, excesso):]
+                    t1 = time.perf_counter()
+                    self._h_csv.observar(t1 - t0)
+                    if lote and self.armazenamento is not None:
+                        try:
+                            self.armazenamento.adicionar_lote(lote)
+                        except Exception as e:
+                            print('[DADOS] ERRO ao gravar lote:', e)
+                        self._h_banco.observar(time.perf_counter() - t1)
+                    lote = []
+                ultimo_flush = time.monotonic()
+
+            if encerrando and self._fila.empty():
+                break
+
+        if pendentes:
+            self.descartadas += len(pendentes)
+            print(f'[CSV] {len(pendentes)} linhas não gravadas no encerramento:', self.erro)
+        if f is not None:
+            try:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+            except OSError as e:
+                self._falhou(e, None)
@@ -0,0 +1,131 @@
+import numpy as np
+
+# ==========================
+# HISTÓRICO CIRCULAR (COLUNAR)
+# ==========================
+CANAIS = ('rpm', 'temperatura', 'tensao', 'corrente')
+
+
+class HistoricoCircular:
+    """
+    Histórico de capacidade fixa, com uma coluna pré-alocada por canal
+    (timestamp, rpm, temperatura, tensao, corrente).
+
+    Cada amostra é gravada duas vezes (em `i` e em `i + slots`), de modo
+    que qualquer janela das últimas N amostras (N <= capacidade) é contígua
+    na memória e pode ser devolvida como view do NumPy, sem cópia. Há um
+    slot a mais que a capacidade: o da amostra que o escritor pode estar
+    gravando, que os leitores nunca copiam.
+
+    Um escritor, vários leitores, sem lock: o escritor grava as colunas e
+    só então incrementa `total`, que é a publicação da amostra. Leitores de
+    outras threads usam `instantaneo()`, que copia a janela e descarta as
+    amostras que o escritor possa ter sobrescrito durante a cópia (nunca
+    devolve uma amostra rasgada). `ultimos()` devolve views e só é seguro
+    na thread do escritor. Depende do GIL do CPython para a ordem das
+    escritas.
+    """
+
+    def __init__(self, capacidade: int):
+        if capacidade <= 0:
+            raise ValueError('capacidade deve ser positiva')
+
+        self.capacidade = capacidade
+        self._slots = capacidade + 1
+        self._colunas = {
+            nome: np.zeros(2 * self._slots, dtype=np.float64)
+            for nome in ('ts',) + CANAIS
+        }
+        self._pos = 0     # próxima posição de escrita, em [0, slots)
+        self._n = 0       # amostras retidas no buffer
+        self.total = 0    # amostras recebidas na sessão (não para no wrap)
+        self._inicio = 0  # índice global da primeira amostra guardada (ver redimensionado)
+
+    def __len__(self):
+        return min(self.total - self._inicio, self.capacidade)
+
+    def adicionar(self, ts: float, rpm: float, temperatura: float,
+                  tensao: float, corrente: float):
+        """Acrescenta uma amostra em O(1). `ts` é o epoch em segundos."""
+        i = self._pos
+        j = i + self._slots
+        for nome, valor in (('ts', ts), ('rpm', rpm),
+                            ('temperatura', temperatura),
+                            ('tensao', tensao), ('corrente', corrente)):
+            col = self._colunas[nome]
+            col[i] = valor
+            col[j] = valor
+
+        self._pos = (i + 1) % self._slots
+        if self._n < self.capacidade:
+            self._n += 1
+        self.total += 1   # publica: por último
+
+    def ultimos(self, n: int | None = None) -> dict:
+        """
+        Devolve as últimas `n` amostras (todas as retidas se `n` for None)
+        como views das colunas, na ordem cronológica.
+
+        As views continuam válidas até `capacidade - n` novas amostras
+        serem gravadas; para guardar por mais tempo, copie.
+        """
+        n = self._n if n is None else max(0, min(n, self._n))
+        fim = self._pos + self._slots
+        ini = fim - n
+        return {nome: col[ini:fim] for nome, col in self._colunas.items()}
+
+    def instantaneo(self, n: int | None = None, desde: int | None = None):
+        """
+        Cópia consistente das últimas `n` amostras (ou das que têm índice
+        global >= `desde`, ex.: o `total` visto na leitura anterior), segura
+        com o escritor rodando. Devolve (total, colunas): as colunas trazem
+        as amostras de índice [total - len, total).
+
+        A amostra de índice k ocupa o slot k % slots até o escritor começar
+        a gravar k + slots; a cópia é validada relendo `total` depois dela,
+        e as amostras mais antigas que possam ter sido atropeladas são
+        cortadas.
+        """
+        slots = self._slots
+        while True:
+            total = self.total
+            # o slot de `total` pode estar em escrita: sobram `capacidade` legíveis
+            limite = min(total - self._inicio, self.capacidade)
+            pedidas = limite if n is None else max(0, min(n, limite))
+            if desde is not None:
+                pedidas = max(0, min(pedidas, total - desde))
+            fim = total % slots + slots
+            colunas = {nome: col[fim - pedidas:fim].copy() for nome, col in self._colunas.items()}
+
+            # amostras k com k + slots <= total_depois podem ter sido sobrescritas
+            validas = self.capacidade - (self.total - total)
+            if validas >= pedidas:
+                return total, colunas
+            if validas > 0:
+                return total, {nome: c[pedidas - validas:] for nome, c in colunas.items()}
+            # leitor atrasado uma volta inteira no buffer: tenta de novo
+
+    def redimensionado(self, capacidade: int) -> 'HistoricoCircular':
+        """
+        Novo histórico com as últimas amostras deste (até `capacidade`) e o
+        mesmo `total`, para os cursores dos leitores continuarem valendo.
+        Só na thread do escritor; o pipeline publica o novo trocando a
+        referência, e quem ainda lê o antigo vê uma janela parada, coerente.
+        """
+        novo = HistoricoCircular(capacidade)
+        n = min(self._n, capacidade)
+        # a amostra de índice global k vai para o slot k % slots
+        slots = np.arange(self.total - n, self.total) % novo._slots
+        for nome, valores in self.ultimos(n).items():
+            col = novo._colunas[nome]
+            col[slots] = valores
+            col[slots + novo._slots] = valores
+        novo._pos = self.total % novo._slots
+        novo._n = n
+        novo.total = self.total
+        novo._inicio = self.total - n
+        return novo
+
+    def copia(self) -> dict:
+        """Cópia independente de todas as amostras retidas (segura entre threads)."""
+        return self.instantaneo()[1]
@@ -0,0 +1,138 @@
+import time
+
+from metricas import RegistroMetricas
+from quadros_binarios import FALHAS_PARA_TEXTO, DecodificadorBinario
+
+# ==========================
+# LEITOR SERIAL POR BLOCOS
+# ==========================
+MAX_LINHA = 4096  # bytes; acima disso o quadro é descartado (ruído/sem terminador)
+
+
+class LeitorLinhas:
+    """
+    Leitura orientada a eventos de linhas terminadas em '\\n'.
+
+    Em vez de consultar `in_waiting` e dormir, faz `read(in_waiting or 1)`:
+    com a porta aberta com `timeout`, a chamada bloqueia até chegar pelo
+    menos um byte e depois drena todo o burst de uma vez. Os bytes vão para
+    um buffer interno e só linhas completas são devolvidas; o resto fica
+    guardado para a próxima leitura (linhas parciais).
+
+    Funciona com qualquer objeto que tenha `read(n)` e `in_waiting`
+    (serial.Serial, pty, stand-ins de benchmark).
+
+    `backlog` guarda o `in_waiting` visto na última leitura: se cresce,
+    o pipeline não está acompanhando a porta.
+
+    `tamanho_bloco` limita os bytes de cada read() (0 = tudo o que estiver
+    na porta); blocos menores devolvem as primeiras linhas mais cedo sob
+    rajada, blocos maiores custam menos chamadas por byte.
+
+    Depois de negociado o formato binário (`usar_binario`), `ler()` devolve
+    os quadros decodificados por `quadros` (DecodificadorBinario) em vez de
+    linhas; uma sequência de quadros inválidos devolve o leitor ao texto.
+    """
+
+    def __init__(self, porta, max_linha: int = MAX_LINHA,
+                 metricas: RegistroMetricas | None = None, tamanho_bloco: int = 0):
+        self.porta = porta
+        self.max_linha = max_linha
+        self.tamanho_bloco = tamanho_bloco
+        self._buf = bytearray()
+        self.bytes_lidos = 0
+        self.linhas_descartadas = 0
+        self.backlog = 0
+        self.binario = False
+
+        m = metricas if metricas is not None else RegistroMetricas()
+        m.medidor('serial_bytes_total', 'Bytes lidos da porta', lambda: self.bytes_lidos, 'counter')
+        m.medidor('serial_backlog_bytes', 'Bytes esperando na porta na última leitura',
+                  lambda: self.backlog)
+        m.medidor('serial_linhas_descartadas_total', 'Linhas acima de MAX_LINHA',
+                  lambda: self.linhas_descartadas, 'counter')
+        m.medidor('serial_binario', 'Enlace no formato binário (1) ou texto (0)',
+                  lambda: int(self.binario))
+        self._h_leitura = m.histograma('leitura_segundos', 'Separação de um bloco em linhas')
+        self.quadros = DecodificadorBinario(m)
+
+    def _ler_bloco(self) -> bytes:
+        self.backlog = self.porta.in_waiting
+        n = self.backlog
+        if self.tamanho_bloco and n > self.tamanho_bloco:
+            n = self.tamanho_bloco
+        return self.porta.read(n or 1)
+
+    def ler_linhas(self) -> list[str]:
+        """Bloqueia até o timeout da porta; devolve as linhas completas (pode ser [])."""
+        bloco = self._ler_bloco()
+        if not bloco:
+            return []
+        return self.receber(bloco)
+
+    def ler(self) -> tuple:
+        """Como ler_linhas, no formato em uso: (quadros binários, linhas); um dos dois vem vazio."""
+        bloco = self._ler_bloco()
+        if not bloco:
+            return (), []
+        if self.binario:
+            return self.receber_quadros(bloco)
+        return (), self.receber(bloco)
+
+    def usar_binario(self, ativo: bool, resto: bytes = b''):
+        """Resultado da negociação; `resto` são os bytes lidos durante ela."""
+        self.binario = ativo
+        self.bytes_lidos += len(resto)
+        if ativo:
+            self.quadros.reiniciar(resto)
+        else:
+            self._buf += resto
+
+    def receber_quadros(self, bloco: bytes) -> tuple:
+        """Bloco no formato binário: (quadros válidos, mensagens de texto do firmware)."""
+        self.bytes_lidos += len(bloco)
+        quadros, mensagens = self.quadros.receber(bloco)
+        if self.quadros.invalidos_seguidos >= FALHAS_PARA_TEXTO:
+            print('[SERIAL] quadros binários inválidos em sequência: voltando ao formato texto')
+            self.binario = False
+        return quadros, mensagens
+
+    def trocar_porta(self, porta):
+        """Continua a leitura em outra porta; a linha parcial da anterior é descartada."""
+        self.porta = porta
+        self._buf.clear()
+        self.backlog = 0
+        self.binario = False   # a porta nova começa no texto até negociar
+
+    def receber(self, bloco: bytes) -> list[str]:
+        """Bloco lido por fora (ex.: aquisição asyncio): conta e separa as linhas."""
+        self.bytes_lidos += len(bloco)
+        t0 = time.perf_counter()
+        linhas = self.alimentar(bloco)
+        self._h_leitura.observar(time.perf_counter() - t0)
+        return linhas
+
+    def alimentar(self, bloco: bytes) -> list[str]:
+        """Acrescenta bytes ao buffer e separa as linhas completas."""
+        buf = self._buf
+        buf += bloco
+
+        fim = buf.rfind(b'\n')
+        if fim < 0:
+            if len(buf) > self.max_linha:
+                buf.clear()
+                self.linhas_descartadas += 1
+            return []
+
+        completos = bytes(buf[:fim])
+        del buf[:fim + 1]
+
+        linhas = []
+        for bruto in completos.split(b'\n'):
+            if len(bruto) > self.max_linha:
+                self.linhas_descartadas += 1
+                continue
+            linha = bruto.decode(errors='ignore').strip()
+            if linha:
+                linhas.append(linha)
+        return linhas
@@ -0,0 +1,175 @@
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================
+# MÉTRICAS DO PIPELINE
+# ==========================
+PREFIXO = 'supervisorio_'
+PORTA_METRICAS = 9108   # http://127.0.0.1:9108/metrics
+
+# limites (s) dos baldes: 1 µs .. 10 s, passos 1-2.5-5
+LIMITES_LATENCIA = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)
+
+
+class Medidor:
+    """
+    Valor lido só na coleta (fila, backlog). Com tipo 'counter' expõe um
+    contador que já existe em outra classe (ex.: parser.malformados) sem
+    custo nenhum no caminho quente.
+    """
+
+    def __init__(self, nome: str, ajuda: str, funcao, tipo: str = 'gauge'):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+        self.tipo = tipo
+
+    @property
+    def valor(self):
+        try:
+            return self.funcao()
+        except Exception:
+            return float('nan')
+
+    def linhas(self):
+        yield f'{PREFIXO}{self.nome} {self.valor}'
+
+
+class Histograma:
+    """
+    Histograma de baldes fixos, no formato do Prometheus. `observar` custa
+    uma busca binária e dois incrementos, sem lock: cada histograma tem um
+    único escritor. A coleta lê os contadores sem parar o escritor, então
+    uma fotografia pode estar uma observação atrasada em algum balde.
+    """
+
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, limites=LIMITES_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.limites = tuple(limites)
+        self.baldes = [0] * (len(self.limites) + 1)   # último = +Inf
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor: float):
+        self.baldes[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        if valor > self.maximo:
+            self.maximo = valor
+
+    @property
+    def n(self) -> int:
+        return sum(self.baldes)
+
+    def quantil(self, q: float) -> float:
+        """Estimativa por interpolação linear dentro do balde (como histogram_quantile)."""
+        baldes = list(self.baldes)
+        total = sum(baldes)
+        if not total:
+            return 0.0
+        alvo = q * total
+        acumulado = 0
+        for i, c in enumerate(baldes):
+            if acumulado + c >= alvo and c:
+                inferior = self.limites[i - 1] if i else 0.0
+                superior = self.limites[i] if i < len(self.limites) else self.maximo
+                return min(inferior + (superior - inferior) * (alvo - acumulado) / c, self.maximo)
+            acumulado += c
+        return self.maximo
+
+    def linhas(self):
+        acumulado = 0
+        for limite, c in zip(self.limites, self.baldes):
+            acumulado += c
+            yield f'{PREFIXO}{self.nome}_bucket{{le="{limite:g}"}} {acumulado}'
+        acumulado += self.baldes[-1]
+        yield f'{PREFIXO}{self.nome}_bucket{{le="+Inf"}} {acumulado}'
+        yield f'{PREFIXO}{self.nome}_sum {self.soma}'
+        yield f'{PREFIXO}{self.nome}_count {acumulado}'
+
+
+class RegistroMetricas:
+    """
+    Conjunto de métricas de um processo. Os componentes (pipeline,
+    gravador, difusor) registram as suas na construção; a coleta gera o
+    texto do Prometheus ou uma fotografia para a página de manutenção.
+    """
+
+    def __init__(self):
+        self._metricas = {}
+        self.inicio = time.time()
+
+    def _registrar(self, metrica):
+        atual = self._metricas.get(metrica.nome)
+        if atual is not None and not isinstance(metrica, Medidor):
+            return atual  # componente recriado continua a mesma série
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def medidor(self, nome: str, ajuda: str, funcao, tipo: str = 'gauge') -> Medidor:
+        return self._registrar(Medidor(nome, ajuda, funcao, tipo))
+
+    def histograma(self, nome: str, ajuda: str, limites=LIMITES_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(nome, ajuda, limites))
+
+    def obter(self, nome: str):
+        """A métrica `nome` já registrada, ou None; ao contrário de histograma() etc., não cria."""
+        return self._metricas.get(nome)
+
+    def __iter__(self):
+        return iter(list(self._metricas.values()))
+
+    def texto_prometheus(self) -> str:
+        saida = []
+        for m in self:
+            saida.append(f'# HELP {PREFIXO}{m.nome} {m.ajuda}')
+            saida.append(f'# TYPE {PREFIXO}{m.nome} {m.tipo}')
+            saida.extend(m.linhas())
+        return '\n'.join(saida) + '\n'
+
+    def fotografia(self) -> dict:
+        """Valores atuais para a interface: histogramas com n, soma, p50, p99 e máximo."""
+        foto = {'ts': time.time(), 'contadores': {}, 'medidores': {}, 'histogramas': {}}
+        for m in self:
+            if isinstance(m, Histograma):
+                foto['histogramas'][m.nome] = {
+                    'ajuda': m.ajuda, 'n': m.n, 'soma': m.soma, 'max': m.maximo,
+                    'p50': m.quantil(0.5), 'p99': m.quantil(0.99),
+                }
+            elif m.tipo == 'counter':
+                foto['contadores'][m.nome] = {'ajuda': m.ajuda, 'valor': m.valor}
+            else:
+                foto['medidores'][m.nome] = {'ajuda': m.ajuda, 'valor': m.valor}
+        return foto
+
+
+# ==========================
+# ENDPOINT HTTP (PROMETHEUS)
+# ==========================
+def servir_http(registro: RegistroMetricas, porta: int = PORTA_METRICAS,
+                host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve GET /metrics numa thread daemon; `shutdown()` no servidor devolvido encerra."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            corpo = registro.texto_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass  # um scrape a cada 15 s não precisa ir pro console
+
+    servidor = ThreadingHTTPServer((host, porta), _Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
@@ -0,0 +1,428 @@
+"""
+Várias bancadas num só supervisório: cada porta de BANCADAS ganha um
+processo de aquisição próprio, que publica as amostras num histórico em
+memória compartilhada lido pela interface.
+
+O gerenciador inicia cada trabalhador assim (não é para rodar à mão):
+
+    python multibancada.py trabalhador <memória compartilhada> '<spec JSON>'
+
+e depois manda pelo stdin do trabalhador uma spec JSON por linha a cada
+mudança de configuração; fechar o stdin encerra o trabalhador.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from historico import CANAIS, HistoricoCircular
+
+# ==========================
+# HISTÓRICO EM MEMÓRIA COMPARTILHADA
+# ==========================
+# estado do trabalhador, um float64 por campo (escrito só por ele)
+CAMPOS_ESTADO = ('batida', 'conectado', 'sem_dados', 'reconexoes', 'lacunas',
+                 'segundos_sem_dados', 'bytes', 'linhas', 'malformadas',
+                 'alarmes_ativos', 'alarmes_ativados')
+_N_ESTADO = 16
+_CABECALHO = 8 + 8 * _N_ESTADO   # total (int64) + estado (float64)
+_COLUNAS = ('ts',) + CANAIS
+
+INTERVALO_ESTADO = 0.25   # s entre publicações do estado pelo trabalhador
+BATIDA_MAX = 3.0          # s sem publicar estado = trabalhador travado
+TIMEOUT_LEITURA = 1.0
+TIMEOUT_PARAR = 3.0
+
+
+def tamanho_compartilhado(capacidade: int) -> int:
+    return _CABECALHO + 8 * len(_COLUNAS) * 2 * (capacidade + 1)   # + 1: ver HistoricoCircular
+
+
+class HistoricoCompartilhado(HistoricoCircular):
+    """
+    HistoricoCircular com as colunas, o `total` e um vetor de estado num
+    bloco de SharedMemory: o trabalhador da bancada escreve, o processo da
+    interface lê com o mesmo `instantaneo()`, sem lock e sem cópia pelo
+    pipe.
+
+    A publicação continua sendo gravar as colunas e só então o `total`;
+    entre processos isso depende de as escritas ficarem visíveis na ordem
+    em que foram feitas (garantido em x86; em ARM é o caso comum, não uma
+    garantia). A capacidade é fixa: o bloco não muda de tamanho, e
+    `redimensionado` recusa a troca (vale ao reiniciar o supervisório).
+    """
+
+    def __init__(self, shm: SharedMemory, capacidade: int):
+        if shm.size < tamanho_compartilhado(capacidade):
+            raise ValueError('memória compartilhada menor que a capacidade pedida')
+        self._shm = shm
+        self.capacidade = capacidade
+        self._slots = capacidade + 1
+        self._total = np.ndarray((1,), dtype=np.int64, buffer=shm.buf, offset=0)
+        self.estado = np.ndarray((_N_ESTADO,), dtype=np.float64, buffer=shm.buf, offset=8)
+        self._colunas = {
+            nome: np.ndarray((2 * self._slots,), dtype=np.float64, buffer=shm.buf,
+                             offset=_CABECALHO + 16 * self._slots * i)
+            for i, nome in enumerate(_COLUNAS)
+        }
+        # trabalhador reiniciado continua de onde o anterior parou
+        total = self.total
+        self._pos = total % self._slots
+        self._n = min(total, capacidade)
+        self._inicio = 0
+
+    @property
+    def total(self) -> int:
+        return int(self._total[0])
+
+    @total.setter
+    def total(self, valor: int):
+        self._total[0] = valor
+
+    def redimensionado(self, capacidade: int):
+        raise ValueError('a capacidade do histórico de uma bancada extra é fixa; '
+                         'a nova vale ao reiniciar o supervisório')
+
+    def ler_estado(self) -> dict:
+        return {nome: float(v) for nome, v in zip(CAMPOS_ESTADO, self.estado)}
+
+    def liberar(self):
+        """Solta as views antes de fechar o bloco (numpy segura o buffer)."""
+        self._total = self.estado = None
+        self._colunas = {}
+        self._shm.close()
+
+
+# ==========================
+# AQUISIÇÃO DE UMA BANCADA
+# ==========================
+def campos_configuracao(cfg: dict) -> dict:
+    """Parte da spec que vem da configuração do supervisório (e muda com ela)."""
+    return {
+        'baudrate': cfg['baudrate'],
+        'capacidade': cfg['capacidade_historico'],
+        'tamanho_bloco': cfg['tamanho_bloco'],
+        'max_linha': cfg['max_linha'],
+        'protocolo': cfg['protocolo'],
+        'limite_rpm': cfg['limite_rpm'],
+        'tolerancia_rpm_pct': cfg['tolerancia_rpm_pct'],
+        'limite_temperatura': cfg['limite_temperatura'],
+        'taxa_max_rpm': cfg['taxa_max_rpm'],
+        'comando_corte': cfg['comando_corte'],
+        'fator_k': cfg['fator_k'],
+        'lote_csv': cfg['lote_csv'],
+        'intervalo_flush_csv': cfg['intervalo_flush_csv'],
+    }
+
+
+def spec_bancada(nome: str, endereco: str, cfg: dict, pasta_dados: str | None = None) -> dict:
+    """Parâmetros de um trabalhador a partir da configuração do supervisório."""
+    gravar = pasta_dados is not None and not endereco.startswith('replay://')
+    return {
+        'nome': nome,
+        'endereco': endereco,
+        **campos_configuracao(cfg),
+        'arquivo_csv': f'historico_{nome}.csv' if gravar else None,
+        'arquivo_alarmes': f'alarmes_{nome}.csv' if gravar else None,
+        'pasta_dados': os.path.join(pasta_dados, nome) if gravar else None,
+    }
+
+
+def regras_da_spec(spec: dict):
+    from alarmes import regras_padrao
+    return regras_padrao(spec['limite_rpm'], spec['tolerancia_rpm_pct'], spec['limite_temperatura'],
+                         spec['taxa_max_rpm'], spec['comando_corte'] or None)
+
+
+class AquisicaoBancada:
+    """
+    Leitura em blocos, parse, histórico, alarmes e persistência de uma
+    bancada: o mesmo caminho da thread serial do supervisório, com o
+    próprio SupervisorEnlace (reconexão e lacunas). Roda no processo
+    trabalhador; o benchmark também a usa em threads, para comparar.
+
+    `receber(spec)` (qualquer thread) publica uma spec nova; o laço de
+    `rodar` a aplica entre duas leituras, como a thread serial do
+    supervisório faz com a Configuracao.
+    """
+
+    def __init__(self, spec: dict, historico: HistoricoCircular | None = None):
+        from alarmes import MotorAlarmes
+        from armazenamento import ArmazenamentoParticionado
+        from enlace import SupervisorEnlace
+        from gravador_csv import GravadorCSV
+        from leitor_serial import LeitorLinhas
+        from metricas import RegistroMetricas
+        from pipeline import PipelineAquisicao
+
+        self.spec = spec
+        m = self.metricas = RegistroMetricas()
+        armazenamento = ArmazenamentoParticionado(spec['pasta_dados']) if spec['pasta_dados'] else None
+        self.gravador = None
+        if spec['arquivo_csv']:
+            self.gravador = GravadorCSV(spec['arquivo_csv'], spec['lote_csv'], spec['intervalo_flush_csv'],
+                                        armazenamento=armazenamento, metricas=m)
+        self.leitor = LeitorLinhas(None, spec['max_linha'], m, spec['tamanho_bloco'])
+        self.enlace = SupervisorEnlace(self.leitor, armazenamento, m)
+        self.enlace.protocolo = spec['protocolo']
+        self.alarmes = MotorAlarmes(regras_da_spec(spec), enviar=self.enlace.escrever,
+                                    arquivo=spec['arquivo_alarmes'], metricas=m)
+        self.pipeline = PipelineAquisicao(spec['capacidade'], spec['limite_rpm'], self.gravador, m,
+                                          self.alarmes, historico=historico)
+        self.pipeline.fator_k = spec['fator_k']
+        self._publicado = 0.0
+        self._recebida = (0, spec)   # (versão, spec) trocados de uma vez
+        self._aplicada = 0
+
+    def receber(self, spec: dict):
+        self._recebida = (self._recebida[0] + 1, spec)
+
+    def configurar(self, spec: dict):
+        """Aplica uma spec nova; chamar na thread de aquisição."""
+        anterior, self.spec = self.spec, spec
+        if spec['capacidade'] != anterior['capacidade']:
+            print(f"[BANCADA] {spec['nome']}: capacidade do histórico é fixa, mantida em "
+                  f"{anterior['capacidade']}")
+            spec['capacidade'] = anterior['capacidade']
+        self.leitor.tamanho_bloco = spec['tamanho_bloco']
+        self.leitor.max_linha = spec['max_linha']
+        self.enlace.protocolo = spec['protocolo']
+        self.alarmes.configurar(regras_da_spec(spec))
+        self.pipeline.configurar(limite_rpm=spec['limite_rpm'], fator_k=spec['fator_k'])
+        if self.gravador is not None:
+            self.gravador.configurar(spec['lote_csv'], spec['intervalo_flush_csv'])
+        if any(spec[k] != anterior[k] for k in ('endereco', 'baudrate', 'protocolo')):
+            self.enlace.fechar('porta reconfigurada')
+
+    def publicar_estado(self):
+        estado = getattr(self.pipeline.historico, 'estado', None)
+        if estado is None:
+            return
+        enlace, parser, alarmes = self.enlace, self.pipeline.parser, self.alarmes
+        ativos = sum(1 << i for i, r in enumerate(alarmes.regras) if r.ativa)
+        valores = (time.time(), enlace.estado == 'conectado',
+                   enlace.queda is not None or enlace.estado != 'conectado',
+                   enlace.reconexoes, enlace.n_lacunas, enlace.segundos_sem_dados,
+                   self.leitor.bytes_lidos, parser.quadros, parser.malformados,
+                   ativos, alarmes.ativados)
+        estado[:len(valores)] = valores
+
+    def rodar(self, parar: threading.Event):
+        spec, enlace, leitor, pipeline = self.spec, self.enlace, self.leitor, self.pipeline
+        if self.gravador is not None:
+            self.gravador.iniciar()
+        try:
+            while not parar.is_set():
+                versao, nova = self._recebida
+                if versao != self._aplicada:
+                    self._aplicada = versao
+                    self.configurar(nova)
+
+                agora = time.monotonic()
+                if agora - self._publicado >= INTERVALO_ESTADO:
+                    self._publicado = agora
+                    self.publicar_estado()
+
+                if not enlace.conectado:
+                    if enlace.abrir(spec['endereco'], spec['baudrate'], TIMEOUT_LEITURA) is None:
+                        parar.wait(enlace.espera)
+                    continue
+                try:
+                    quadros, linhas = leitor.ler()
+                    chegada = time.perf_counter()
+                    pipeline.processar_quadros(quadros, chegada)
+                    for linha in linhas:
+                        pipeline.processar_linha(linha, chegada=chegada)
+                    if not (len(quadros) or linhas) or enlace.queda is not None:
+                        enlace.vigiar()
+                except Exception as e:
+                    if not parar.is_set():
+                        enlace.caiu(e)
+        finally:
+            enlace.fechar()
+            self.alarmes.parar()
+            if self.gravador is not None:
+                self.gravador.parar()
+            self.publicar_estado()
+
+
+def trabalhador(nome_shm: str, spec: dict):
+    """Processo de uma bancada: termina quando o stdin fecha (gerenciador parou ou morreu)."""
+    shm = SharedMemory(name=nome_shm)
+    # quem cria o bloco (o gerenciador) é quem apaga; sem isto o
+    # resource_tracker deste processo o apagaria na saída
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    historico = HistoricoCompartilhado(shm, spec['capacidade'])
+    aquisicao = AquisicaoBancada(spec, historico)
+    parar = threading.Event()
+
+    def ouvir_gerenciador():
+        # uma spec por linha; EOF = o gerenciador parou (ou morreu)
+        for linha in sys.stdin:
+            try:
+                aquisicao.receber(json.loads(linha))
+            except ValueError as e:
+                print(f"[BANCADA] {spec['nome']}: configuração inválida ignorada:", e)
+        parar.set()
+
+    threading.Thread(target=ouvir_gerenciador, daemon=True).start()
+    print(f"[BANCADA] {spec['nome']}: trabalhador pid {os.getpid()} em {spec['endereco']}")
+    try:
+        aquisicao.rodar(parar)
+    finally:
+        historico.liberar()
+
+
+# ==========================
+# LADO DA INTERFACE
+# ==========================
+class Bancada:
+    """Um trabalhador visto pela interface: histórico compartilhado (só leitura) e estado."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.nome = spec['nome']
+        self.endereco = spec['endereco']
+        self._shm = SharedMemory(create=True, size=tamanho_compartilhado(spec['capacidade']))
+        self._shm.buf[:_CABECALHO] = bytes(_CABECALHO)
+        self.historico = HistoricoCompartilhado(self._shm, spec['capacidade'])
+        self.descricoes_alarmes = [r.descricao for r in regras_da_spec(spec)]
+        self.processo = None
+        self.reinicios = 0
+
+    def iniciar(self):
+        comando = [sys.executable, os.path.abspath(__file__), 'trabalhador',
+                   self._shm.name, json.dumps(self.spec)]
+        self.processo = subprocess.Popen(comando, stdin=subprocess.PIPE)
+
+    def configurar(self, spec: dict):
+        """Manda a spec nova ao trabalhador; um reinício também parte dela."""
+        self.spec = spec
+        self.descricoes_alarmes = [r.descricao for r in regras_da_spec(spec)]
+        if not self.vivo:
+            return
+        try:
+            self.processo.stdin.write(json.dumps(spec).encode() + b'\n')
+            self.processo.stdin.flush()
+        except OSError as e:
+            # trabalhador morrendo: vigiar() o reinicia já com esta spec
+            print(f'[BANCADA] {self.nome}: configuração não entregue:', e)
+
+    @property
+    def vivo(self) -> bool:
+        return self.processo is not None and self.processo.poll() is None
+
+    def situacao(self) -> dict:
+        """Última amostra, alarmes ativos e estado do enlace, para as páginas de bancadas."""
+        total, ultima = self.historico.instantaneo(1)
+        e = self.historico.ler_estado()
+        ativos = int(e['alarmes_ativos'])
+        travado = time.time() - e['batida'] > BATIDA_MAX
+        if not self.vivo:
+            enlace = 'trabalhador parado'
+        elif travado:
+            enlace = f"trabalhador sem resposta há {time.time() - e['batida']:.0f} s"
+        elif e['sem_dados']:
+            enlace = 'sem dados (reconectando)' if not e['conectado'] else 'porta aberta, aguardando dados'
+        else:
+            enlace = 'conectado'
+        return {
+            'total': total,
+            'ultima': {k: float(v[-1]) for k, v in ultima.items()} if len(ultima['ts']) else None,
+            'alertas': [d for i, d in enumerate(self.descricoes_alarmes) if ativos >> i & 1],
+            'sem_dados': enlace != 'conectado',
+            'enlace': enlace,
+            'reconexoes': int(e['reconexoes']),
+            'lacunas': int(e['lacunas']),
+            'malformadas': int(e['malformadas']),
+        }
+
+    def parar(self, timeout: float = TIMEOUT_PARAR):
+        if self.processo is None:
+            return
+        try:
+            self.processo.stdin.close()
+            self.processo.wait(timeout)
+        except subprocess.TimeoutExpired:
+            print(f'[BANCADA] {self.nome}: não parou em {timeout:g} s, encerrando à força')
+            self.processo.kill()
+            self.processo.wait()
+        self.processo = None
+
+    def liberar(self):
+        self.historico.liberar()
+        self._shm.unlink()
+
+
+class GerenciadorBancadas:
+    """
+    Um processo por bancada, cada um com o seu GIL: parse e alarmes de uma
+    bancada não disputam CPU do interpretador com as outras nem com a
+    interface. `vigiar()` (chamado por um timer) reinicia trabalhadores que
+    morreram; o histórico compartilhado sobrevive e o novo continua do
+    mesmo `total`.
+    """
+
+    def __init__(self, specs):
+        self.bancadas = {spec['nome']: Bancada(spec) for spec in specs}
+
+    def __iter__(self):
+        return iter(self.bancadas.values())
+
+    def __len__(self):
+        return len(self.bancadas)
+
+    def __getitem__(self, nome: str) -> Bancada:
+        return self.bancadas[nome]
+
+    def iniciar(self):
+        for bancada in self:
+            bancada.iniciar()
+
+    def configurar(self, cfg: dict) -> list[str]:
+        """
+        Leva uma configuração nova do supervisório a todos os trabalhadores.
+        A capacidade do histórico não muda (memória compartilhada de tamanho
+        fixo): é recusada e a recusa volta na lista de avisos.
+        """
+        avisos = []
+        campos = campos_configuracao(cfg)
+        for bancada in self:
+            spec = {**bancada.spec, **campos}
+            if spec['capacidade'] != bancada.spec['capacidade']:
+                spec['capacidade'] = bancada.spec['capacidade']
+                if not avisos:
+                    avisos.append(f"capacidade do histórico das bancadas extras mantida em "
+                                  f"{bancada.spec['capacidade']} até reiniciar o supervisório")
+            if spec != bancada.spec:
+                bancada.configurar(spec)
+        return avisos
+
+    def vigiar(self):
+        for bancada in self:
+            if bancada.processo is not None and not bancada.vivo:
+                codigo = bancada.processo.returncode
+                bancada.reinicios += 1
+                print(f'[BANCADA] {bancada.nome}: trabalhador saiu (código {codigo}), reiniciando')
+                bancada.iniciar()
+
+    def parar(self):
+        for bancada in self:
+            if bancada.processo is not None:
+                bancada.processo.stdin.close()   # todos param juntos
+        for bancada in self:
+            bancada.parar()
+            bancada.liberar()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] != 'trabalhador':
+        print(__doc__.strip())
+        sys.exit(1)
+    trabalhador(sys.argv[2], json.loads(sys.argv[3]))
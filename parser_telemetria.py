@@ -0,0 +1,72 @@
+import re
+from collections import namedtuple
+
+# ==========================
+# PARSER DO QUADRO DE TELEMETRIA
+# ==========================
+# Modo: SMAW || RPM: 0.00 || Temperatura: 50.29 || Tensao: 1.24 || Corrente: 2.70
+Amostra = namedtuple('Amostra', 'rpm temperatura tensao corrente modo')
+
+# layout exato enviado pelo firmware (espaços simples); variações de
+# espaçamento ou de ordem caem no parser genérico
+_RE_QUADRO = re.compile(
+    r'Modo: ?([^|]*?) ?\|\| '
+    r'RPM: ([^ |]+) \|\| '
+    r'Temperatura: ([^ |]+) \|\| '
+    r'Tensao: ([^ |]+) \|\| '
+    r'Corrente: ([^ |]+)'
+)
+
+_CANAIS = ('rpm', 'temperatura', 'tensao', 'corrente')
+
+
+class ParserTelemetria:
+    """
+    Caminho rápido: regex pré-compilada para o layout conhecido do quadro.
+    Se a linha não casar (ordem diferente, campos extras ou faltando), cai
+    no parser genérico `chave: valor` separado por '||'; canais ausentes
+    valem 0, como antes. Linhas sem nenhum canal conhecido ou com número
+    inválido são contadas em `malformados` e devolvem None.
+    """
+
+    def __init__(self):
+        self.quadros = 0      # linhas recebidas
+        self.genericos = 0    # resolvidas pelo parser genérico
+        self.malformados = 0
+
+    def parse(self, linha: str):
+        self.quadros += 1
+
+        m = _RE_QUADRO.fullmatch(linha)
+        if m is not None:
+            modo, rpm, temp, tensao, corrente = m.groups()
+            try:
+                return Amostra(float(rpm), float(temp), float(tensao),
+                               float(corrente), modo)
+            except ValueError:
+                self.malformados += 1
+                return None
+
+        amostra = self._parse_generico(linha)
+        if amostra is None:
+            self.malformados += 1
+        else:
+            self.genericos += 1
+        return amostra
+
+    @staticmethod
+    def _parse_generico(linha: str):
+        dados = {}
+        for parte in linha.split('||'):
+            chave, sep, valor = parte.partition(':')
+            if sep:
+                dados[chave.strip().lower()] = valor.strip()
+
+        if not any(c in dados for c in _CANAIS):
+            return None
+
+        try:
+            valores = [float(dados.get(c, 0)) for c in _CANAIS]
+        except ValueError:
+            return None
+        return Amostra(*valores, dados.get('modo', ''))
@@ -0,0 +1,215 @@
+import threading
+import time
+
+import numpy as np
+
+from estatisticas import EstatisticasSessao
+from historico import HistoricoCircular
+from metricas import RegistroMetricas
+from parser_telemetria import Amostra, ParserTelemetria
+from rollups import RollupsMultiResolucao
+
+# ==========================
+# PIPELINE DE AQUISIÇÃO
+# ==========================
+CANAIS_QUADRO = ('rpm', 'temperatura', 'tensao', 'corrente')
+
+
+class PipelineAquisicao:
+    """
+    Caminho de cada linha recebida: parse -> armazenamento em memória
+    (histórico, estatísticas, rollups) -> persistência (fila do gravador).
+
+    É o mesmo objeto usado pela thread serial do supervisório, pelo replay
+    e pelos benchmarks, para que todos meçam o mesmo código.
+
+    Publicação sem lock, um escritor (a thread serial) e vários leitores:
+
+    - `estado` é trocado por um dict novo a cada linha; quem leu a
+      referência tem uma fotografia imutável e consistente.
+    - o histórico publica cada amostra pelo próprio `total`; leitores
+      usam `historico.instantaneo()` (ver HistoricoCircular).
+    - estatísticas e rollups ficam atrás de um seqlock (`_seq` ímpar =
+      escrita em andamento); `resumo()` e `serie()` refazem a leitura se o
+      escritor passou por ali no meio dela.
+
+    O escritor nunca espera por leitores. Cada estágio alimenta um
+    histograma de latência em `metricas` (a thread serial é o único
+    escritor deles).
+
+    Se houver `alarmes` (MotorAlarmes), as regras são avaliadas em cada
+    amostra logo depois do armazenamento; `chegada` é o perf_counter de
+    quando o bloco saiu da porta, usado para medir a reação.
+
+    `fator_k` multiplica o RPM lido (calibração do sensor) antes de tudo.
+
+    `respostas(linha, chegada)`, se houver (FilaComandos.resposta), vê cada
+    linha antes do parse; se devolver True a linha era a confirmação de um
+    comando e não entra como telemetria.
+
+    Quadros binários (ver quadros_binarios) chegam já decodificados em
+    lote e entram direto no armazenamento, sem parse: `processar_quadros`.
+
+    `historico` substitui o HistoricoCircular criado com `capacidade` (ex.:
+    um HistoricoCompartilhado, lido por outro processo).
+    """
+
+    def __init__(self, capacidade: int, limite_rpm: float, gravador=None,
+                 metricas: RegistroMetricas | None = None, alarmes=None, historico=None):
+        self.estado = {
+            'rpm': 0.0,
+            'temperatura': 0.0,
+            'tensao': 0.0,
+            'corrente': 0.0,
+            'ultima_linha': '',
+        }
+
+        # colunas ts/rpm/temperatura/tensao/corrente
+        self.historico = historico if historico is not None else HistoricoCircular(capacidade)
+        # médias, desvio, picos e tempo acima do limite, sem reler o histórico
+        self.estatisticas = EstatisticasSessao(limite_rpm)
+        # min/max/média/último em baldes de 1 s, 10 s, 1 min e 10 min
+        self.rollups = RollupsMultiResolucao()
+        self.parser = ParserTelemetria()  # contadores: quadros, genericos, malformados
+        self.gravador = gravador
+        self.alarmes = alarmes
+        self.fator_k = 1.0
+        self.respostas = None
+        self._seq = 0
+        # leituras refeitas por colisão com o escritor, por thread leitora:
+        # cada uma só incrementa a própria entrada, então nenhuma se perde
+        self._releituras = {}
+
+        m = self.metricas = metricas if metricas is not None else RegistroMetricas()
+        parser = self.parser
+        m.medidor('linhas_total', 'Linhas recebidas', lambda: parser.quadros, 'counter')
+        m.medidor('linhas_genericas_total', 'Linhas resolvidas pelo parser genérico',
+                  lambda: parser.genericos, 'counter')
+        m.medidor('linhas_malformadas_total', 'Linhas descartadas no parse',
+                  lambda: parser.malformados, 'counter')
+        m.medidor('amostras_total', 'Amostras armazenadas', lambda: self.historico.total, 'counter')
+        m.medidor('releituras_total', 'Leituras de estatísticas/rollups refeitas (seqlock)',
+                  lambda: self.releituras, 'counter')
+        self._h_parse = m.histograma('parse_segundos', 'Parse de uma linha')
+        self._h_armazenar = m.histograma('armazenar_segundos', 'Histórico, estatísticas e rollups')
+        self._h_persistir = m.histograma('persistir_segundos', 'Envio à fila do gravador')
+
+    def processar_linha(self, linha: str, ts: float | None = None,
+                        chegada: float | None = None):
+        amostra = self.parse(linha, chegada)
+        if ts is None:
+            ts = time.time()
+        amostra = self.armazenar(linha, amostra, ts, chegada)
+        if amostra is not None:
+            self.persistir(amostra, ts)
+        return amostra
+
+    def processar_quadros(self, quadros, chegada: float | None = None):
+        for ts, amostra in self.armazenar_quadros(quadros, chegada):
+            self.persistir(amostra, ts)
+
+    def armazenar_quadros(self, quadros, chegada: float | None = None) -> list:
+        """Armazena cada quadro binário decodificado; devolve [(ts, amostra)]."""
+        if not len(quadros):
+            return []
+        # float32 -> float com 4 casas, como se tivesse vindo do texto
+        valores = np.column_stack([quadros[c] for c in CANAIS_QUADRO]).astype(np.float64).round(4)
+        saida = []
+        for seq, (rpm, temperatura, tensao, corrente) in zip(quadros['seq'].tolist(), valores.tolist()):
+            ts = time.time()
+            amostra = self.armazenar(f'#{seq} (binário)', Amostra(rpm, temperatura, tensao, corrente, ''),
+                                     ts, chegada)
+            saida.append((ts, amostra))
+        return saida
+
+    def parse(self, linha: str, chegada: float | None = None):
+        t0 = time.perf_counter()
+        respostas = self.respostas
+        if respostas is not None and respostas(linha, chegada):
+            return None
+        amostra = self.parser.parse(linha)
+        self._h_parse.observar(time.perf_counter() - t0)
+        return amostra
+
+    def armazenar(self, linha: str, amostra, ts: float, chegada: float | None = None):
+        """Devolve a amostra como foi armazenada (com o fator K aplicado)."""
+        t0 = time.perf_counter()
+        if amostra is None:
+            self.estado = {**self.estado, 'ultima_linha': linha}
+        else:
+            if self.fator_k != 1.0:
+                amostra = amostra._replace(rpm=amostra.rpm * self.fator_k)
+            rpm, temperatura, tensao, corrente, _ = amostra
+            self._seq += 1
+            try:
+                self.historico.adicionar(ts, rpm, temperatura, tensao, corrente)
+                self.estatisticas.adicionar(ts, rpm, temperatura, tensao, corrente)
+                self.rollups.adicionar(ts, rpm, temperatura, tensao, corrente)
+            finally:
+                # mesmo com erro no meio: _seq ímpar para sempre travaria os leitores
+                self._seq += 1
+            self.estado = {
+                'rpm': rpm,
+                'temperatura': temperatura,
+                'tensao': tensao,
+                'corrente': corrente,
+                'ultima_linha': linha,
+            }
+        self._h_armazenar.observar(time.perf_counter() - t0)
+
+        if amostra is not None and self.alarmes is not None:
+            self.alarmes.avaliar(ts, amostra, chegada)
+        return amostra
+
+    def configurar(self, capacidade: int | None = None, limite_rpm: float | None = None,
+                   fator_k: float | None = None):
+        """
+        Troca parâmetros sem perder a sessão. Chamar na thread escritora,
+        entre duas amostras: nenhuma amostra é armazenada com metade da
+        configuração nova. Mudar a capacidade copia as amostras retidas
+        para um histórico novo e publica a referência.
+        """
+        if capacidade is not None and capacidade != self.historico.capacidade:
+            self.historico = self.historico.redimensionado(capacidade)
+        if limite_rpm is not None:
+            self.estatisticas.limite_rpm = limite_rpm
+        if fator_k is not None:
+            self.fator_k = fator_k
+
+    def persistir(self, amostra, ts: float):
+        if self.gravador is not None:
+            t0 = time.perf_counter()
+            self.gravador.enviar((ts, *amostra[:4]))
+            self._h_persistir.observar(time.perf_counter() - t0)
+
+    # ==========================
+    # LEITURA (QUALQUER THREAD)
+    # ==========================
+    @property
+    def releituras(self) -> int:
+        return sum(self._releituras.copy().values())
+
+    def _ler(self, funcao):
+        while True:
+            seq = self._seq
+            if seq & 1:
+                time.sleep(0)   # escritor no meio da amostra: cede o GIL
+                continue
+            try:
+                resultado = funcao()
+            except Exception:
+                if self._seq == seq:
+                    raise
+                resultado = None  # estado visto pela metade; refaz
+            if self._seq == seq:
+                return resultado
+            thread = threading.get_ident()
+            self._releituras[thread] = self._releituras.get(thread, 0) + 1
+
+    def resumo(self) -> dict:
+        """Fotografia consistente de EstatisticasSessao.resumo()."""
+        return self._ler(self.estatisticas.resumo)
+
+    def serie(self, canal: str, janela_s: float) -> dict:
+        """Série de rollups consistente (ver RollupsMultiResolucao.serie)."""
+        return self._ler(lambda: self.rollups.serie(canal, janela_s))
@@ -0,0 +1,288 @@
+import struct
+import time
+
+import numpy as np
+
+from metricas import RegistroMetricas
+
+# ==========================
+# FORMATO BINÁRIO DO ENLACE (COBS + CRC16)
+# ==========================
+# Alternativa opcional às linhas de texto, negociada a cada abertura da porta:
+#
+#   host -> dispositivo   COMANDO_BINARIO   b'#BIN\n'
+#   dispositivo -> host   RESPOSTA_BINARIO  b'#BIN OK\n', e dali em diante só quadros binários
+#
+# Sem a resposta em TIMEOUT_NEGOCIACAO o host segue no texto (firmware antigo
+# ignora o comando). O dispositivo volta ao texto quando a porta é reaberta.
+#
+# Quadro de telemetria: 20 bytes little-endian
+#
+#   seq uint16 | rpm f32 | temperatura f32 | tensao f32 | corrente f32 | crc uint16
+#
+# `seq` incrementa a cada amostra medida (módulo 65536), mesmo as que o
+# dispositivo não conseguiu enviar; `crc` é o CRC-16/CCITT-FALSE (poli
+# 0x1021, inicial 0xFFFF) dos 18 bytes anteriores. No fio o quadro vai em
+# COBS, que tira todos os zeros, seguido de um 0x00 delimitador: 22 bytes
+# por amostra, contra ~80 da linha de texto.
+#
+# Quadros de outro tamanho com CRC válido são mensagens do firmware (ex.:
+# confirmação de comando): texto ASCII + crc; o firmware completa com um
+# espaço a mensagem que teria exatamente 18 bytes.
+COMANDO_BINARIO = b'#BIN\n'
+RESPOSTA_BINARIO = b'#BIN OK'
+TIMEOUT_NEGOCIACAO = 0.5
+MAX_QUADRO = 256          # bytes sem delimitador: lixo (ou texto), descartado
+FALHAS_PARA_TEXTO = 8     # quadros inválidos seguidos sem nenhum válido: dispositivo voltou ao texto
+MIN_LOTE = 32             # abaixo disso o custo fixo das operações NumPy não compensa
+
+QUADRO = np.dtype([
+    ('seq', '<u2'),
+    ('rpm', '<f4'),
+    ('temperatura', '<f4'),
+    ('tensao', '<f4'),
+    ('corrente', '<f4'),
+    ('crc', '<u2'),
+])
+TAMANHO_QUADRO = QUADRO.itemsize        # 20
+TAMANHO_COBS = TAMANHO_QUADRO + 1       # sem o delimitador
+_CORPO = struct.Struct('<H4f')
+
+
+def _tabela_crc() -> list[int]:
+    tabela = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = (crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1
+        tabela.append(crc & 0xFFFF)
+    return tabela
+
+
+_TABELA_CRC = _tabela_crc()
+_TABELA_CRC_NP = np.array(_TABELA_CRC, dtype=np.uint16)
+
+
+def crc16(dados: bytes) -> int:
+    """CRC-16/CCITT-FALSE (crc16(b'123456789') == 0x29B1)."""
+    crc = 0xFFFF
+    for b in dados:
+        crc = ((crc << 8) & 0xFFFF) ^ _TABELA_CRC[(crc >> 8) ^ b]
+    return crc
+
+
+def crc16_lote(dados: np.ndarray) -> np.ndarray:
+    """CRC16 de cada linha de uma matriz uint8 (n, k): k passos vetorizados nos n quadros."""
+    crc = np.full(len(dados), 0xFFFF, np.uint16)
+    for coluna in dados.T:
+        crc = (crc << 8) ^ _TABELA_CRC_NP[(crc >> 8) ^ coluna]
+    return crc
+
+
+def cobs_codificar(dados: bytes) -> bytes:
+    """COBS de até 253 bytes (sem blocos de 0xFF); o 0x00 delimitador fica por conta de quem envia."""
+    saida = bytearray()
+    for bloco in dados.split(b'\0'):
+        saida.append(len(bloco) + 1)
+        saida += bloco
+    return bytes(saida)
+
+
+def cobs_decodificar(dados: bytes) -> bytes | None:
+    """Inverso de cobs_codificar; None se os códigos não fecham com o tamanho."""
+    saida = bytearray()
+    i = 0
+    while i < len(dados):
+        codigo = dados[i]
+        if codigo == 0 or i + codigo > len(dados):
+            return None
+        saida += dados[i + 1:i + codigo]
+        i += codigo
+        if codigo < 0xFF and i < len(dados):
+            saida.append(0)
+    return bytes(saida)
+
+
+def _cobs_decodificar_lote(codificados: np.ndarray):
+    """
+    COBS de n quadros de tamanho fixo de uma vez: (n, TAMANHO_COBS) ->
+    (n, TAMANHO_QUADRO) e a máscara dos bem formados. Percorre as colunas;
+    em cada uma, os quadros cujo próximo código cai ali ganham um zero.
+    """
+    n = len(codificados)
+    saida = np.empty((n, TAMANHO_QUADRO), np.uint8)
+    proximo = codificados[:, 0].astype(np.intp)
+    for j in range(1, TAMANHO_COBS):
+        coluna = codificados[:, j]
+        codigo = proximo == j
+        saida[:, j - 1] = np.where(codigo, 0, coluna)
+        proximo = np.where(codigo, j + coluna, proximo)
+    return saida, proximo == TAMANHO_COBS
+
+
+def _com_crc(corpo: bytes) -> bytes:
+    return cobs_codificar(corpo + crc16(corpo).to_bytes(2, 'little')) + b'\0'
+
+
+def codificar_quadro(seq: int, rpm: float, temperatura: float, tensao: float,
+                     corrente: float) -> bytes:
+    """Quadro de telemetria pronto para o fio (lado do dispositivo; simulador e testes)."""
+    return _com_crc(_CORPO.pack(seq & 0xFFFF, rpm, temperatura, tensao, corrente))
+
+
+def codificar_mensagem(texto: str) -> bytes:
+    corpo = texto.encode(errors='replace')[:250]
+    if len(corpo) == _CORPO.size:
+        corpo += b' '   # não confundir com um quadro de telemetria
+    return _com_crc(corpo)
+
+
+def negociar(conexao, timeout: float = TIMEOUT_NEGOCIACAO) -> tuple[bool, bytes]:
+    """
+    Pede o formato binário e espera a resposta por até `timeout` segundos,
+    sem bloquear na porta (só lê o que `in_waiting` diz que chegou).
+
+    Devolve (True, bytes depois da resposta), já em binário, ou (False,
+    tudo que chegou), que são linhas de texto a processar normalmente.
+    """
+    conexao.write(COMANDO_BINARIO)
+    conexao.flush()
+    recebido = bytearray()
+    prazo = time.monotonic() + timeout
+    while time.monotonic() < prazo:
+        n = conexao.in_waiting
+        bloco = conexao.read(n) if n else b''
+        if not bloco:
+            time.sleep(0.01)
+            continue
+        recebido += bloco
+        i = recebido.find(RESPOSTA_BINARIO)
+        if i >= 0:
+            fim = recebido.find(b'\n', i)
+            if fim >= 0:
+                return True, bytes(recebido[fim + 1:])
+    return False, bytes(recebido)
+
+
+class DecodificadorBinario:
+    """
+    Separa e confere os quadros binários de um fluxo de bytes.
+
+    `receber(bloco)` trata o burst inteiro de uma vez: acha os
+    delimitadores, desfaz o COBS e confere o CRC de todos os quadros de
+    tamanho fixo com operações NumPy por coluna (o custo em Python é por
+    bloco, não por quadro). Blocos com menos de MIN_LOTE quadros (porta
+    lenta, um quadro por leitura) são conferidos um a um. Devolve os
+    quadros válidos como array estruturado QUADRO e as mensagens de texto
+    do firmware; o que sobrar depois do último delimitador espera o
+    próximo bloco.
+
+    Contagem de perdas pela numeração: `perdidos` soma os saltos de `seq`
+    entre quadros válidos consecutivos, inclusive entre blocos, então
+    inclui tanto os quadros descartados aqui (`corrompidos`) quanto os que
+    nunca chegaram. Um salto para trás de mais de meia volta é tomado como
+    reinício do dispositivo (`reinicios`), não como perda.
+    """
+
+    def __init__(self, metricas: RegistroMetricas | None = None):
+        self._buf = bytearray()
+        self._ultimo_seq = None
+        self.quadros = 0
+        self.mensagens = 0
+        self.corrompidos = 0
+        self.perdidos = 0
+        self.repetidos = 0
+        self.reinicios = 0
+        self.invalidos_seguidos = 0
+
+        m = metricas if metricas is not None else RegistroMetricas()
+        m.medidor('binario_quadros_total', 'Quadros binários válidos', lambda: self.quadros, 'counter')
+        m.medidor('binario_corrompidos_total', 'Quadros binários descartados (CRC, COBS ou tamanho)',
+                  lambda: self.corrompidos, 'counter')
+        m.medidor('binario_perdidos_total', 'Amostras faltando na numeração dos quadros',
+                  lambda: self.perdidos, 'counter')
+        self._h_decodificar = m.histograma('decodificacao_segundos',
+                                           'Decodificação de um bloco de quadros binários')
+
+    def reiniciar(self, dados: bytes = b''):
+        """Nova conexão: descarta o que sobrou e recomeça a numeração (o dispositivo pode ter reiniciado)."""
+        self._buf[:] = dados
+        self._ultimo_seq = None
+        self.invalidos_seguidos = 0
+
+    def receber(self, bloco: bytes) -> tuple[np.ndarray, list[str]]:
+        t0 = time.perf_counter()
+        buf = self._buf
+        buf += bloco
+        fim = buf.rfind(b'\0')
+        if fim < 0:
+            if len(buf) > MAX_QUADRO:
+                descartados = len(buf) // MAX_QUADRO
+                buf.clear()
+                self.corrompidos += descartados
+                self.invalidos_seguidos += descartados
+            return _NENHUM, []
+
+        dados = np.frombuffer(bytes(buf[:fim + 1]), np.uint8)
+        del buf[:fim + 1]
+        fins = np.flatnonzero(dados == 0)
+        inicios = np.empty_like(fins)
+        inicios[0] = 0
+        inicios[1:] = fins[:-1] + 1
+        tamanhos = fins - inicios
+
+        # raros: mensagens do firmware ou lixo entre dois delimitadores
+        invalidos = 0
+        mensagens = []
+        for i in np.flatnonzero((tamanhos != TAMANHO_COBS) & (tamanhos > 0)).tolist():
+            corpo = _decodificar(dados[inicios[i]:fins[i]].tobytes())
+            if corpo is None:
+                invalidos += 1
+            else:
+                mensagens.append(corpo[:-2].decode(errors='ignore').strip())
+
+        fixos = inicios[tamanhos == TAMANHO_COBS]
+        if len(fixos) < MIN_LOTE:
+            corpos = [_decodificar(dados[i:i + TAMANHO_COBS].tobytes()) for i in fixos.tolist()]
+            quadros = np.frombuffer(b''.join(c for c in corpos if c is not None), QUADRO)
+            invalidos += len(corpos) - len(quadros)
+        else:
+            codificados = dados[fixos[:, None] + np.arange(TAMANHO_COBS)]
+            decodificados, ok = _cobs_decodificar_lote(codificados)
+            crc = decodificados[:, -2] | (decodificados[:, -1].astype(np.uint16) << 8)
+            ok &= crc16_lote(decodificados[:, :-2]) == crc
+            invalidos += len(ok) - int(np.count_nonzero(ok))
+            quadros = np.ascontiguousarray(decodificados[ok]).view(QUADRO).reshape(-1)
+
+        if len(quadros):
+            self._contar_saltos(quadros['seq'])
+        self.quadros += len(quadros)
+        self.mensagens += len(mensagens)
+        self.corrompidos += invalidos
+        if len(quadros) or mensagens:
+            self.invalidos_seguidos = 0
+        else:
+            self.invalidos_seguidos += invalidos
+        self._h_decodificar.observar(time.perf_counter() - t0)
+        return quadros, mensagens
+
+    def _contar_saltos(self, seq: np.ndarray):
+        seq = seq.astype(np.int64)
+        anterior = seq[0] - 1 if self._ultimo_seq is None else self._ultimo_seq
+        saltos = np.diff(seq, prepend=anterior) & 0xFFFF   # 1 = consecutivo
+        avancos = saltos[(saltos > 0) & (saltos <= 0x8000)]
+        self.perdidos += int(avancos.sum()) - len(avancos)
+        self.repetidos += int(np.count_nonzero(saltos == 0))
+        self.reinicios += int(np.count_nonzero(saltos > 0x8000))
+        self._ultimo_seq = int(seq[-1])
+
+
+def _decodificar(codificado: bytes) -> bytes | None:
+    """Um quadro ou mensagem sem o delimitador: o conteúdo com o CRC, ou None se não confere."""
+    corpo = cobs_decodificar(codificado)
+    if corpo is None or len(corpo) < 3 or crc16(corpo[:-2]) != int.from_bytes(corpo[-2:], 'little'):
+        return None
+    return corpo
+
+
+_NENHUM = np.empty(0, QUADRO)
@@ -1,22 +1,31 @@
+import sys
+
 import serial
 
+from leitor_serial import LeitorLinhas
+from transporte import abrir_transporte
+
 # ===============================
 # CONFIGURAÇÃO SERIAL
 # ===============================
-porta_serial = 'COM2'
+# também aceita os transportes de transporte.py: tcp://, pty, arquivo://, sim://
+porta_serial = sys.argv[1] if len(sys.argv) > 1 else 'COM2'
 taxa_baude = 115200
 
 # ===============================
 # MAIN – SOMENTE LEITURA
 # ===============================
 try:
-    with serial.Serial(porta_serial, taxa_baude, timeout=1) as ser:
+    ser = abrir_transporte(porta_serial, taxa_baude, timeout=1)
+    try:
         print("Aguardando dados da serial... (Ctrl+C para sair)\n")
 
+        leitor = LeitorLinhas(ser)
         while True:
-            linha = ser.readline().decode('utf-8', errors='ignore').strip()
-            if linha:
+            for linha in leitor.ler_linhas():
                 print(f"[RX] {linha}")
+    finally:
+        ser.close()
 
 except serial.SerialException as e:
     print(f"Erro na serial: {e}")
@@ -0,0 +1,162 @@
+import io
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from analise import analisar, linhas_resumo
+
+# ==========================
+# RELATÓRIO PDF (RODA NO POOL DE PROCESSOS)
+# ==========================
+# matplotlib e reportlab só são importados ao gerar o primeiro relatório
+# (ou em pre_carregar): somam quase 1 s à partida e não servem à aquisição
+PONTOS_GRAFICO = 1500  # pontos plotados, qualquer que seja a duração da sessão
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_saida: int):
+    """
+    Largest-Triangle-Three-Buckets: reduz a série a `n_saida` pontos
+    preservando picos e vales (o primeiro e o último ponto são mantidos).
+    """
+    n = len(x)
+    if n <= n_saida or n_saida < 3:
+        return x, y
+
+    # n_saida - 2 baldes internos; passo >= 1, então nenhum balde fica vazio
+    bordas = np.linspace(1, n - 1, n_saida - 1).astype(np.int64)
+    idx = np.empty(n_saida, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+
+    a = 0
+    for i in range(n_saida - 2):
+        ini, fim = bordas[i], bordas[i + 1]
+        prox_fim = bordas[i + 2] if i + 2 < len(bordas) else n
+        mx = x[fim:prox_fim].mean()
+        my = y[fim:prox_fim].mean()
+
+        areas = np.abs((x[a] - mx) * (y[ini:fim] - y[a])
+                       - (x[a] - x[ini:fim]) * (my - y[a]))
+        a = ini + int(areas.argmax())
+        idx[i + 1] = a
+
+    return x[idx], y[idx]
+
+
+def grafico_rpm_png(rpm: np.ndarray) -> bytes:
+    """Gráfico de RPM pela API orientada a objetos (Agg), sem estado do pyplot."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    x, y = lttb(np.arange(len(rpm), dtype=np.float64), rpm, PONTOS_GRAFICO)
+
+    fig = Figure(figsize=(10, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(x, y, linewidth=2)
+    ax.set_title("RPM ao longo da sessão")
+    ax.set_xlabel("Amostra")
+    ax.set_ylabel("RPM")
+    ax.grid(True, alpha=0.3)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=120, bbox_inches='tight')
+    return buf.getvalue()
+
+
+def gerar_relatorio_pdf(caminho: str, stats: dict, hist: dict,
+                        png: bytes | None = None,
+                        titulo: str = "Relatório da Sessão - Bancada de Testes") -> bytes:
+    """
+    Monta o PDF em `caminho`. Se `png` vier do cache, o gráfico não é
+    refeito. Devolve o PNG usado, para o processo principal guardar.
+    """
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    if png is None:
+        png = grafico_rpm_png(hist['rpm'])
+
+    c = canvas.Canvas(caminho)
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, 820, titulo)
+
+    c.setFont("Helvetica", 12)
+    rpm_st = stats['canais']['rpm']
+    temp_st = stats['canais']['temperatura']
+    c.drawString(50, 800, f"Total de registros: {stats['total']}")
+    c.drawString(50, 785, f"RPM médio: {rpm_st['media']:.2f} "
+                          f"(σ {rpm_st['desvio']:.2f}, pico {rpm_st['max']:.2f})")
+    c.drawString(50, 770, f"Temperatura média: {temp_st['media']:.2f} °C "
+                          f"(máx {temp_st['max']:.2f} °C)")
+    c.drawString(50, 755, f"Tempo acima de {stats['limite_rpm']:.0f} RPM: "
+                          f"{stats['tempo_acima']:.0f} s")
+
+    c.setFont("Helvetica", 9)
+    y = 738
+    for linha in linhas_resumo(analisar(hist)):
+        c.drawString(50, y, linha)
+        y -= 12
+
+    c.drawImage(ImageReader(io.BytesIO(png)), 50, 460, width=500, height=220)
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, 440, "Últimos registros:")
+
+    c.setFont("Helvetica", 9)
+    y = 420
+    for ts, rpm, temp, tensao, corrente in zip(
+        hist['ts'][-20:], hist['rpm'][-20:], hist['temperatura'][-20:],
+        hist['tensao'][-20:], hist['corrente'][-20:],
+    ):
+        text = (f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}  |  "
+                f"RPM: {rpm:.2f}  |  "
+                f"Temp: {temp:.2f} °C  |  "
+                f"Tensão: {tensao:.2f} V  |  "
+                f"Corrente: {corrente:.2f} A")
+        c.drawString(50, y, text)
+        y -= 12
+        if y < 40:
+            c.showPage()
+            c.setFont("Helvetica", 9)
+            y = 820
+
+    c.save()
+    return png
+
+
+def pre_carregar() -> float:
+    """
+    Importa matplotlib e reportlab e desenha um gráfico mínimo (fontes e
+    backend), para o primeiro relatório não pagar isso. Devolve os segundos.
+    """
+    inicio = time.perf_counter()
+    grafico_rpm_png(np.zeros(2))
+    from reportlab.pdfgen import canvas
+    return time.perf_counter() - inicio
+
+
+class CacheGraficos:
+    """PNGs já renderizados, por faixa da sessão (primeiro ts, último ts, amostras)."""
+
+    def __init__(self, tamanho: int = 8):
+        self.tamanho = tamanho
+        self._itens = OrderedDict()
+
+    @staticmethod
+    def chave(hist: dict):
+        ts = hist['ts']
+        return (float(ts[0]), float(ts[-1]), len(ts)) if len(ts) else None
+
+    def obter(self, chave):
+        png = self._itens.get(chave)
+        if png is not None:
+            self._itens.move_to_end(chave)
+        return png
+
+    def guardar(self, chave, png: bytes):
+        self._itens[chave] = png
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.tamanho:
+            self._itens.popitem(last=False)
@@ -0,0 +1,337 @@
+"""
+Replay de sessões gravadas pelo mesmo caminho da aquisição ao vivo:
+transporte -> LeitorLinhas -> parse -> histórico/estatísticas/rollups ->
+fila do gravador -> fotografia do dashboard. Mede vazão e latência por
+estágio, para comparar o desempenho em capturas reais entre versões e
+reproduzir incidentes de alarme fora da bancada (as regras de alarme
+padrão rodam na reprodução; comandos como 'd8' são só registrados).
+
+    python replay.py historico_medicoes.csv                 # ritmo original
+    python replay.py historico_medicoes.csv --velocidade 20
+    python replay.py historico_medicoes.csv --velocidade max --repetir 20 --json
+    python replay.py dados_capturados_LDR.txt --taxa-txt 50 --velocidade max
+
+No supervisório: PORTA_SERIAL = 'replay://historico_medicoes.csv?velocidade=10'.
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from alarmes import MotorAlarmes, regras_padrao
+from armazenamento import ArmazenamentoParticionado
+from difusor import DifusorPainel
+from gravador_csv import CABECALHO, GravadorCSV
+from leitor_serial import LeitorLinhas
+from metricas import RegistroMetricas
+from pipeline import PipelineAquisicao
+from transporte import _TransporteGerado
+
+# ==========================
+# LEITURA DA SESSÃO GRAVADA
+# ==========================
+PAUSA_MAX = 10.0     # s; intervalos maiores (sessões diferentes no mesmo CSV) são encurtados
+TAXA_TXT = 10.0      # Hz; capturas .txt não têm horário
+COMANDO_CORTE = 'd8'  # na reprodução o corte só é registrado: mede a reação do alarme
+MODO_REPLAY = 'REPLAY'
+
+# layouts já gravados no historico_medicoes.csv, pelo número de colunas
+_LAYOUTS = {
+    3: ('timestamp', 'pulsos', 'rpm'),
+    5: tuple(CABECALHO),
+}
+_ROTULOS = {'rpm': 'RPM', 'temperatura': 'Temperatura', 'tensao': 'Tensao',
+            'corrente': 'Corrente', 'pulsos': 'Pulsos'}
+
+
+class Sessao:
+    """Quadros de uma sessão gravada e o horário original de cada um."""
+
+    def __init__(self, quadros: list[bytes], ts: np.ndarray):
+        self.quadros = quadros
+        self.ts = ts
+        # intervalo antes de cada quadro, já com as pausas longas encurtadas
+        self.intervalos = np.minimum(np.diff(ts, prepend=ts[:1]), PAUSA_MAX) if len(ts) else ts
+
+    def __len__(self):
+        return len(self.quadros)
+
+    @property
+    def duracao(self) -> float:
+        return float(self.intervalos.sum())
+
+
+def _quadro(colunas, valores) -> bytes:
+    campos = [f'{_ROTULOS.get(c, c.capitalize())}: {v.strip()}' for c, v in zip(colunas, valores)]
+    return ('Modo: ' + MODO_REPLAY + ' || ' + ' || '.join(campos) + '\n').encode()
+
+
+def _espalhar_mesmo_segundo(ts: np.ndarray) -> np.ndarray:
+    """O CSV grava ts com resolução de 1 s: distribui as amostras de cada segundo nele."""
+    if not len(ts):
+        return ts
+    _, inicio, contagem = np.unique(ts, return_index=True, return_counts=True)
+    posicao = np.arange(len(ts)) - np.repeat(inicio, contagem)
+    return ts + posicao / np.repeat(contagem, contagem)
+
+
+def ler_sessao(caminho: str, taxa_txt: float = TAXA_TXT) -> Sessao:
+    """
+    CSV do gravador (qualquer das versões, inclusive misturadas no mesmo
+    arquivo) vira quadros no formato do firmware, com os horários
+    originais; qualquer outro arquivo é tratado como captura de linhas
+    cruas, no ritmo fixo `taxa_txt`.
+    """
+    with open(caminho, newline='', encoding='utf-8', errors='ignore') as f:
+        primeira = f.readline()
+        f.seek(0)
+
+        if not primeira.lower().startswith('timestamp'):
+            quadros = [l.strip().encode() + b'\n' for l in f if l.strip()]
+            return Sessao(quadros, np.arange(len(quadros)) / taxa_txt)
+
+        delim = ';' if primeira.count(';') > primeira.count(',') else ','
+        leitor = csv.reader(f, delimiter=delim)
+        cabecalho = tuple(c.strip().lower() for c in next(leitor))
+
+        quadros, ts = [], []
+        for linha in leitor:
+            colunas = cabecalho if len(linha) == len(cabecalho) else _LAYOUTS.get(len(linha))
+            if colunas is None:
+                continue
+            try:
+                t = datetime.strptime(linha[0], '%Y-%m-%d %H:%M:%S').timestamp()
+            except ValueError:
+                continue  # cabeçalho repetido ou linha corrompida
+            quadros.append(_quadro(colunas[1:], linha[1:]))
+            ts.append(t)
+
+    ts = np.asarray(ts, dtype=np.float64)
+    ordem = np.argsort(ts, kind='stable')
+    return Sessao([quadros[i] for i in ordem], _espalhar_mesmo_segundo(ts[ordem]))
+
+
+class TransporteReplay(_TransporteGerado):
+    """
+    Entrega os quadros de uma sessão gravada respeitando os intervalos
+    originais divididos por `velocidade` ('max' ou 0 = sem espera).
+    """
+
+    def __init__(self, caminho_ou_sessao, velocidade='1', timeout: float = 1,
+                 repetir: bool = False, taxa_txt: float = TAXA_TXT):
+        super().__init__('0', timeout)
+        self.sessao = (caminho_ou_sessao if isinstance(caminho_ou_sessao, Sessao)
+                       else ler_sessao(caminho_ou_sessao, taxa_txt))
+        velocidade = 0.0 if str(velocidade) == 'max' else float(velocidade)
+        self.velocidade = velocidade
+        self.repetir = repetir
+        self.entregues = 0
+        self.fim = False
+        self._i = -1
+
+    def _proximo_quadro(self):
+        n = len(self.sessao)
+        if not n or (self.entregues >= n and not self.repetir):
+            self.fim = True
+            return None
+        self._i = self.entregues % n
+        self.entregues += 1
+        return self.sessao.quadros[self._i]
+
+    def _intervalo(self, quadro: bytes) -> float:
+        if not self.velocidade:
+            return 0.0
+        return float(self.sessao.intervalos[self._i]) / self.velocidade
+
+
+# ==========================
+# EXECUÇÃO SEM INTERFACE
+# ==========================
+ESTAGIOS = ('leitura', 'parse', 'armazenar', 'persistir', 'ponta_a_ponta')
+
+
+def _percentis_ms(valores) -> dict:
+    if not len(valores):
+        return {'n': 0}
+    v = np.frombuffer(valores, dtype=np.float64) * 1000
+    p50, p99, p999 = np.percentile(v, [50, 99, 99.9])
+    return {'n': len(v), 'p50': p50, 'p99': p99, 'p99.9': p999, 'max': float(v.max())}
+
+
+def reproduzir(caminho: str, velocidade='max', repetir: int = 1, persistir: bool = True,
+               relogio: str = 'original', intervalo_painel: float = 1.0,
+               capacidade: int = 100_000, limite_rpm: float = 35, janela: int = 60,
+               limite_temperatura: float = 80.0, taxa_txt: float = TAXA_TXT) -> dict:
+    """
+    Reproduz a sessão `repetir` vezes e devolve o relatório. Com
+    `relogio='original'` as amostras entram com o horário gravado (as
+    estatísticas de tempo acima do limite batem com o incidente original);
+    com 'atual', com o horário da reprodução, como no supervisório.
+    """
+    sessao = ler_sessao(caminho, taxa_txt)
+    transporte = TransporteReplay(sessao, velocidade, timeout=0.2, repetir=repetir > 1)
+    transporte.chegadas = deque()
+    leitor = LeitorLinhas(transporte)
+    total_quadros = len(sessao) * repetir
+
+    pasta = None
+    gravador = None
+    if persistir:
+        pasta = tempfile.mkdtemp(prefix='replay_')
+        gravador = GravadorCSV(os.path.join(pasta, 'replay.csv'),
+                               armazenamento=ArmazenamentoParticionado(os.path.join(pasta, 'dados')))
+        gravador.iniciar()
+
+    metricas = RegistroMetricas()
+    alarmes = MotorAlarmes(regras_padrao(limite_rpm, limite_temperatura=limite_temperatura,
+                                         comando_corte=COMANDO_CORTE),
+                           enviar=lambda c: transporte.write((c + '\n').encode()),
+                           metricas=metricas)
+    pipeline = PipelineAquisicao(capacidade, limite_rpm, gravador, metricas, alarmes)
+    difusor = DifusorPainel(pipeline, janela, metricas)
+
+    tempos = {e: array('d') for e in ESTAGIOS}
+    painel = array('d')
+    deslocamento = sessao.duracao + PAUSA_MAX  # cada volta continua depois da anterior
+    n = len(sessao)
+    i = 0
+    proximo_painel = time.perf_counter() + intervalo_painel
+    perf = time.perf_counter
+
+    inicio = perf()
+    while i < total_quadros:
+        linhas = leitor.ler_linhas()
+        lido = perf()
+        if not linhas:
+            if transporte.fim and not transporte.in_waiting:
+                break
+            continue
+
+        for linha in linhas:
+            if i >= total_quadros:
+                break
+            chegada = transporte.chegadas.popleft() if transporte.chegadas else lido
+            if relogio == 'original':
+                ts = float(sessao.ts[i % n]) + (i // n) * deslocamento
+            else:
+                ts = time.time()
+            i += 1
+
+            t0 = perf()
+            amostra = pipeline.parse(linha)
+            t1 = perf()
+            pipeline.armazenar(linha, amostra, ts, chegada)
+            t2 = perf()
+            if amostra is not None:
+                pipeline.persistir(amostra, ts)
+            t3 = perf()
+
+            tempos['leitura'].append(lido - chegada)
+            tempos['parse'].append(t1 - t0)
+            tempos['armazenar'].append(t2 - t1)
+            tempos['persistir'].append(t3 - t2)
+            tempos['ponta_a_ponta'].append(t3 - chegada)
+
+        if perf() >= proximo_painel:
+            t0 = perf()
+            difusor.fotografar()
+            painel.append(perf() - t0)
+            proximo_painel += intervalo_painel
+
+    duracao = perf() - inicio
+    t0 = perf()
+    difusor.fotografar()
+    painel.append(perf() - t0)
+
+    reacao = metricas.obter('alarme_reacao_segundos')   # registrado pelo MotorAlarmes
+    relatorio = {
+        'arquivo': caminho,
+        'velocidade': velocidade,
+        'quadros': i,
+        'duracao_s': duracao,
+        'linhas_s': i / duracao if duracao else 0.0,
+        'duracao_original_s': sessao.duracao * repetir,
+        'parser': {'genericos': pipeline.parser.genericos,
+                   'malformados': pipeline.parser.malformados},
+        'latencia_ms': {e: _percentis_ms(tempos[e]) for e in ESTAGIOS},
+        'painel_ms': _percentis_ms(painel),
+        'resumo': pipeline.estatisticas.resumo(),
+        'alarmes': {
+            'eventos': list(alarmes.log),
+            'comandos': [c.decode().strip() for c in transporte.escritos],
+            'reacao_ms': {q: h * 1000 for q, h in (
+                ('p50', reacao.quantil(0.5)), ('p99', reacao.quantil(0.99)), ('max', reacao.maximo))},
+        },
+    }
+
+    if gravador is not None:
+        t0 = perf()
+        gravador.parar(timeout=None)
+        relatorio['gravador'] = {'gravadas': gravador.gravadas,
+                                 'descartadas': gravador.descartadas,
+                                 'drenagem_ms': (perf() - t0) * 1000}
+        shutil.rmtree(pasta, ignore_errors=True)
+    return relatorio
+
+
+def imprimir(r: dict):
+    vel = r['velocidade'] if r['velocidade'] == 'max' else f"{r['velocidade']}x"
+    print(f"[REPLAY] {r['arquivo']} @ {vel}: {r['quadros']} quadros em "
+          f"{r['duracao_s']:.2f} s ({r['linhas_s']:,.0f} linhas/s; "
+          f"original {r['duracao_original_s']:.0f} s)")
+    print(f"  parser: {r['parser']['genericos']} genéricos, "
+          f"{r['parser']['malformados']} malformados")
+    print(f"  {'estágio':14s} {'p50':>9s} {'p99':>9s} {'p99.9':>9s} {'max':>9s}  (ms)")
+    for nome, p in list(r['latencia_ms'].items()) + [('painel', r['painel_ms'])]:
+        if p['n']:
+            print(f"  {nome:14s} {p['p50']:9.4f} {p['p99']:9.4f} {p['p99.9']:9.4f} {p['max']:9.3f}")
+    if 'gravador' in r:
+        g = r['gravador']
+        print(f"  gravador: {g['gravadas']} gravadas, {g['descartadas']} descartadas, "
+              f"drenagem {g['drenagem_ms']:.1f} ms")
+    res = r['resumo']
+    print(f"  resumo: {res['total']} amostras, {res['amostras_acima']} acima de "
+          f"{res['limite_rpm']} RPM ({res['tempo_acima']:.1f} s)")
+    al = r['alarmes']
+    ativacoes = [e for e in al['eventos'] if e['evento'] == 'ativou']
+    print(f"  alarmes: {len(ativacoes)} ativações, comandos enviados: {len(al['comandos'])}, "
+          f"reação p50={al['reacao_ms']['p50']:.3f} ms p99={al['reacao_ms']['p99']:.3f} ms "
+          f"máx={al['reacao_ms']['max']:.3f} ms")
+    for e in al['eventos'][:10]:
+        print(f"    {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(e['ts']))}  "
+              f"{e['descricao']}: {e['evento']} ({e['valor']:.2f})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('arquivo')
+    ap.add_argument('--velocidade', default='max', help="1, N (acelerado) ou 'max'")
+    ap.add_argument('--repetir', type=int, default=1, help='voltas pela sessão')
+    ap.add_argument('--sem-persistencia', action='store_true')
+    ap.add_argument('--relogio', choices=('original', 'atual'), default='original')
+    ap.add_argument('--taxa-txt', type=float, default=TAXA_TXT,
+                    help='Hz para capturas de linhas sem horário')
+    ap.add_argument('--json', action='store_true', help='relatório em JSON (para comparar versões)')
+    args = ap.parse_args()
+
+    r = reproduzir(args.arquivo, args.velocidade, args.repetir,
+                   persistir=not args.sem_persistencia, relogio=args.relogio,
+                   taxa_txt=args.taxa_txt)
+    if args.json:
+        json.dump(r, sys.stdout, indent=2, default=float)
+        print()
+    else:
+        imprimir(r)
+
+
+if __name__ == '__main__':
+    main()
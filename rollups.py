@@ -0,0 +1,135 @@
+import math
+
+import numpy as np
+
+from historico import CANAIS
+
+# ==========================
+# ROLLUPS EM VÁRIAS RESOLUÇÕES
+# ==========================
+RESOLUCOES = (1, 10, 60, 600)   # segundos por balde
+BALDES_POR_RESOLUCAO = 3600     # 1 h de 1 s, 10 h de 10 s, 60 h de 1 min, 25 d de 10 min
+MAX_PONTOS_GRAFICO = 360
+
+
+class _Rollup:
+    """Baldes fechados de uma resolução, num buffer circular colunar."""
+
+    def __init__(self, resolucao: float, capacidade: int):
+        self.resolucao = resolucao
+        self.capacidade = capacidade
+        nc = len(CANAIS)
+        self.ts = np.zeros(capacidade)
+        self.minimo = np.zeros((capacidade, nc))
+        self.maximo = np.zeros((capacidade, nc))
+        self.media = np.zeros((capacidade, nc))
+        self.ultimo = np.zeros((capacidade, nc))
+        self._pos = 0
+        self._n = 0
+
+        # balde em aberto
+        self._balde = None
+        self._mins = [math.inf] * nc
+        self._maxs = [-math.inf] * nc
+        self._somas = [0.0] * nc
+        self._cont = 0
+        self._ult = [0.0] * nc
+
+    def adicionar(self, ts: float, valores):
+        balde = int(ts // self.resolucao)
+        if balde != self._balde:
+            if self._cont:
+                self._fechar()
+            self._balde = balde
+
+        self._cont += 1
+        mins, maxs, somas = self._mins, self._maxs, self._somas
+        for i, v in enumerate(valores):
+            if v < mins[i]:
+                mins[i] = v
+            if v > maxs[i]:
+                maxs[i] = v
+            somas[i] += v
+        self._ult = valores
+
+    def _fechar(self):
+        i = self._pos
+        self.ts[i] = self._balde * self.resolucao
+        self.minimo[i] = self._mins
+        self.maximo[i] = self._maxs
+        self.media[i] = [s / self._cont for s in self._somas]
+        self.ultimo[i] = self._ult
+
+        self._pos = (i + 1) % self.capacidade
+        self._n = min(self._n + 1, self.capacidade)
+
+        nc = len(CANAIS)
+        self._mins = [math.inf] * nc
+        self._maxs = [-math.inf] * nc
+        self._somas = [0.0] * nc
+        self._cont = 0
+
+    def serie(self, desde: float, canal: int) -> dict:
+        """Cópia dos baldes fechados com ts >= desde, mais o balde em aberto."""
+        ordem = (np.arange(self._pos - self._n, self._pos)) % self.capacidade
+        ts = self.ts[ordem]
+        sel = ordem[ts >= desde]
+        serie = {
+            'ts': self.ts[sel].tolist(),
+            'min': self.minimo[sel, canal].tolist(),
+            'max': self.maximo[sel, canal].tolist(),
+            'media': self.media[sel, canal].tolist(),
+            'ultimo': self.ultimo[sel, canal].tolist(),
+        }
+        if self._cont:
+            serie['ts'].append(self._balde * self.resolucao)
+            serie['min'].append(self._mins[canal])
+            serie['max'].append(self._maxs[canal])
+            serie['media'].append(self._somas[canal] / self._cont)
+            serie['ultimo'].append(self._ult[canal])
+        return serie
+
+
+class RollupsMultiResolucao:
+    """
+    Agregados min/max/média/último por canal em várias resoluções,
+    alimentados amostra a amostra pela thread serial. Memória fixa:
+    `BALDES_POR_RESOLUCAO` baldes por resolução.
+
+    `serie(canal, janela_s)` escolhe a resolução mais fina que cabe em
+    `max_pontos` para a janela pedida, então qualquer zoom (do último
+    minuto ao turno inteiro) devolve um número limitado de pontos.
+    Não é thread-safe: de outra thread, leia por PipelineAquisicao.serie.
+    """
+
+    def __init__(self, resolucoes=RESOLUCOES, capacidade: int = BALDES_POR_RESOLUCAO,
+                 max_pontos: int = MAX_PONTOS_GRAFICO):
+        self.max_pontos = max_pontos
+        self.niveis = [_Rollup(r, capacidade) for r in resolucoes]
+        self._ultimo_ts = None
+
+    def adicionar(self, ts: float, rpm: float, temperatura: float,
+                  tensao: float, corrente: float):
+        valores = (rpm, temperatura, tensao, corrente)
+        if any(v != v for v in valores):
+            return  # NaN estragaria min/max do balde
+        for nivel in self.niveis:
+            nivel.adicionar(ts, valores)
+        self._ultimo_ts = ts
+
+    def resolucao_para(self, janela_s: float) -> float:
+        for nivel in self.niveis:
+            if janela_s / nivel.resolucao <= self.max_pontos:
+                return nivel.resolucao
+        return self.niveis[-1].resolucao
+
+    def serie(self, canal: str, janela_s: float) -> dict:
+        resolucao = self.resolucao_para(janela_s)
+        nivel = next(n for n in self.niveis if n.resolucao == resolucao)
+        if self._ultimo_ts is None:
+            return {'resolucao': resolucao, 'ts': [], 'min': [], 'max': [],
+                    'media': [], 'ultimo': []}
+
+        serie = nivel.serie(self._ultimo_ts - janela_s, CANAIS.index(canal))
+        serie['resolucao'] = resolucao
+        return serie
@@ -0,0 +1,166 @@
+"""
+Dispositivo sintético da bancada: gera quadros
+`Modo: ... || RPM: ... || Temperatura: ... || Tensao: ... || Corrente: ...`
+numa taxa configurável (ou no limite da linha a 115200 baud), para testar
+o supervisório sem o hardware.
+
+    python simulador.py --saida tcp://0.0.0.0:5000 --taxa 200
+    python simulador.py --saida pty --taxa linha       # imprime o /dev/pts/N
+    python simulador.py --saida stdout --taxa 5
+    python simulador.py --saida tcp://0.0.0.0:5000 --taxa linha --binario --perda 0.01
+
+No supervisório, aponte PORTA_SERIAL para 'tcp://localhost:5000', para o
+pts impresso, ou use direto 'sim://?taxa=200' (gerador em processo).
+
+Com --binario (sim://...&binario=1) o dispositivo aceita a negociação do
+formato binário (ver quadros_binarios) e passa a enviar quadros COBS;
+--perda descarta essa fração dos quadros binários, como um enlace ruim,
+sem pular a numeração.
+"""
+import argparse
+import math
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+from quadros_binarios import COMANDO_BINARIO, RESPOSTA_BINARIO, codificar_quadro
+
+# ==========================
+# GERADOR DE QUADROS
+# ==========================
+BAUD_LINHA = 115200
+BITS_POR_BYTE = 10  # 8N1
+
+
+class GeradorQuadros:
+    """
+    Quadros de telemetria plausíveis (RPM em rampa, temperatura com deriva,
+    ruído). Em texto por padrão; com `aceita_binario`, responde ao
+    COMANDO_BINARIO recebido em `comando()` e troca para quadros binários.
+    """
+
+    def __init__(self, semente: int | None = None, modo: str = 'SMAW',
+                 aceita_binario: bool = False, perda: float = 0.0):
+        self.rnd = random.Random(semente)
+        self.modo = modo
+        self.seq = 0
+        self.temperatura = 45.0
+        self.aceita_binario = aceita_binario
+        self.perda = perda
+        self.binario = False
+        self._respostas = deque()   # escritas por comando(), enviadas antes do próximo quadro
+
+    def comando(self, dados: bytes):
+        """Bytes vindos do supervisório (outra thread no simulador TCP)."""
+        if self.aceita_binario and COMANDO_BINARIO.strip() in dados:
+            self._respostas.append(RESPOSTA_BINARIO + b'\n')
+
+    def valores(self) -> tuple:
+        i = self.seq
+        self.seq += 1
+        rnd = self.rnd
+        rpm = max(0.0, 30 + 25 * math.sin(i / 200) + rnd.gauss(0, 1.5))
+        self.temperatura += 0.01 * (rpm - 30) / 30 + rnd.gauss(0, 0.02)
+        tensao = 1.24 + rnd.gauss(0, 0.01)
+        corrente = 2.70 + 0.02 * rpm / 10 + rnd.gauss(0, 0.02)
+        return i, rpm, self.temperatura, tensao, corrente
+
+    def proximo(self) -> bytes:
+        if self._respostas:
+            self.binario = True
+            return self._respostas.popleft()
+        seq, rpm, temperatura, tensao, corrente = self.valores()
+        if self.binario:
+            while self.perda and self.rnd.random() < self.perda:
+                seq, rpm, temperatura, tensao, corrente = self.valores()   # medida e perdida
+            return codificar_quadro(seq, rpm, temperatura, tensao, corrente)
+        return (f'Modo: {self.modo} || RPM: {rpm:.2f} || '
+                f'Temperatura: {temperatura:.2f} || '
+                f'Tensao: {tensao:.2f} || Corrente: {corrente:.2f}\n').encode()
+
+
+def intervalo_quadro(taxa, tamanho: int, baudrate: int = BAUD_LINHA) -> float:
+    """Segundos entre quadros: `taxa` em Hz, 'linha' (limite do baud) ou 0 (sem limite)."""
+    if taxa == 'linha':
+        return tamanho * BITS_POR_BYTE / baudrate
+    taxa = float(taxa)
+    return 1 / taxa if taxa > 0 else 0.0
+
+
+def emitir(escrever, taxa, baudrate: int = BAUD_LINHA, quantidade: int | None = None,
+           semente: int | None = None, gerador: GeradorQuadros | None = None):
+    """Chama `escrever(bytes)` no ritmo pedido, sem acumular atraso."""
+    if gerador is None:
+        gerador = GeradorQuadros(semente)
+    proximo = time.perf_counter()
+    enviados = 0
+    while quantidade is None or enviados < quantidade:
+        quadro = gerador.proximo()
+        proximo += intervalo_quadro(taxa, len(quadro), baudrate)
+        espera = proximo - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        escrever(quadro)
+        enviados += 1
+    return enviados
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--saida', default='stdout', help="'stdout', 'pty' ou tcp://host:porta")
+    ap.add_argument('--taxa', default='10', help="quadros/s, 'linha' ou 0 (sem limite)")
+    ap.add_argument('--baud', type=int, default=BAUD_LINHA)
+    ap.add_argument('--quantidade', type=int, default=None)
+    ap.add_argument('--semente', type=int, default=None)
+    ap.add_argument('--binario', action='store_true', help='aceita a negociação do formato binário')
+    ap.add_argument('--perda', type=float, default=0.0, help='fração de quadros binários descartados')
+    args = ap.parse_args()
+    gerador = GeradorQuadros(args.semente, aceita_binario=args.binario, perda=args.perda)
+
+    def ouvir(ler):
+        # comandos do supervisório (negociação do formato); o resto é ignorado
+        def laco():
+            try:
+                while dados := ler():
+                    gerador.comando(dados)
+            except OSError:
+                pass
+        threading.Thread(target=laco, daemon=True).start()
+
+    def rodar(escrever):
+        try:
+            n = emitir(escrever, args.taxa, args.baud, args.quantidade, gerador=gerador)
+            print(f'[SIM] {n} quadros enviados', file=sys.stderr)
+        except (BrokenPipeError, ConnectionError, KeyboardInterrupt):
+            print('[SIM] encerrado', file=sys.stderr)
+
+    if args.saida == 'stdout':
+        rodar(lambda b: (sys.stdout.buffer.write(b), sys.stdout.flush()))
+
+    elif args.saida == 'pty':
+        import tty  # só existe em Linux/macOS
+        mestre, escravo = os.openpty()
+        tty.setraw(escravo)
+        print(f'[SIM] porta: {os.ttyname(escravo)}', file=sys.stderr)
+        ouvir(lambda: os.read(mestre, 256))
+        rodar(lambda b: os.write(mestre, b))
+
+    elif args.saida.startswith('tcp://'):
+        host, porta = args.saida[len('tcp://'):].rsplit(':', 1)
+        with socket.create_server((host, int(porta))) as srv:
+            print(f'[SIM] aguardando conexão em {host}:{porta}', file=sys.stderr)
+            con, _ = srv.accept()
+            with con:
+                con.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                ouvir(lambda: con.recv(256))
+                rodar(con.sendall)
+    else:
+        ap.error(f'saída desconhecida: {args.saida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Teste de estresse da publicação sem lock (um escritor, vários leitores).
+
+Uma thread escritora grava amostras pelo PipelineAquisicao em que todos os
+canais derivam do índice k (ts = k, rpm = k + 0.25, temperatura = 2k,
+tensao = -k, corrente = k mod 997). Vários leitores martelam ao mesmo
+tempo as leituras usadas pela interface e conferem cada resultado:
+
+  - janela do histórico: toda linha coerente com o próprio ts, índices
+    consecutivos e terminando em total - 1 (nenhuma amostra rasgada);
+  - resumo das estatísticas: o mesmo n em todos os canais e máximos
+    batendo entre si;
+  - rollups: mínimo <= média <= máximo e listas do mesmo tamanho;
+  - `estado`: os quatro canais da mesma amostra.
+
+    python stress_publicacao.py --leitores 8 --segundos 10
+    python stress_publicacao.py --ingenuo     # leitura por views, sem validação
+    python stress_publicacao.py --redimensionar   # troca a capacidade com leitores rodando
+
+Com --ingenuo os leitores usam `ultimos()` + cópia coluna a coluna, como
+era feito antes sob o lock; sem lock, o teste deve acusar amostras rasgadas
+(e mostrar que a verificação funciona). Com --redimensionar o escritor troca
+a capacidade do histórico (PipelineAquisicao.configurar) a cada
+REDIMENSIONAR_A_CADA amostras, como a tela de Configurações faz com a
+aquisição rodando. Sai com código 1 se achar erro.
+"""
+import argparse
+import random
+import threading
+import time
+
+import numpy as np
+
+from parser_telemetria import Amostra
+from pipeline import PipelineAquisicao
+
+CAPACIDADE = 4096   # pequena de propósito: o escritor dá a volta no buffer o tempo todo
+REDIMENSIONAR_A_CADA = 5000
+
+
+def amostra(k: int) -> Amostra:
+    return Amostra(k + 0.25, 2.0 * k, -float(k), float(k % 997), 'SMAW')
+
+
+def escritor(pipeline, parar, contagem, taxa, redimensionar):
+    k = 0
+    periodo = 1 / taxa if taxa else 0.0
+    proximo = time.perf_counter()
+    tempos = []
+    while not parar.is_set():
+        t0 = time.perf_counter()
+        pipeline.armazenar(f'k={k}', amostra(k), float(k))
+        tempos.append(time.perf_counter() - t0)
+        k += 1
+        if redimensionar and k % REDIMENSIONAR_A_CADA == 0:
+            pipeline.configurar(capacidade=random.choice((CAPACIDADE // 2, CAPACIDADE, 2 * CAPACIDADE)))
+            contagem['trocas'] += 1
+        if periodo:
+            proximo += periodo
+            espera = proximo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+    contagem['escritas'] = k
+    contagem['escrita_us'] = np.percentile(np.array(tempos) * 1e6, [50, 99, 99.9]) if tempos else []
+
+
+def conferir_janela(total, colunas, erros):
+    ts = colunas['ts']
+    if not len(ts):
+        return
+    if ts[-1] != total - 1 or np.any(np.diff(ts) != 1):
+        erros.append(f'janela fora de ordem: total={total} ts={ts[0]:.0f}..{ts[-1]:.0f}')
+        return
+    esperado = {
+        'rpm': ts + 0.25,
+        'temperatura': 2.0 * ts,
+        'tensao': -ts,
+        'corrente': ts % 997,
+    }
+    for nome, valores in esperado.items():
+        ruins = np.flatnonzero(colunas[nome] != valores)
+        if len(ruins):
+            k = int(ts[ruins[0]])
+            erros.append(f'amostra rasgada k={k} ({nome}={colunas[nome][ruins[0]]})')
+            return
+
+
+def conferir_resumo(resumo, erros):
+    canais = resumo['canais']
+    ns = {c['n'] for c in canais.values()}
+    if len(ns) != 1 or resumo['total'] not in ns:
+        erros.append(f'resumo rasgado: total={resumo["total"]} n={ns}')
+        return
+    k_max = canais['temperatura']['max'] / 2
+    if resumo['total'] and (canais['rpm']['max'] != k_max + 0.25 or canais['tensao']['min'] != -k_max):
+        erros.append(f'resumo rasgado: máximos não batem (k={k_max})')
+
+
+def conferir_serie(serie, erros):
+    tamanhos = {len(serie[c]) for c in ('ts', 'min', 'max', 'media', 'ultimo')}
+    if len(tamanhos) != 1:
+        erros.append(f'série rasgada: tamanhos {tamanhos}')
+        return
+    mi, ma, me = (np.array(serie[c]) for c in ('min', 'max', 'media'))
+    if np.any(mi > me + 1e-9) or np.any(me > ma + 1e-9):
+        erros.append('série rasgada: média fora de [mín, máx]')
+
+
+def conferir_estado(estado, erros):
+    if estado['ultima_linha'] == '':
+        return
+    k = int(estado['ultima_linha'][2:])
+    if (estado['rpm'], estado['temperatura'], estado['tensao']) != tuple(amostra(k)[:3]):
+        erros.append(f'estado rasgado em k={k}')
+
+
+def leitor(pipeline, parar, erros, contagem, ingenuo, semente):
+    rnd = random.Random(semente)
+    leituras = 0
+    while not parar.is_set():
+        historico = pipeline.historico   # pode ter sido trocado (--redimensionar)
+        n = rnd.choice((60, 600, CAPACIDADE))
+        if ingenuo:
+            total = historico.total
+            colunas = {k: v.copy() for k, v in historico.ultimos(n).items()}
+        else:
+            total, colunas = historico.instantaneo(n)
+        conferir_janela(total, colunas, erros)
+
+        if not ingenuo:
+            conferir_resumo(pipeline.resumo(), erros)
+            conferir_serie(pipeline.serie('rpm', rnd.choice((60, 3600))), erros)
+        conferir_estado(pipeline.estado, erros)
+        leituras += 1
+    contagem['leituras'] += leituras
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--leitores', type=int, default=8)
+    ap.add_argument('--segundos', type=float, default=5)
+    ap.add_argument('--taxa', type=float, default=0, help='amostras/s do escritor (0 = sem limite)')
+    ap.add_argument('--ingenuo', action='store_true')
+    ap.add_argument('--redimensionar', action='store_true')
+    args = ap.parse_args()
+
+    pipeline = PipelineAquisicao(CAPACIDADE, 1e12)
+    parar = threading.Event()
+    erros = []
+    contagem = {'leituras': 0, 'trocas': 0}
+
+    threads = [threading.Thread(target=escritor,
+                                args=(pipeline, parar, contagem, args.taxa, args.redimensionar))]
+    threads += [threading.Thread(target=leitor,
+                                 args=(pipeline, parar, erros, contagem, args.ingenuo, i))
+                for i in range(args.leitores)]
+    for th in threads:
+        th.start()
+    time.sleep(args.segundos)
+    parar.set()
+    for th in threads:
+        th.join()
+
+    p50, p99, p999 = contagem['escrita_us']
+    print(f"{args.leitores} leitores, {args.segundos:.0f} s{' (ingênuo)' if args.ingenuo else ''}: "
+          f"{contagem['escritas']:,} escritas, {contagem['leituras']:,} leituras, "
+          f"{pipeline.releituras} releituras, {contagem['trocas']} trocas de capacidade")
+    print(f'escrita: p50={p50:.1f} us  p99={p99:.1f} us  p99.9={p999:.1f} us')
+    if erros:
+        print(f'{len(erros)} ERROS, ex.: {erros[:3]}')
+        raise SystemExit(1)
+    print('nenhuma amostra rasgada')
+
+
+if __name__ == '__main__':
+    main()
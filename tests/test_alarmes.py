@@ -0,0 +1,66 @@
+"""Regras e motor de alarmes."""
+import csv
+
+from alarmes import MotorAlarmes, RegraAlarme, regras_padrao
+
+
+def test_taxa_dispara_com_amostras_a_1_hz():
+    regra = RegraAlarme('taxa', 'rpm', 'taxa', 20.0, histerese=4.0, janela=1.0)
+    eventos = [regra.avaliar(float(t), v) for t, v in enumerate([10.0, 12.0, 40.0, 41.0, 41.5])]
+    assert eventos == [None, None, 'ativou', 'normalizou', None]
+
+
+def test_taxa_usa_janela_com_amostras_rapidas():
+    regra = RegraAlarme('taxa', 'rpm', 'taxa', 20.0, janela=1.0)
+    # 10 Hz, rampa de 15 RPM/s: nunca passa de 20/s
+    assert all(regra.avaliar(k / 10, 1.5 * k) is None for k in range(50))
+    assert 14.9 < regra._medida(5.0, 75.0) < 15.1
+
+
+def test_regra_padrao_de_taxa_dispara_a_1_hz():
+    motor = MotorAlarmes(regras_padrao(1e9, taxa_rpm=20.0))
+    for t, rpm in enumerate([10.0, 10.0, 60.0]):
+        motor.avaliar(float(t), (rpm, 25.0, 12.0, 1.0))
+    assert [r.nome for r in motor.ativos] == ['rpm_variacao']
+
+
+def test_histerese_e_amostras_seguidas():
+    regra = RegraAlarme('t', 'temperatura', 'acima', 80.0, histerese=2.0, amostras=3)
+    valores = [81.0, 81.0, 79.0, 81.0, 81.0, 81.0, 79.5, 77.9]
+    eventos = [regra.avaliar(float(t), v) for t, v in enumerate(valores)]
+    assert eventos == [None] * 5 + ['ativou', None, 'normalizou']
+
+
+def test_comando_sai_na_ativacao():
+    enviados = []
+    motor = MotorAlarmes([RegraAlarme('alto', 'rpm', 'acima', 10.0, comando='d8')],
+                         enviar=enviados.append)
+    for t, rpm in enumerate([5.0, 15.0, 15.0, 5.0, 15.0]):
+        motor.avaliar(float(t), (rpm, 0.0, 0.0, 0.0))
+    assert enviados == ['d8', 'd8']
+    assert [e['evento'] for e in motor.log] == ['ativou', 'normalizou', 'ativou']
+    assert motor.log[0]['comando'] == 'd8' and motor.log[1]['comando'] is None
+
+
+def test_eventos_gravados_fora_da_aquisicao(tmp_path):
+    arquivo = tmp_path / 'alarmes.csv'
+    motor = MotorAlarmes([RegraAlarme('alto', 'rpm', 'acima', 10.0)], arquivo=str(arquivo))
+    for t, rpm in enumerate([5.0, 15.0, 5.0, 15.0]):
+        motor.avaliar(float(t), (rpm, 0.0, 0.0, 0.0))
+    motor.parar()
+    with open(arquivo, newline='') as f:
+        linhas = list(csv.reader(f))
+    assert linhas[0][0] == 'timestamp'
+    assert [l[3] for l in linhas[1:]] == ['ativou', 'normalizou', 'ativou']
+
+
+def test_falha_de_envio_e_de_gravacao_ficam_no_motor(tmp_path):
+    def porta_fechada(comando):
+        raise OSError('serial não conectada')
+
+    regra = RegraAlarme('alto', 'rpm', 'acima', 10.0, comando='d8')
+    motor = MotorAlarmes([regra], enviar=porta_fechada, arquivo=str(tmp_path / 'nao' / 'existe.csv'))
+    motor.avaliar(0.0, (15.0, 0.0, 0.0, 0.0))
+    motor.parar()
+    assert motor.falhas_envio == 1 and motor.nao_gravados == 1
+    assert motor.log[-1]['comando'] is None and 'serial não conectada' in motor.log[-1]['erro']
@@ -0,0 +1,81 @@
+"""Análises vetorizadas: janelas móveis, pulsos, energia, espectro e regime."""
+import numpy as np
+
+from analise import (analisar, energia, inicios_janela, ondulacao, regime_permanente,
+                     rpm_de_pulsos, serie_movel)
+
+
+def _sessao(n, dt=0.1, semente=0):
+    rng = np.random.default_rng(semente)
+    ts = 1.7e9 + np.cumsum(rng.uniform(0.5 * dt, 1.5 * dt, n))
+    return ts, 30.0 + rng.normal(0, 1.0, n)
+
+
+def test_serie_movel_igual_a_forca_bruta():
+    ts, x = _sessao(500)
+    x[::17] = np.nan
+    x[200:260] = np.nan   # janelas inteiras sem dado válido
+    serie = serie_movel(ts, x, 2.0, pontos=120)
+    assert len(serie['ts']) == 120
+    for k, t in enumerate(serie['ts']):
+        janela = x[(ts > t - 2.0) & (ts <= t)]
+        janela = janela[~np.isnan(janela)]
+        if not len(janela):
+            assert serie['media'][k] is None and serie['min'][k] is None
+            continue
+        assert np.isclose(serie['media'][k], janela.mean())
+        assert serie['min'][k] == janela.min() and serie['max'][k] == janela.max()
+        if len(janela) > 1:
+            assert np.isclose(serie['desvio'][k], janela.std(ddof=1))
+    assert serie_movel(ts[:0], x[:0])['ts'] == []
+
+
+def test_rpm_de_pulsos():
+    ts = np.arange(0.0, 10.0, 0.5)
+    pulsos = np.full(len(ts), 1.5)   # 3 pulsos/s = 30 RPM a 6 pulsos por volta
+    rpm = rpm_de_pulsos(ts, pulsos, 6, 4.0)
+    assert np.isnan(rpm[:8]).all()   # janela começa no primeiro registro: sem início conhecido
+    np.testing.assert_allclose(rpm[8:], 30.0)
+    pulsos[5:] = np.nan
+    rpm = rpm_de_pulsos(ts, pulsos, 6, 4.0)
+    assert not np.isnan(rpm[9]) and np.isnan(rpm[-1])   # só pulsos perdidos na janela = NaN
+    assert np.isclose(inicios_janela(ts, 4.0)[-1], 12)
+
+
+def test_energia_nao_soma_lacunas_nem_nan():
+    ts = np.array([0.0, 1.0, 2.0, 100.0, 101.0, 102.0])
+    p = np.array([10.0, 10.0, 10.0, 10.0, np.nan, 10.0])
+    np.testing.assert_allclose(energia(ts, p), [0, 10, 20, 20, 20, 20])
+    assert len(energia(ts[:1], p[:1])) == 1
+
+
+def test_ondulacao_dominante_e_sinal_constante():
+    ts = np.arange(0.0, 600.0, 0.1)
+    x = 40.0 + 0.5 * np.sin(2 * np.pi * 0.2 * ts)
+    o = ondulacao(ts, x)
+    assert abs(o['frequencia'] - 0.2) < 0.005
+    assert abs(o['amplitude'] - 0.5) < 0.05
+    assert ondulacao(ts, np.full(len(ts), 40.0)) is None
+    assert ondulacao(ts[:10], x[:10]) is None
+
+
+def test_regime_em_patamares_e_lacuna_encerra_trecho():
+    ts = np.arange(0.0, 300.0, 0.1)
+    x = np.where(ts < 100, 20.0, np.where(ts < 200, 20.0 + (ts - 100), 60.0))
+    x += np.random.default_rng(0).normal(0, 0.05, len(ts))
+    regimes = regime_permanente(ts, x)
+    assert len(regimes) == 2
+    (a0, a1, m0), (b0, b1, m1) = regimes
+    assert a0 == 0.0 and 90 < a1 <= 101 and abs(m0 - 20) < 0.1
+    assert 200 <= b0 < 215 and b1 == ts[-1] and abs(m1 - 60) < 0.1
+
+    ts_lacuna = np.where(ts < 150, ts, ts + 60.0)   # 60 s sem dados no meio de um patamar
+    regimes = regime_permanente(ts_lacuna, np.full(len(ts), 20.0))
+    assert [(r[0], r[1]) for r in regimes] == [(0.0, ts[1499]), (ts_lacuna[1500], ts_lacuna[-1])]
+
+
+def test_analisar_sessao_curta():
+    c = {nome: np.array([1.0, 2.0]) for nome in ('ts', 'rpm', 'tensao', 'corrente')}
+    a = analisar(c)
+    assert a['n'] == 2 and a['regimes'] == [] and a['ondulacao'] is None
+    assert np.isclose(a['energia_j'], 2.5)
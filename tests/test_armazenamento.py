@@ -0,0 +1,87 @@
+"""Partições por hora: consultas, ordem de ts e importação do CSV antigo."""
+import numpy as np
+
+from armazenamento import _TAM_REGISTRO, ArmazenamentoParticionado, _particao
+
+T0 = 1_700_000_000.0 - 1_700_000_000.0 % 3600   # início de uma hora UTC
+
+
+def _linhas(ts):
+    return [(t, t + 0.5, 2 * t, -t, 1.0) for t in ts]
+
+
+def test_consulta_recorta_entre_particoes(tmp_path):
+    a = ArmazenamentoParticionado(str(tmp_path))
+    ts = T0 + np.arange(0, 3 * 3600, 10.0)
+    a.adicionar_lote(_linhas(ts))
+    assert len(a.particoes()) == 3
+
+    r = a.consultar(T0 + 3000, T0 + 7300)
+    assert r['ts'][0] == T0 + 3000 and r['ts'][-1] == T0 + 7290
+    np.testing.assert_array_equal(r['rpm'], r['ts'] + 0.5)
+    assert a.contar(T0, T0 + 3 * 3600) == len(ts)
+    assert a.intervalo() == (ts[0], ts[-1])
+
+
+def test_pulsos_ausentes_sao_nan(tmp_path):
+    a = ArmazenamentoParticionado(str(tmp_path))
+    a.adicionar_lote(_linhas([T0 + 1]))
+    r = a.consultar(T0, T0 + 10, ('rpm', 'pulsos'))
+    assert set(r) == {'ts', 'rpm', 'pulsos'} and np.isnan(r['pulsos'][0])
+
+
+def test_lote_fora_de_ordem_e_relogio_voltando(tmp_path):
+    a = ArmazenamentoParticionado(str(tmp_path))
+    a.adicionar_lote(_linhas([T0 + 10, T0 + 30, T0 + 20]))
+    a.adicionar_lote(_linhas([T0 + 15, T0 + 40]))   # relógio voltou
+    ts = a.consultar(T0, T0 + 3600)['ts']
+    np.testing.assert_array_equal(ts, T0 + np.array([10, 15, 20, 30, 40]))
+    assert a.contar(T0 + 15, T0 + 25) == 2
+
+
+def test_registro_parcial_descartado_antes_do_append(tmp_path):
+    a = ArmazenamentoParticionado(str(tmp_path))
+    a.adicionar_lote(_linhas([T0 + 1]))
+    with open(a._arquivo(_particao(T0)), 'ab') as f:
+        f.write(b'\0' * (_TAM_REGISTRO // 2))   # queda no meio de uma escrita
+    a.adicionar_lote(_linhas([T0 + 2]))
+    np.testing.assert_array_equal(a.consultar(T0, T0 + 10)['ts'], [T0 + 1, T0 + 2])
+
+
+def test_importar_csv_nos_dois_formatos(tmp_path):
+    from datetime import datetime
+    a = ArmazenamentoParticionado(str(tmp_path / 'dados'))
+    csv = tmp_path / 'historico.csv'
+    linhas = ['timestamp,rpm,temperatura,tensao,corrente']
+    for k in range(3):
+        data = datetime.fromtimestamp(T0 + k).strftime('%Y-%m-%d %H:%M:%S')
+        linhas.append(f'{data},{k},1,2,3')
+    linhas.append('2023-01-01 00:00:00,13,32.5')   # formato antigo: timestamp,pulsos,rpm
+    linhas.append('2023-01-01 00:00:01,corrompida')
+    csv.write_text('\n'.join(linhas) + '\n')
+
+    assert a.importar_csv(str(csv)) == 4
+    r = a.consultar(0, T0 + 3600, ('rpm', 'temperatura', 'pulsos'))
+    np.testing.assert_array_equal(r['rpm'], [32.5, 0, 1, 2])
+    assert r['pulsos'][0] == 13 and np.isnan(r['temperatura'][0]) and np.isnan(r['pulsos'][1])
+    assert a.importar_csv(str(csv)) == 0   # já importado
+
+
+def test_importar_csv_sem_duplicar_a_sessao(tmp_path):
+    from datetime import datetime
+    a = ArmazenamentoParticionado(str(tmp_path / 'dados'))
+    csv = tmp_path / 'historico.csv'
+    linhas = ['timestamp,rpm,temperatura,tensao,corrente']
+    for k in range(10):
+        data = datetime.fromtimestamp(T0 + k).strftime('%Y-%m-%d %H:%M:%S')
+        linhas.append(f'{data},{k},1,2,3')
+    linhas.append('2023-01-01 00:00:00,13,32.5')   # formato antigo: timestamp,pulsos,rpm
+    csv.write_text('\n'.join(linhas) + '\n')
+
+    # a sessão atual começou em T0 + 6 e já gravou as suas linhas
+    a.adicionar_lote(_linhas([T0 + 6, T0 + 7]))
+    assert a.importar_csv(str(csv), ate=T0 + 6) == 7
+    r = a.consultar(0, T0 + 3600, ('rpm', 'pulsos'))
+    assert len(r['ts']) == 9
+    assert r['rpm'][0] == 32.5 and r['pulsos'][0] == 13
+    assert a.importar_csv(str(csv), ate=T0 + 6) == 0   # já importado
@@ -0,0 +1,145 @@
+"""DifusorPainel: entrega exatamente uma vez, erros de assinante e ticks só de enlace."""
+import json
+import random
+
+import difusor
+from difusor import DifusorPainel
+from parser_telemetria import Amostra
+from pipeline import PipelineAquisicao
+
+
+class EnlaceFalso:
+    def __init__(self):
+        self.queda = None
+        self.estado = 'conectado'
+
+    def descricao(self):
+        return self.estado
+
+
+def _encher(pipeline, n, inicio=0):
+    for k in range(inicio, inicio + n):
+        pipeline.armazenar('', Amostra(float(k), 25.0, 12.0, 1.0, ''), 1.7e9 + k)
+
+
+def test_mesma_fotografia_para_todos_os_assinantes():
+    pipeline = PipelineAquisicao(100, 1e12)
+    d = DifusorPainel(pipeline, 60)
+    fotos = {'a': [], 'b': []}
+    d.assinar('a', fotos['a'].append)
+    d.assinar('b', fotos['b'].append)
+    _encher(pipeline, 5)
+    d.tick()
+    assert len(fotos['a']) == 1 and fotos['a'][0] is fotos['b'][0]
+    assert json.loads(fotos['a'][0]['json']['rpm'])['y'] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_tick_so_leva_as_amostras_novas():
+    pipeline = PipelineAquisicao(100, 1e12)
+    d = DifusorPainel(pipeline, 3)
+    fotos = []
+    d.assinar('c', fotos.append)
+    _encher(pipeline, 10)
+    d.tick()
+    assert fotos[-1]['n'] == 3 and fotos[-1]['total'] == 10   # primeira vez: a janela
+    _encher(pipeline, 2, inicio=10)
+    d.tick()
+    assert fotos[-1]['pontos']['rpm'] == [10.0, 11.0]
+    d.tick()
+    assert len(fotos) == 2   # nada novo: ninguém recebe
+
+
+def test_recorte_para_cliente_que_entrou_no_meio():
+    pipeline = PipelineAquisicao(100, 1e12)
+    d = DifusorPainel(pipeline, 60)
+    _encher(pipeline, 4)
+    foto = d.fotografar()
+    assert json.loads(DifusorPainel.recorte(foto, 1)['temperatura'])['y'] == [25.0]
+
+
+def test_assinante_com_erro_continua_assinando():
+    pipeline = PipelineAquisicao(100, 1e12)
+    d = DifusorPainel(pipeline, 60)
+    recebidas = []
+
+    def instavel(foto):
+        recebidas.append(foto['total'])
+        if len(recebidas) == 1:
+            raise RuntimeError('falha passageira')
+
+    d.assinar('c', instavel)
+    for k in range(3):
+        pipeline.armazenar('', Amostra(float(k), 0.0, 0.0, 0.0, ''), float(k))
+        d.tick()
+    assert recebidas == [1, 2, 3]
+    assert len(d) == 1 and d.falhas == 1
+
+
+def test_assinante_sempre_com_erro_e_removido():
+    pipeline = PipelineAquisicao(100, 1e12)
+    d = DifusorPainel(pipeline, 60)
+
+    def quebrado(foto):
+        raise RuntimeError('cliente morto')
+
+    d.assinar('c', quebrado)
+    for k in range(difusor.FALHAS_PARA_CANCELAR):
+        pipeline.armazenar('', Amostra(float(k), 0.0, 0.0, 0.0, ''), float(k))
+        d.tick()
+    assert len(d) == 0
+
+
+def test_tick_so_de_enlace_chega_sem_amostras():
+    pipeline = PipelineAquisicao(100, 1e12)
+    enlace = EnlaceFalso()
+    d = DifusorPainel(pipeline, 60, enlace=enlace)
+    fotos = []
+    d.assinar('c', fotos.append)
+    enlace.estado = 'reconectando'
+    d.tick()
+    assert len(fotos) == 1
+    assert fotos[0]['n'] == 0 and fotos[0]['sem_dados'] and 'atual' not in fotos[0]
+
+
+def test_cada_amostra_chega_uma_vez_a_cada_assinante():
+    """Páginas abertas no meio do tick (recorte) e que conectam ticks depois (releitura)."""
+    pipeline = PipelineAquisicao(1000, 1e12)
+    d = DifusorPainel(pipeline, 60)
+    rng = random.Random(0)
+    clientes = []      # (primeira amostra esperada, cursor, rpm recebidos)
+    conectando = []    # (ticks até conectar, chave, callback)
+    k = 0
+
+    def cliente(chave):
+        # como o dashboard: janela inicial nas options, cursor no total visto
+        cursor = {'total': pipeline.historico.instantaneo(60)[0]}
+        recebidos = []
+        clientes.append((cursor['total'], cursor, recebidos))
+
+        def atualizar(foto):
+            if not foto['n']:
+                return
+            dados = d.dados_para(cursor, foto)
+            if dados is not None:
+                recebidos.extend(json.loads(dados['rpm'])['y'])
+        return atualizar
+
+    for passo in range(300):
+        for _ in range(rng.randint(0, 6)):
+            pipeline.armazenar('', Amostra(float(k), 0.0, 0.0, 0.0, ''), float(k))
+            k += 1
+        if passo % 7 == 0:
+            conectando.append([rng.randint(0, 3), passo, cliente(passo)])
+        for c in conectando:
+            c[0] -= 1
+            if c[0] < 0:
+                d.assinar(c[1], c[2])
+        conectando = [c for c in conectando if c[0] >= 0]
+        if passo % 3 == 0:
+            d.tick()
+    d.tick()
+
+    assert len(clientes) == 43 and len(d) == 43
+    for inicio, cursor, recebidos in clientes:
+        assert cursor['total'] == k
+        assert recebidos == [float(i) for i in range(inicio, k)]
@@ -0,0 +1,63 @@
+"""Estatísticas da sessão: incremental e por colunas dão o mesmo resumo."""
+import numpy as np
+
+from estatisticas import EstatisticaCanal, EstatisticasSessao, estatisticas_de_colunas
+
+
+def _colunas():
+    ts = np.array([0.0, 1.0, 2.0, 3.0, 60.0, 61.0, 62.0])   # queda de 57 s depois de 3.0
+    rpm = np.array([10.0, 50.0, 50.0, 50.0, 50.0, 10.0, np.nan])
+    um = np.ones(len(ts))
+    return {'ts': ts, 'rpm': rpm, 'temperatura': um, 'tensao': um, 'corrente': um}
+
+
+def test_canal_igual_ao_numpy_e_ignora_nan():
+    x = np.random.default_rng(0).normal(1e4, 0.5, 1000)   # média grande, desvio pequeno
+    x[::50] = np.nan
+    canal = EstatisticaCanal()
+    for k, v in enumerate(x):
+        canal.adicionar(float(v), float(k))
+    validos = x[~np.isnan(x)]
+    r = canal.resumo()
+    assert r['n'] == len(validos)
+    assert np.isclose(r['media'], validos.mean()) and np.isclose(r['desvio'], validos.std(ddof=1))
+    assert r['min'] == validos.min() and r['max'] == validos.max()
+    assert r['ts_max'] == float(np.nanargmax(x))
+
+
+def test_tempo_acima_conta_pelo_estado_da_amostra_que_abre_o_intervalo():
+    sessao = EstatisticasSessao(40.0)
+    for ts, rpm in enumerate([10.0, 50.0, 50.0, 10.0, 10.0]):
+        sessao.adicionar(float(ts), rpm, 1.0, 1.0, 1.0)
+    r = sessao.resumo()
+    assert r['total'] == 5 and r['amostras_acima'] == 2
+    assert r['duracao'] == 4.0 and r['tempo_acima'] == 2.0
+
+
+def test_resumo_sem_amostras():
+    r = EstatisticasSessao(40.0).resumo()
+    assert r['total'] == 0 and r['canais']['rpm']['min'] == r['canais']['rpm']['max'] == 0.0
+
+
+def test_lacuna_fica_fora_da_duracao_e_do_tempo_acima():
+    c = _colunas()
+    sessao = EstatisticasSessao(40.0)
+    for k in range(len(c['ts'])):
+        sessao.adicionar(*(c[nome][k] for nome in ('ts', 'rpm', 'temperatura', 'tensao', 'corrente')))
+    incremental = sessao.resumo()
+    de_uma_vez = estatisticas_de_colunas(c, 40.0)
+
+    for r in (incremental, de_uma_vez):
+        assert r['duracao'] == 5.0 and r['tempo_acima'] == 3.0
+        assert r['amostras_acima'] == 4 and r['total'] == 7
+    for nome in ('media', 'desvio', 'min', 'max'):
+        assert np.isclose(incremental['canais']['rpm'][nome], de_uma_vez['canais']['rpm'][nome])
+    assert incremental['canais']['rpm']['n'] == 6 and incremental['canais']['rpm']['ts_max'] == 1.0
+
+
+def test_sem_lacunas_duracao_e_a_sessao_inteira():
+    ts = np.arange(0.0, 100.0, 0.5)
+    um = np.ones(len(ts))
+    r = estatisticas_de_colunas({'ts': ts, 'rpm': 100 * um, 'temperatura': um, 'tensao': um,
+                                 'corrente': um}, 40.0)
+    assert r['duracao'] == r['tempo_acima'] == ts[-1] - ts[0]
@@ -0,0 +1,85 @@
+"""GravadorCSV: gravação em lotes e recuperação de erros de disco."""
+import csv
+import time
+
+from gravador_csv import GravadorCSV
+
+
+def _esperar(condicao, prazo=5.0):
+    fim = time.monotonic() + prazo
+    while not condicao() and time.monotonic() < fim:
+        time.sleep(0.01)
+    return condicao()
+
+
+def _linhas(caminho):
+    with open(caminho, newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_grava_tudo_ao_parar(tmp_path):
+    caminho = tmp_path / 'h.csv'
+    g = GravadorCSV(str(caminho), tamanho_lote=7, intervalo_flush=10.0)
+    g.iniciar()
+    for k in range(100):
+        g.enviar((1.7e9 + k, k, 0.0, 0.0, 0.0))
+    g.parar()
+    linhas = _linhas(caminho)
+    assert linhas[0][0] == 'timestamp' and len(linhas) == 101
+    assert g.gravadas == 100 and g.descartadas == 0 and g.erro is None
+
+
+def test_lote_incompleto_sai_no_intervalo_de_flush(tmp_path):
+    caminho = tmp_path / 'h.csv'
+    g = GravadorCSV(str(caminho), tamanho_lote=1000, intervalo_flush=0.05)
+    g.iniciar()
+    for k in range(3):
+        g.enviar((1.7e9 + k, k, 0.0, 0.0, 0.0))
+    assert _esperar(lambda: g.gravadas == 3)
+    assert len(_linhas(caminho)) == 4   # já no disco, antes do parar()
+    g.parar()
+
+
+def test_fila_cheia_descarta_sem_bloquear(tmp_path):
+    g = GravadorCSV(str(tmp_path / 'h.csv'), tamanho_fila=5)   # thread ainda parada
+    for k in range(8):
+        g.enviar((1.7e9 + k, k, 0.0, 0.0, 0.0))
+    assert g.descartadas == 3
+
+
+def test_erro_de_escrita_nao_mata_a_thread(tmp_path, monkeypatch):
+    caminho = tmp_path / 'h.csv'
+    g = GravadorCSV(str(caminho), tamanho_lote=1, intervalo_flush=0.05)
+    falhar = {'sim': True}
+    abrir = g._abrir
+
+    def abrir_com_disco_cheio():
+        if falhar['sim']:
+            raise OSError(28, 'No space left on device')
+        return abrir()
+
+    monkeypatch.setattr(g, '_abrir', abrir_com_disco_cheio)
+    g.iniciar()
+    g.enviar((1.7e9, 1.0, 0.0, 0.0, 0.0))
+    assert _esperar(lambda: g.erros >= 2)
+    assert g.erro is not None and g._thread.is_alive()
+
+    falhar['sim'] = False
+    g.enviar((1.7e9 + 1, 2.0, 0.0, 0.0, 0.0))
+    assert _esperar(lambda: g.gravadas == 2)
+    assert g.erro is None
+    g.parar()
+    assert [l[1] for l in _linhas(caminho)[1:]] == ['1.0', '2.0']
+
+
+def test_arquivo_apagado_e_recriado(tmp_path):
+    caminho = tmp_path / 'h.csv'
+    g = GravadorCSV(str(caminho), tamanho_lote=1, intervalo_flush=0.05)
+    g.iniciar()
+    g.enviar((1.7e9, 1.0, 0.0, 0.0, 0.0))
+    assert _esperar(lambda: g.gravadas == 1)
+    caminho.unlink()
+    g.enviar((1.7e9 + 1, 2.0, 0.0, 0.0, 0.0))
+    g.parar()
+    linhas = _linhas(caminho)
+    assert linhas[0][0] == 'timestamp' and [l[1] for l in linhas[1:]] == ['2.0']
@@ -0,0 +1,74 @@
+"""Buffer circular: ordem, capacidade cheia, cursores e redimensionamento."""
+import numpy as np
+import pytest
+
+from historico import HistoricoCircular
+
+
+def _encher(h, n, inicio=0):
+    for k in range(inicio, inicio + n):
+        h.adicionar(float(k), k + 0.5, 2.0 * k, -k, 1.0)
+
+
+def test_volta_no_buffer_mantem_ordem():
+    h = HistoricoCircular(5)
+    _encher(h, 3)
+    np.testing.assert_array_equal(h.copia()['ts'], [0, 1, 2])
+    _encher(h, 9, inicio=3)
+    assert len(h) == 5 and h.total == 12
+    np.testing.assert_array_equal(h.ultimos()['ts'], [7, 8, 9, 10, 11])
+    np.testing.assert_array_equal(h.ultimos(2)['rpm'], [10.5, 11.5])
+
+
+def test_ultimos_sem_copia_e_copia_independente():
+    h = HistoricoCircular(4)
+    _encher(h, 6)
+    view = h.ultimos(3)['rpm']
+    assert not view.flags['OWNDATA'] and view.flags['C_CONTIGUOUS']
+    copia = h.copia()
+    antes = copia['ts'].copy()
+    _encher(h, 2, inicio=6)
+    np.testing.assert_array_equal(copia['ts'], antes)
+    assert antes[-1] == 5
+    np.testing.assert_array_equal(h.ultimos(0)['ts'], [])
+
+
+def test_capacidade_invalida():
+    with pytest.raises(ValueError):
+        HistoricoCircular(0)
+
+
+def test_instantaneo_le_a_capacidade_inteira():
+    h = HistoricoCircular(5)
+    _encher(h, 17)
+    total, colunas = h.instantaneo()
+    assert total == 17
+    np.testing.assert_array_equal(colunas['ts'], [12, 13, 14, 15, 16])
+    np.testing.assert_array_equal(colunas['temperatura'], 2.0 * colunas['ts'])
+
+
+def test_instantaneo_desde_cursor():
+    h = HistoricoCircular(8)
+    _encher(h, 6)
+    cursor, _ = h.instantaneo()
+    _encher(h, 3, inicio=6)
+    total, colunas = h.instantaneo(desde=cursor)
+    assert total == 9
+    np.testing.assert_array_equal(colunas['ts'], [6, 7, 8])
+    assert len(h.instantaneo(desde=total)[1]['ts']) == 0
+    # cursor mais velho que a capacidade: só o que ainda está no buffer
+    _encher(h, 20, inicio=9)
+    np.testing.assert_array_equal(h.instantaneo(desde=cursor)[1]['ts'], np.arange(21, 29))
+
+
+def test_redimensionado_preserva_total_e_ultimas():
+    h = HistoricoCircular(6)
+    _encher(h, 10)
+    menor = h.redimensionado(3)
+    assert menor.total == 10 and len(menor) == 3
+    np.testing.assert_array_equal(menor.copia()['ts'], [7, 8, 9])
+    maior = h.redimensionado(20)
+    np.testing.assert_array_equal(maior.copia()['ts'], np.arange(4, 10))
+    _encher(maior, 2, inicio=10)
+    np.testing.assert_array_equal(maior.instantaneo(desde=10)[1]['ts'], [10, 11])
+    assert len(maior) == 8
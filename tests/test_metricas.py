@@ -0,0 +1,50 @@
+"""Registro de métricas: quantis, texto do Prometheus, séries reaproveitadas e obter()."""
+import math
+
+from metricas import PREFIXO, Histograma, RegistroMetricas
+
+
+def test_quantil_interpola_dentro_do_balde():
+    h = Histograma('x', '', limites=(1.0, 2.0, 4.0))
+    for _ in range(10):
+        h.observar(1.5)
+    assert h.n == 10 and math.isclose(h.quantil(0.5), 1.5)
+    h.observar(10.0)   # acima do último limite: balde +Inf
+    assert h.maximo == 10.0 and h.quantil(1.0) == 10.0
+
+
+def test_componente_recriado_continua_a_mesma_serie():
+    m = RegistroMetricas()
+    h = m.histograma('estagio_segundos', 'Estágio')
+    h.observar(0.001)
+    assert m.histograma('estagio_segundos', 'Estágio') is h
+    m.medidor('fila', 'Fila', lambda: 1)
+    m.medidor('fila', 'Fila', lambda: 2)   # medidor novo lê o componente novo
+    assert m.fotografia()['medidores']['fila']['valor'] == 2
+
+
+def test_texto_prometheus_e_fotografia():
+    m = RegistroMetricas()
+    m.medidor('linhas_total', 'Linhas', lambda: 7, 'counter')
+    m.medidor('quebrado', 'Leitura que falha', lambda: 1 / 0)
+    m.histograma('parse_segundos', 'Parse', limites=(0.001, 0.01)).observar(0.005)
+    texto = m.texto_prometheus()
+    assert f'# TYPE {PREFIXO}linhas_total counter\n{PREFIXO}linhas_total 7\n' in texto
+    assert f'{PREFIXO}parse_segundos_bucket{{le="0.01"}} 1' in texto
+    assert f'{PREFIXO}parse_segundos_count 1' in texto
+    foto = m.fotografia()
+    assert foto['contadores']['linhas_total']['valor'] == 7
+    assert math.isnan(foto['medidores']['quebrado']['valor'])
+    assert foto['histogramas']['parse_segundos']['n'] == 1
+
+
+def test_obter_nao_cria_metrica():
+    m = RegistroMetricas()
+    assert m.obter('reacao_segundos') is None
+    assert 'reacao_segundos' not in m.texto_prometheus()
+
+    h = m.histograma('reacao_segundos', 'Reação')
+    h.observar(0.002)
+    assert m.obter('reacao_segundos') is h and isinstance(h, Histograma)
+    assert m.histograma('reacao_segundos', '') is h   # componente recriado: mesma série
+    assert m.obter('reacao_segundos').n == 1
@@ -0,0 +1,87 @@
+"""Trabalhadores de bancada: memória compartilhada, configuração ao vivo e capacidade fixa."""
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from configuracao import CAMPOS
+from multibancada import (GerenciadorBancadas, HistoricoCompartilhado, spec_bancada,
+                          tamanho_compartilhado)
+
+
+def _cfg(**valores):
+    cfg = {nome: (0 if tipo is not str else '') for nome, (tipo, _) in CAMPOS.items()}
+    cfg.update(baudrate=115200, capacidade_historico=1000, max_linha=4096, limite_rpm=1e9,
+               limite_temperatura=1e9, taxa_max_rpm=1e9, fator_k=1.0, protocolo='texto',
+               lote_csv=50, intervalo_flush_csv=1.0)
+    cfg.update(valores)
+    return cfg
+
+
+def _esperar(condicao, prazo=20.0):
+    fim = time.monotonic() + prazo
+    while not condicao():
+        if time.monotonic() > fim:
+            pytest.fail('condição não atingida no prazo')
+        time.sleep(0.05)
+
+
+def test_trabalhador_publica_no_historico_compartilhado():
+    gerenciador = GerenciadorBancadas([spec_bancada('b1', 'sim://?taxa=200', _cfg())])
+    bancada = gerenciador['b1']
+    gerenciador.iniciar()
+    try:
+        _esperar(lambda: bancada.historico.total > 0)
+        _esperar(lambda: bancada.situacao()['enlace'] == 'conectado')
+        situacao = bancada.situacao()
+        assert situacao['ultima'] is not None and situacao['alertas'] == []
+        assert bancada.vivo
+    finally:
+        gerenciador.parar()
+
+
+def test_trabalhador_reiniciado_continua_do_total():
+    shm = SharedMemory(create=True, size=tamanho_compartilhado(8))
+    try:
+        shm.buf[:tamanho_compartilhado(8)] = bytes(tamanho_compartilhado(8))
+        primeiro = HistoricoCompartilhado(shm, 8)
+        for k in range(11):
+            primeiro.adicionar(float(k), float(k), 0.0, 0.0, 0.0)
+        segundo = HistoricoCompartilhado(shm, 8)
+        segundo.adicionar(11.0, 11.0, 0.0, 0.0, 0.0)
+        total, colunas = primeiro.instantaneo()
+        assert total == 12
+        np.testing.assert_array_equal(colunas['ts'][-3:], [9, 10, 11])
+        primeiro.liberar()
+        segundo.liberar()
+    finally:
+        shm.unlink()
+
+
+def test_configuracao_chega_ao_trabalhador():
+    gerenciador = GerenciadorBancadas([spec_bancada('b1', 'sim://?taxa=200', _cfg())])
+    bancada = gerenciador['b1']
+    gerenciador.iniciar()
+    try:
+        _esperar(lambda: bancada.historico.total > 0)
+        avisos = gerenciador.configurar(_cfg(fator_k=1000.0, capacidade_historico=5000))
+        assert avisos and 'capacidade' in avisos[0]
+        assert bancada.spec['capacidade'] == 1000 and bancada.spec['fator_k'] == 1000.0
+
+        def escalado():
+            _, ultima = bancada.historico.instantaneo(1)
+            return len(ultima['rpm']) and ultima['rpm'][-1] > 1000
+        _esperar(escalado)
+        assert bancada.vivo
+    finally:
+        gerenciador.parar()
+
+
+def test_historico_compartilhado_recusa_outra_capacidade():
+    gerenciador = GerenciadorBancadas([spec_bancada('b1', 'sim://', _cfg())])
+    try:
+        with pytest.raises(ValueError):
+            gerenciador['b1'].historico.redimensionado(2000)
+    finally:
+        gerenciador.parar()
@@ -0,0 +1,69 @@
+"""Publicação sem lock do PipelineAquisicao: um escritor, vários leitores."""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import stress_publicacao as stress
+from parser_telemetria import Amostra
+from pipeline import PipelineAquisicao
+
+
+@pytest.mark.parametrize('redimensionar', [False, True])
+def test_leitores_nunca_veem_amostra_rasgada(redimensionar):
+    pipeline = PipelineAquisicao(stress.CAPACIDADE, 1e12)
+    parar = threading.Event()
+    erros = []
+    contagem = {'leituras': 0, 'trocas': 0}
+    threads = [threading.Thread(target=stress.escritor,
+                                args=(pipeline, parar, contagem, 0, redimensionar))]
+    threads += [threading.Thread(target=stress.leitor,
+                                 args=(pipeline, parar, erros, contagem, False, i))
+                for i in range(4)]
+    for th in threads:
+        th.start()
+    time.sleep(1.5)
+    parar.set()
+    for th in threads:
+        th.join()
+
+    assert erros == []
+    assert contagem['escritas'] > stress.CAPACIDADE   # o buffer deu a volta
+    assert contagem['leituras'] > 0
+
+
+def test_verificacao_acusa_amostra_rasgada():
+    # k=2 com o rpm de outra amostra: a verificação do estresse tem que acusar
+    erros = []
+    colunas = {'ts': np.array([1.0, 2.0]), 'rpm': np.array([1.25, 99.0]),
+               'temperatura': np.array([2.0, 4.0]), 'tensao': np.array([-1.0, -2.0]),
+               'corrente': np.array([1.0, 2.0])}
+    stress.conferir_janela(3, colunas, erros)
+    assert erros and 'rasgada k=2' in erros[0]
+
+
+def test_erro_no_meio_da_escrita_nao_trava_leitores():
+    pipeline = PipelineAquisicao(16, 1e12)
+    pipeline.armazenar('ok', Amostra(1.0, 2.0, 3.0, 4.0, ''), 1.0)
+
+    def falha(*_):
+        raise RuntimeError('falha no meio da amostra')
+
+    pipeline.rollups.adicionar = falha
+    with pytest.raises(RuntimeError):
+        pipeline.armazenar('ruim', Amostra(5.0, 6.0, 7.0, 8.0, ''), 2.0)
+    assert pipeline._seq % 2 == 0
+
+    resultado = []
+    leitor = threading.Thread(target=lambda: resultado.append(pipeline.resumo()), daemon=True)
+    leitor.start()
+    leitor.join(timeout=2)
+    assert not leitor.is_alive()
+    assert resultado[0]['total'] == 2
+
+
+def test_releituras_somam_todas_as_threads():
+    pipeline = PipelineAquisicao(16, 1e12)
+    pipeline._releituras.update({1: 3, 2: 4})
+    assert pipeline.releituras == 7
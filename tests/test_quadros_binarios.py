@@ -0,0 +1,100 @@
+"""Enlace binário: CRC, COBS, quadros corrompidos e numeração."""
+import random
+
+import numpy as np
+import pytest
+
+from quadros_binarios import (MAX_QUADRO, MIN_LOTE, DecodificadorBinario, cobs_codificar,
+                              cobs_decodificar, codificar_mensagem, codificar_quadro, crc16,
+                              crc16_lote)
+
+
+def _fluxo(seqs):
+    return b''.join(codificar_quadro(s, s * 1.5, 25.0, 12.0, -0.5) for s in seqs)
+
+
+def _em_pedacos(dec, dados, rng):
+    quadros, mensagens = [], []
+    i = 0
+    while i < len(dados):
+        n = rng.randint(1, 64)
+        q, m = dec.receber(dados[i:i + n])
+        quadros.append(q)
+        mensagens += m
+        i += n
+    return np.concatenate(quadros), mensagens
+
+
+def test_crc16_valor_de_referencia_e_lote():
+    assert crc16(b'123456789') == 0x29B1
+    linhas = np.random.default_rng(0).integers(0, 256, (50, 18), dtype=np.uint8)
+    assert crc16_lote(linhas).tolist() == [crc16(l.tobytes()) for l in linhas]
+
+
+def test_cobs_ida_e_volta():
+    rng = random.Random(0)
+    for dados in [b'', b'\0', b'\0\0', b'abc', bytes(253)] + \
+                 [bytes(rng.choice((0, 0, 1, 7, 255)) for _ in range(rng.randint(1, 253)))
+                  for _ in range(200)]:
+        codificado = cobs_codificar(dados)
+        assert 0 not in codificado
+        assert cobs_decodificar(codificado) == dados
+    assert cobs_decodificar(b'\x05ab') is None   # código passa do fim
+
+
+@pytest.mark.parametrize('n', [5, MIN_LOTE * 4])   # um a um e em lote
+def test_quadros_em_pedacos_arbitrarios(n):
+    dec = DecodificadorBinario()
+    quadros, mensagens = _em_pedacos(dec, _fluxo(range(n)), random.Random(n))
+    assert mensagens == []
+    assert quadros['seq'].tolist() == list(range(n))
+    np.testing.assert_array_equal(quadros['rpm'], np.arange(n, dtype=np.float32) * 1.5)
+    assert quadros['corrente'][0] == np.float32(-0.5)
+    assert dec.quadros == n and dec.corrompidos == dec.perdidos == 0
+
+
+@pytest.mark.parametrize('n', [10, MIN_LOTE * 4])
+def test_quadros_corrompidos_sao_descartados_e_contados(n):
+    fluxo = bytearray(_fluxo(range(n)))
+    tamanho = len(codificar_quadro(0, 0, 0, 0, 0))
+    estragados = [1, 4, n - 2]
+    for k in estragados:
+        i = k * tamanho + 5
+        fluxo[i] = fluxo[i] % 255 + 1   # byte trocado, sem virar delimitador: o CRC não confere
+    dec = DecodificadorBinario()
+    quadros, _ = dec.receber(bytes(fluxo))
+    assert quadros['seq'].tolist() == [s for s in range(n) if s not in estragados]
+    assert dec.corrompidos == len(estragados)
+    assert dec.perdidos == len(estragados)   # a numeração acusa os mesmos buracos
+
+
+def test_quadro_truncado_e_lixo_sem_delimitador():
+    dec = DecodificadorBinario()
+    inteiro = codificar_quadro(1, 1.0, 1.0, 1.0, 1.0)
+    quadros, _ = dec.receber(inteiro[:8] + b'\0' + inteiro)   # metade de um quadro antes do delimitador
+    assert quadros['seq'].tolist() == [1] and dec.corrompidos == 1
+
+    dec.receber(b'\x01' * (MAX_QUADRO + 1))
+    assert dec.corrompidos == 2 and dec.invalidos_seguidos == 1
+    quadros, _ = dec.receber(b'\0' + codificar_quadro(2, 2.0, 2.0, 2.0, 2.0))
+    assert quadros['seq'].tolist() == [2] and dec.invalidos_seguidos == 0
+
+
+def test_mensagens_do_firmware():
+    dec = DecodificadorBinario()
+    dados = codificar_mensagem('ACK START') + _fluxo([0]) + codificar_mensagem('x' * 18)
+    quadros, mensagens = dec.receber(dados)
+    assert mensagens == ['ACK START', 'x' * 18]   # 18 bytes: completada com espaço, não é quadro
+    assert len(quadros) == 1 and dec.mensagens == 2
+
+
+def test_numeracao_volta_e_reinicio():
+    dec = DecodificadorBinario()
+    dec.receber(_fluxo([65533, 65534, 65535, 0, 2]))
+    assert dec.perdidos == 1 and dec.reinicios == 0
+    dec.receber(_fluxo([2, 3]))
+    assert dec.repetidos == 1
+    dec.receber(_fluxo([10, 11]))   # entre blocos: faltaram 4..9
+    assert dec.perdidos == 7
+    dec.receber(_fluxo([40000, 0]))   # dispositivo reiniciou
+    assert dec.reinicios == 1
@@ -0,0 +1,230 @@
+import abc
+import os
+import select
+import struct
+import time
+from urllib.parse import parse_qs, urlparse
+
+import serial
+
+from simulador import BAUD_LINHA, GeradorQuadros, intervalo_quadro
+
+try:
+    import fcntl
+    import termios
+    import tty
+except ImportError:  # Windows: sem pty
+    fcntl = termios = tty = None
+
+# ==========================
+# CAMADA DE TRANSPORTE
+# ==========================
+# Todos os transportes expõem o subconjunto do serial.Serial usado pelo
+# supervisório: read(n) com timeout, in_waiting, write, flush, close, is_open.
+#
+#   'COM2', '/dev/ttyUSB0'         porta serial real
+#   'tcp://host:porta'             socket TCP (ex.: simulador.py ou ser2net)
+#   'pty'                          par pty; o dispositivo escreve em .caminho_escravo
+#   'arquivo://caminho?taxa=50'    reprodução de um arquivo de linhas capturadas
+#   'sim://?taxa=200'              dispositivo sintético em processo ('linha' = 115200 baud;
+#                                  &binario=1 aceita o formato binário, &perda=0.01 perde quadros)
+#   'replay://sessao.csv?velocidade=10'  sessão gravada no ritmo original / N ('max' = sem espera)
+
+
+def abrir_transporte(endereco: str, baudrate: int = 9600, timeout: float = 1):
+    if endereco.startswith('tcp://'):
+        return serial.serial_for_url('socket://' + endereco[len('tcp://'):], timeout=timeout)
+
+    if endereco == 'pty':
+        return TransportePty(timeout)
+
+    if endereco.startswith(('sim://', 'arquivo://')):
+        url = urlparse(endereco)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        taxa = params.get('taxa', '0')
+        if url.scheme == 'sim':
+            return TransporteSimulado(taxa, timeout, int(params.get('baud', BAUD_LINHA)),
+                                      binario=params.get('binario') == '1',
+                                      perda=float(params.get('perda', 0)))
+        return TransporteArquivo(url.netloc + url.path, taxa, timeout,
+                                 repetir=params.get('repetir') == '1')
+
+    if endereco.startswith('replay://'):
+        from replay import TransporteReplay
+        url = urlparse(endereco)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        return TransporteReplay(url.netloc + url.path, params.get('velocidade', '1'), timeout,
+                                repetir=params.get('repetir') == '1')
+
+    return serial.Serial(endereco, baudrate, timeout=timeout)
+
+
+class TransportePty:
+    """Lado mestre de um par pty; o dispositivo (ou simulador) usa o escravo."""
+
+    def __init__(self, timeout: float = 1):
+        if fcntl is None:
+            raise OSError('transporte pty só existe em Linux/macOS')
+        self.timeout = timeout
+        self._mestre, self._escravo = os.openpty()
+        tty.setraw(self._escravo)
+        self.caminho_escravo = os.ttyname(self._escravo)
+        self.is_open = True
+
+    def fileno(self) -> int:
+        return self._mestre
+
+    @property
+    def in_waiting(self) -> int:
+        buf = fcntl.ioctl(self._mestre, termios.FIONREAD, b'\0\0\0\0')
+        return struct.unpack('I', buf)[0]
+
+    def read(self, n: int = 1) -> bytes:
+        prontos, _, _ = select.select([self._mestre], [], [], self.timeout)
+        if not prontos:
+            return b''
+        return os.read(self._mestre, n)
+
+    def write(self, dados: bytes) -> int:
+        return os.write(self._mestre, dados)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            os.close(self._mestre)
+            os.close(self._escravo)
+
+
+class _TransporteGerado(abc.ABC):
+    """
+    Base dos transportes que fabricam os bytes: cada quadro tem um horário
+    de "chegada" conforme a taxa; read() bloqueia até o próximo quadro
+    chegar (ou o timeout) e in_waiting conta só o que já chegou. Com taxa 0
+    os quadros ficam disponíveis imediatamente.
+
+    Se `chegadas` for uma deque, o horário (perf_counter) de chegada de
+    cada quadro é anotado nela, para medir latência ponta a ponta.
+
+    Subclasses implementam `_proximo_quadro`.
+    """
+
+    def __init__(self, taxa, timeout: float, baudrate: int = BAUD_LINHA):
+        self.taxa = taxa
+        self.timeout = timeout
+        self.baudrate = baudrate
+        self.is_open = True
+        self.escritos = []   # comandos recebidos do supervisório
+        self._buf = bytearray()
+        self._pendente = None
+        self._chegada = time.perf_counter()
+        self.chegadas = None
+
+    @abc.abstractmethod
+    def _proximo_quadro(self) -> bytes | None:
+        """Bytes do próximo quadro, ou None quando a fonte acabou."""
+
+    def _intervalo(self, quadro: bytes) -> float:
+        return intervalo_quadro(self.taxa, len(quadro), self.baudrate)
+
+    def _carregar(self, agora: float) -> bool:
+        """Garante um quadro pendente com horário de chegada; False no fim do arquivo."""
+        if self._pendente is None:
+            self._pendente = self._proximo_quadro()
+            if self._pendente is None:
+                return False
+            intervalo = self._intervalo(self._pendente)
+            self._chegada = max(self._chegada + intervalo, agora if not intervalo else 0)
+        return True
+
+    def _receber_ate(self, agora: float, limite: int | None = None):
+        while limite is None or len(self._buf) < limite:
+            if not self._carregar(agora):
+                return
+            if self._chegada > agora:
+                return
+            self._buf += self._pendente
+            self._pendente = None
+            if self.chegadas is not None:
+                self.chegadas.append(self._chegada)
+
+    @property
+    def in_waiting(self) -> int:
+        self._receber_ate(time.perf_counter(), limite=1 << 16)
+        return len(self._buf)
+
+    @property
+    def proxima_chegada(self) -> float | None:
+        """perf_counter da chegada do próximo quadro (None = fim do arquivo)."""
+        return self._chegada if self._carregar(time.perf_counter()) else None
+
+    def read(self, n: int = 1) -> bytes:
+        prazo = time.perf_counter() + self.timeout
+        while True:
+            agora = time.perf_counter()
+            self._receber_ate(agora, limite=n)
+            if self._buf or agora >= prazo or not self.is_open:
+                break
+            if self._pendente is None:
+                time.sleep(min(0.05, prazo - agora))  # fim do arquivo
+            else:
+                time.sleep(max(0.0, min(self._chegada, prazo) - agora))
+
+        dados = bytes(self._buf[:n])
+        del self._buf[:n]
+        return dados
+
+    def write(self, dados: bytes) -> int:
+        self.escritos.append(dados)
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class TransporteSimulado(_TransporteGerado):
+    """Dispositivo sintético em processo (ver simulador.GeradorQuadros)."""
+
+    def __init__(self, taxa='10', timeout: float = 1, baudrate: int = BAUD_LINHA,
+                 semente: int | None = None, binario: bool = False, perda: float = 0.0):
+        super().__init__(taxa, timeout, baudrate)
+        self.gerador = GeradorQuadros(semente, aceita_binario=binario, perda=perda)
+
+    def _proximo_quadro(self):
+        return self.gerador.proximo()
+
+    def write(self, dados: bytes) -> int:
+        self.gerador.comando(dados)
+        return super().write(dados)
+
+
+class TransporteArquivo(_TransporteGerado):
+    """Reproduz as linhas de um arquivo capturado (linhas em branco são puladas)."""
+
+    def __init__(self, caminho: str, taxa='0', timeout: float = 1, repetir: bool = False):
+        super().__init__(taxa, timeout)
+        self.caminho = caminho
+        self.repetir = repetir
+        self._arquivo = open(caminho, 'rb')
+
+    def _proximo_quadro(self):
+        while True:
+            linha = self._arquivo.readline()
+            if not linha:
+                if not self.repetir:
+                    return None
+                self._arquivo.seek(0)
+                linha = self._arquivo.readline()
+                if not linha:
+                    return None
+            if linha.strip():
+                return linha.rstrip(b'\r\n') + b'\n'
+
+    def close(self):
+        super().close()
+        self._arquivo.close()